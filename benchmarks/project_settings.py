@@ -0,0 +1,78 @@
+"""Compare ways to build the settings of a crawl.
+
+Usage::
+
+    python benchmarks/project_settings.py [--number N] [--module MODULE]
+
+MODULE is the import path of the settings module of a Scrapy project, by
+default the default settings of Scrapy.
+
+"""
+
+from __future__ import annotations
+
+import argparse
+import timeit
+from functools import partial
+
+from scrapyrt.conf.spider_settings import (
+    get_project_settings,
+    get_project_settings_snapshot,
+    get_scrapyrt_settings,
+    overlay_settings,
+)
+
+LOG_SETTINGS = {"LOG_ENABLED": True, "LOG_FILE": "logs/spider.log"}
+
+
+def build_settings(module):
+    """Build the settings of a crawl from scratch."""
+    custom_settings = {**get_scrapyrt_settings(), **LOG_SETTINGS}
+    return get_project_settings(module=module, custom_settings=custom_settings)
+
+
+def overlay_snapshot(module):
+    """Set the log settings of a crawl on top of the project settings."""
+    snapshot = get_project_settings_snapshot(
+        module=module,
+        custom_settings=get_scrapyrt_settings(),
+    )
+    return overlay_settings(snapshot, LOG_SETTINGS)
+
+
+def overlay_snapshot_and_set(module):
+    """Like overlay_snapshot(), changing settings of the overlay, which
+    copies them.
+    """
+    settings = overlay_snapshot(module)
+    settings.set("LOG_LEVEL", "INFO", priority="cmdline")
+    settings["EXTENSIONS"]["scrapy.extensions.corestats.CoreStats"] = 0
+    return settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--number", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--module", default="scrapy.settings.default_settings")
+    args = parser.parse_args()
+    baseline = None
+    for func in (build_settings, overlay_snapshot, overlay_snapshot_and_set):
+        seconds = min(
+            timeit.repeat(
+                partial(func, args.module),
+                number=args.number,
+                repeat=args.repeat,
+            ),
+        )
+        seconds /= args.number
+        if baseline is None:
+            baseline = seconds
+        print(
+            f"{func.__name__}: {seconds * 1e6:.1f} us per crawl,"
+            f" {baseline / seconds:.1f}x",
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Compare serializers on crawl.json responses with many items.
+
+Usage::
+
+    python benchmarks/serialization.py [--items N] [SERIALIZER ...]
+
+SERIALIZER is the import path of a JSON_SERIALIZER or RESPONSE_SERIALIZERS
+class, by default all serializers of scrapyrt.serialization whose
+dependencies are installed.
+
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import timeit
+from collections import OrderedDict
+from decimal import Decimal
+from functools import partial
+
+import scrapy
+from scrapy.utils.misc import load_object
+
+SERIALIZERS = (
+    "scrapyrt.serialization.ScrapyJSONSerializer",
+    "scrapyrt.serialization.OrjsonSerializer",
+    "scrapyrt.serialization.MsgpackSerializer",
+    "scrapyrt.serialization.CborSerializer",
+)
+
+
+class ProductItem(scrapy.Item):
+    url = scrapy.Field()
+    name = scrapy.Field()
+    price = scrapy.Field()
+    currency = scrapy.Field()
+    description = scrapy.Field()
+    images = scrapy.Field()
+    breadcrumbs = scrapy.Field()
+    attributes = scrapy.Field()
+    in_stock = scrapy.Field()
+    body = scrapy.Field()
+
+
+def get_response(item_count):
+    """Return a crawl.json response, as given to render_object()."""
+    items = [
+        ProductItem(
+            url=f"https://example.com/product/{i}",
+            name=f"Product {i} \N{EN DASH} \N{LEFT DOUBLE QUOTATION MARK}name\N{RIGHT DOUBLE QUOTATION MARK}",
+            price=Decimal(f"{i % 1000}.99"),
+            currency="EUR",
+            description="Lorem ipsum dolor sit amet, consectetur adipiscing. " * 8,
+            images=[f"https://example.com/img/{i}/{n}.jpg" for n in range(5)],
+            breadcrumbs=["Home", "Category", f"Subcategory {i % 20}"],
+            attributes={"color": "red", "size": i % 50, "weight": i * 0.1},
+            in_stock=bool(i % 3),
+            body=b"<html>" + b"x" * 200 + b"</html>",
+        )
+        for i in range(item_count)
+    ]
+    stats = OrderedDict(
+        [
+            ("downloader/request_count", item_count),
+            ("finish_reason", "finished"),
+            ("finish_time", dt.datetime.now(dt.timezone.utc)),
+            ("item_scraped_count", item_count),
+            ("start_time", dt.datetime.now(dt.timezone.utc)),
+        ],
+    )
+    return {
+        "status": "ok",
+        "items": items,
+        "items_dropped": [],
+        "stats": stats,
+        "spider_name": "products",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("serializers", nargs="*", default=SERIALIZERS)
+    args = parser.parse_args()
+    response = get_response(args.items)
+    baseline = None
+    for path in args.serializers:
+        try:
+            serializer = load_object(path)()
+        except ImportError as e:
+            print(f"{path}: skipped, {e}")
+            continue
+        size = len(serializer.dumps(response))
+        seconds = min(
+            timeit.repeat(
+                partial(serializer.dumps, response),
+                number=1,
+                repeat=args.repeat,
+            ),
+        )
+        if baseline is None:
+            baseline = seconds
+        print(
+            f"{path}: {seconds * 1000:.1f} ms for {args.items} items,"
+            f" {size / 1024:.0f} KiB, {baseline / seconds:.1f}x",
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Cache of crawl responses, to answer repeated API calls without crawling."""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from hashlib import sha1
+
+from scrapy.utils.misc import load_object
+
+from .conf import app_settings
+
+# Cache created by get_result_cache(), if any.
+_result_cache: MemoryResultCache | SQLiteResultCache | None = None
+
+
+def get_etag(body):
+    return b'"' + sha1(body).hexdigest().encode() + b'"'  # noqa: S324
+
+
+def get_cache_ttl(spider_name):
+    """Return the number of seconds to cache the responses of a spider for."""
+    spider_ttls = app_settings.RESULT_CACHE_SPIDER_TTL or {}
+    if isinstance(spider_ttls, str):
+        # Set with the -s command line option.
+        spider_ttls = json.loads(spider_ttls)
+    return float(spider_ttls.get(spider_name, app_settings.RESULT_CACHE_TTL))
+
+
+def get_result_cache():
+    """Return the cache set in RESULT_CACHE, None if disabled."""
+    global _result_cache  # noqa: PLW0603  # pylint: disable=global-statement
+    if not app_settings.RESULT_CACHE:
+        return None
+    if _result_cache is None:
+        _result_cache = load_object(app_settings.RESULT_CACHE)()
+    return _result_cache
+
+
+class MemoryResultCache:
+    """Least recently used responses, up to RESULT_CACHE_MAX_SIZE MiB."""
+
+    def __init__(self, max_size=None):
+        if max_size is None:
+            max_size = float(app_settings.RESULT_CACHE_MAX_SIZE) * 1024 * 1024
+        self.max_size = max_size
+        self.size = 0
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        """Return the ETag and body of a cached response, or None."""
+        try:
+            expiry, etag, body = self._entries[key]
+        except KeyError:
+            return None
+        if expiry <= time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return etag, body
+
+    def set(self, key, body, ttl):
+        """Cache a response body for ttl seconds, return its ETag."""
+        etag = get_etag(body)
+        if key in self._entries:
+            self._remove(key)
+        if len(body) > self.max_size:
+            return etag
+        self._entries[key] = (time.monotonic() + ttl, etag, body)
+        self.size += len(body)
+        while self.size > self.max_size:
+            self._remove(next(iter(self._entries)))
+        return etag
+
+    def _remove(self, key):
+        _, _, body = self._entries.pop(key)
+        self.size -= len(body)
+
+
+class SQLiteResultCache:
+    """Responses stored in the SQLite database at RESULT_CACHE_PATH.
+
+    The database survives restarts and can be shared by the processes of
+    the server started with --workers.
+
+    """
+
+    # Remove expired responses every this number of cached responses.
+    purge_interval = 100
+
+    def __init__(self, path=None):
+        if path is None:
+            path = app_settings.RESULT_CACHE_PATH
+        self._db = sqlite3.connect(path, timeout=10, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses"
+            " (key TEXT PRIMARY KEY, expiry REAL, etag BLOB, body BLOB)",
+        )
+        self._sets = 0
+
+    def _get_key(self, key):
+        return sha1(key.encode()).hexdigest()  # noqa: S324
+
+    def get(self, key):
+        """Return the ETag and body of a cached response, or None."""
+        row = self._db.execute(
+            "SELECT etag, body FROM responses WHERE key = ? AND expiry > ?",
+            (self._get_key(key), time.time()),
+        ).fetchone()
+        if row is None:
+            return None
+        return bytes(row[0]), bytes(row[1])
+
+    def set(self, key, body, ttl):
+        """Cache a response body for ttl seconds, return its ETag."""
+        etag = get_etag(body)
+        self._db.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+            (self._get_key(key), time.time() + ttl, etag, body),
+        )
+        self._sets += 1
+        if self._sets % self.purge_interval == 0:
+            self._db.execute("DELETE FROM responses WHERE expiry <= ?", (time.time(),))
+        return etag
@@ -1,4 +1,5 @@
 import argparse
+import socket
 import sys
 from configparser import ConfigParser, NoOptionError, NoSectionError
 from pathlib import Path
@@ -8,8 +9,10 @@ from scrapy.utils.conf import closest_scrapy_cfg
 from scrapy.utils.misc import load_object
 from scrapy.utils.reactor import install_reactor
 from twisted.application import app
-from twisted.application.internet import TCPServer
-from twisted.application.service import Application
+from twisted.application.internet import StreamServerEndpointService, TCPServer
+from twisted.application.service import Application, Service
+from twisted.internet.endpoints import AdoptedStreamServerEndpoint
+from twisted.protocols.policies import WrappingFactory
 from twisted.python import log
 from twisted.web.server import Site
 
@@ -17,6 +20,10 @@ from scrapyrt.conf.spider_settings import get_project_settings
 
 from .conf import app_settings
 from .log import setup_logging
+from .metrics import ReactorLagMonitor
+from .resolver import install_resolver
+from .resources import JobsResource
+from .workers import WorkerSupervisor, get_worker_recycler, listen
 
 
 def parse_arguments():
@@ -26,6 +33,17 @@ def parse_arguments():
             raise argparse.ArgumentTypeError(f"expected name=value: {string!r}")
         return key, value
 
+    def worker_count(string):
+        try:
+            value = int(string)
+        except ValueError:
+            raise argparse.ArgumentTypeError(
+                f"invalid int value: {string!r}",
+            ) from None
+        if value < 1:
+            raise argparse.ArgumentTypeError(f"must be at least 1: {value}")
+        return value
+
     parser = argparse.ArgumentParser(description="HTTP API server for Scrapy project.")
     parser.add_argument(
         "-p",
@@ -58,6 +76,14 @@ def parse_arguments():
         metavar="name=value",
         help="set/override setting (may be repeated)",
     )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        dest="workers",
+        type=worker_count,
+        default=None,
+        help="number of worker processes to run, sharing the port",
+    )
     parser.add_argument(
         "-S",
         "--settings",
@@ -68,12 +94,32 @@ def parse_arguments():
     return parser.parse_args()
 
 
-def get_application(arguments):
+def get_application(arguments, fileno=None, family=socket.AF_INET):
+    """Return the application, listening on the given file descriptor if any.
+
+    Workers started with --workers get the file descriptor of the socket that
+    all workers share.
+
+    """
     ServiceRoot = load_object(app_settings.SERVICE_ROOT)  # pylint: disable=invalid-name
     site = Site(ServiceRoot())
     application = Application("scrapyrt")
-    server = TCPServer(arguments.port, site, interface=arguments.ip)
+    server: Service
+    if fileno is None:
+        server = TCPServer(arguments.port, site, interface=arguments.ip)
+    else:
+        from twisted.internet import reactor  # pylint: disable=import-outside-toplevel
+
+        endpoint = AdoptedStreamServerEndpoint(reactor, fileno, family)
+        # Connections are tracked so that recycled workers answer the
+        # requests they are handling before stopping.
+        connections = WrappingFactory(site)
+        server = StreamServerEndpointService(endpoint, connections)
     server.setServiceParent(application)
+    if fileno is not None:
+        recycler = get_worker_recycler(server, connections)
+        if recycler is not None:
+            recycler.setServiceParent(application)
     return application
 
 
@@ -95,16 +141,40 @@ def find_scrapy_project(project):
     return project_settings
 
 
-def run_application(reactor_type, arguments, app_settings_):
+def run_application(reactor_type, arguments, app_settings_, fileno=None, family=None):
     if reactor_type is not None:
         install_reactor(reactor_type)
 
-    setup_logging()
+    if fileno is None:
+        setup_logging()
+    # else: workers inherit the logging setup of the supervisor
+
+    from twisted.internet import reactor  # pylint: disable=import-outside-toplevel
 
-    application = get_application(arguments)
+    # The DNS cache is configured with the DNS settings of the project, like
+    # the one Scrapy installs for "scrapy crawl".
+    project_settings = get_project_settings(app_settings_.PROJECT_SETTINGS)
+    dns_cache_ttl = float(app_settings_.DNS_CACHE_TTL)
+    if dns_cache_ttl > 0 and project_settings.getbool("DNSCACHE_ENABLED"):
+        install_resolver(
+            reactor,
+            dns_cache_ttl,
+            cache_size=project_settings.getint("DNSCACHE_SIZE"),
+            timeout=project_settings.getfloat("DNS_TIMEOUT"),
+        )
+
+    if float(app_settings_.REACTOR_LAG_INTERVAL) > 0:
+        ReactorLagMonitor(
+            float(app_settings_.REACTOR_LAG_INTERVAL),
+            float(app_settings_.REACTOR_STALL_THRESHOLD),
+        ).start()
+
+    if fileno is None:
+        application = get_application(arguments)
+    else:
+        application = get_application(arguments, fileno, family)
     app_settings_.freeze()
     app.startApplication(application, save=False)
-    from twisted.internet import reactor  # pylint: disable=import-outside-toplevel
 
     msg = f"Running with reactor: {reactor.__class__.__name__}. "
     log.msg(msg)
@@ -112,6 +182,18 @@ def run_application(reactor_type, arguments, app_settings_):
     reactor.run()  # type: ignore[attr-defined]
 
 
+def run_workers(reactor_type, arguments, app_settings_):
+    """Run the application in worker processes supervised by this one."""
+    setup_logging()
+    sock = listen(arguments.ip, arguments.port)
+    app_settings_.freeze()
+
+    def run_worker(fileno, family):
+        run_application(reactor_type, arguments, app_settings_, fileno, family)
+
+    WorkerSupervisor(arguments.workers, run_worker).run(sock)
+
+
 def _update_app_settings(arguments):
     sys.path.insert(0, str(Path.cwd()))
 
@@ -134,11 +216,29 @@ def _update_app_settings(arguments):
             app_settings.set(name.upper(), value)
 
 
+def check_worker_resources(workers):
+    """Raise RuntimeError if RESOURCES cannot be served by several workers."""
+    if workers <= 1:
+        return
+    for route, resource_path in app_settings.RESOURCES.items():
+        if issubclass(load_object(resource_path), JobsResource):
+            msg = (
+                f"The {route} resource keeps jobs in the memory of the worker "
+                f"that created them, remove it from RESOURCES to use --workers "
+                f"{workers}"
+            )
+            raise RuntimeError(msg)
+
+
 def execute():
     arguments = parse_arguments()
     _update_app_settings(arguments)
     reactor_type = app_settings.TWISTED_REACTOR
-    run_application(reactor_type, arguments, app_settings)
+    if arguments.workers is None:
+        run_application(reactor_type, arguments, app_settings)
+    else:
+        check_worker_resources(arguments.workers)
+        run_workers(reactor_type, arguments, app_settings)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,185 @@
+"""Compression of responses, negotiated with the Accept-Encoding header."""
+
+from __future__ import annotations
+
+import json
+import zlib
+
+from . import log
+from .conf import app_settings
+from .metrics import metrics
+from .utils import parse_accept_header
+
+# Encodings in COMPRESSION_ENCODINGS whose library is missing, already
+# reported in the log.
+_unavailable_encodings: set[str] = set()
+
+
+class GzipCompressor:
+    def __init__(self, level=None):
+        if level is None:
+            level = zlib.Z_DEFAULT_COMPRESSION
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        return self._compressor.compress(data) + self._compressor.flush(
+            zlib.Z_SYNC_FLUSH,
+        )
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class BrotliCompressor:
+    def __init__(self, level=None):
+        import brotli  # type: ignore[import-untyped,import-not-found]  # noqa: PLC0415  # pylint: disable=import-outside-toplevel
+
+        if level is None:
+            self._compressor = brotli.Compressor()
+        else:
+            self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class ZstdCompressor:
+    def __init__(self, level=None):
+        import zstandard  # type: ignore[import-untyped,import-not-found]  # noqa: PLC0415  # pylint: disable=import-outside-toplevel,import-error
+
+        if level is None:
+            level = 3
+        self._flush_block = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self._compressor.compress(data) + self._compressor.flush(
+            self._flush_block,
+        )
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+COMPRESSORS = {
+    "gzip": GzipCompressor,
+    "br": BrotliCompressor,
+    "zstd": ZstdCompressor,
+}
+
+
+def get_compression_level(encoding):
+    levels = app_settings.COMPRESSION_LEVELS or {}
+    if isinstance(levels, str):
+        # Set with the -s command line option.
+        levels = json.loads(levels)
+    level = levels.get(encoding)
+    return None if level is None else int(level)
+
+
+def get_compression_encodings():
+    encodings = app_settings.COMPRESSION_ENCODINGS or []
+    if isinstance(encodings, str):
+        encodings = [encoding for encoding in encodings.split(",") if encoding]
+    return encodings
+
+
+def get_encoding(request):
+    """Return the encoding of COMPRESSION_ENCODINGS preferred by the client,
+    or None if the client accepts none of them.
+    """
+    header = b",".join(request.requestHeaders.getRawHeaders(b"Accept-Encoding", []))
+    qualities = parse_accept_header(header.decode("latin-1"))
+    best_encoding, best_quality = None, 0.0
+    for encoding in get_compression_encodings():
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        if quality > best_quality and encoding not in _unavailable_encodings:
+            best_encoding, best_quality = encoding, quality
+    return best_encoding
+
+
+def get_response_encoder(request):
+    """Return the encoder of the response to request, or None if it must not
+    be compressed.
+    """
+    if not get_compression_encodings():
+        return None
+    # The response depends on Accept-Encoding even if it is not compressed.
+    request.responseHeaders.addRawHeader(b"Vary", b"Accept-Encoding")
+    while True:
+        encoding = get_encoding(request)
+        if encoding is None:
+            return None
+        try:
+            compressor = COMPRESSORS[encoding](get_compression_level(encoding))
+        except ImportError as e:
+            _unavailable_encodings.add(encoding)
+            log.msg(f"Disabling {encoding} compression: {e}", level=log.WARNING)
+            continue
+        return ResponseEncoder(request, encoding, compressor)
+
+
+class ResponseEncoderFactory:  # pylint: disable=too-few-public-methods
+    """Encoder factory of twisted.web.resource.EncodingResourceWrapper,
+    creating the encoders of responses, see
+    ServiceResource.getChildWithDefault().
+    """
+
+    def encoderForRequest(self, request):  # pylint: disable=invalid-name
+        return get_response_encoder(request)
+
+
+class ResponseEncoder:
+    """Compress the body of a response as it is written.
+
+    Whether to compress the response is decided on the first write, once
+    its headers are known: responses shorter than COMPRESSION_MIN_SIZE are
+    not compressed. Every write is flushed, so that items of streamed
+    responses are sent right away.
+
+    """
+
+    def __init__(self, request, encoding, compressor):
+        self.request = request
+        self.encoding = encoding
+        self.compressor = compressor
+        self.enabled = None
+
+    def _should_compress(self):
+        request = self.request
+        if request.code in (204, 304):
+            return False
+        headers = request.responseHeaders
+        if headers.hasHeader(b"Content-Encoding"):
+            return False
+        length = headers.getRawHeaders(b"Content-Length")
+        return length is None or int(length[0]) >= int(
+            app_settings.COMPRESSION_MIN_SIZE,
+        )
+
+    def _start(self):
+        headers = self.request.responseHeaders
+        headers.setRawHeaders(b"Content-Encoding", [self.encoding.encode()])
+        headers.removeHeader(b"Content-Length")
+        etag = headers.getRawHeaders(b"ETag")
+        if etag and not etag[0].startswith(b"W/"):
+            # The compressed body is not the body the ETag was computed for.
+            headers.setRawHeaders(b"ETag", [b"W/" + etag[0]])
+        metrics.inc_value(f"compression/{self.encoding}")
+
+    def encode(self, data):
+        if self.enabled is None:
+            self.enabled = self._should_compress()
+            if self.enabled:
+                self._start()
+        if not self.enabled:
+            return data
+        return self.compressor.compress(data)
+
+    def finish(self):
+        if not self.enabled:
+            return b""
+        return self.compressor.finish()
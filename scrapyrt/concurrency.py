@@ -0,0 +1,163 @@
+"""Limits and sharing of the crawls that run at the same time."""
+
+from twisted.internet import defer
+from twisted.internet.defer import Deferred, DeferredSemaphore, fail, maybeDeferred
+from twisted.python.failure import Failure
+from twisted.web.error import Error
+
+from .conf import app_settings
+from .metrics import metrics
+
+
+class ServiceUnavailable(Error):
+    """503 error, telling clients when to retry."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(503, message=message)
+        self.retry_after = retry_after
+
+
+class CrawlLimiter:
+    """Limit the number of crawls that run at the same time.
+
+    Crawls over MAX_CONCURRENT_CRAWLS wait for a running crawl to finish, in
+    order, for up to CRAWL_QUEUE_TIMEOUT seconds. Crawls over
+    MAX_QUEUED_CRAWLS are rejected right away.
+
+    """
+
+    def __init__(self, clock=None):
+        self.clock = clock
+        self._semaphore = None
+
+    def _get_semaphore(self, limit):
+        if self._semaphore is None or self._semaphore.limit != limit:
+            self._semaphore = DeferredSemaphore(limit)
+        return self._semaphore
+
+    def run(self, func, *args, **kwargs):
+        """Call func when a crawl can start, release it when it finishes.
+
+        :return: Deferred fired with the result of func, or failed with
+            ServiceUnavailable if the crawl cannot start.
+
+        """
+        return self._run(func, None, *args, **kwargs)
+
+    def run_crawl(self, manager, *args, **kwargs):
+        """Like run() with manager.crawl, but release the crawl once its
+        spider is closed, which can be after its result, see
+        CrawlManager.close_crawl().
+        """
+        return self._run(
+            manager.crawl,
+            getattr(manager, "wait_finished", None),
+            *args,
+            **kwargs,
+        )
+
+    def _run(self, func, wait_finished, *args, **kwargs):
+        limit = int(app_settings.MAX_CONCURRENT_CRAWLS)
+        if limit <= 0:
+            return func(*args, **kwargs)
+        semaphore = self._get_semaphore(limit)
+        retry_after = int(app_settings.CRAWL_RETRY_AFTER)
+        if not semaphore.tokens and len(semaphore.waiting) >= int(
+            app_settings.MAX_QUEUED_CRAWLS,
+        ):
+            metrics.inc_value("crawl_queue/rejected")
+            return fail(ServiceUnavailable(b"Too many crawls", retry_after))
+        dfd = semaphore.acquire()
+        if not dfd.called:
+            dfd = self._wait(dfd, retry_after)
+
+        def release(result):
+            semaphore.release()
+            return result
+
+        def start_crawl(_):
+            crawl_dfd = maybeDeferred(func, *args, **kwargs)
+            if wait_finished is None:
+                crawl_dfd.addBoth(release)
+            else:
+                wait_finished().addBoth(release)
+            return crawl_dfd
+
+        dfd.addCallback(start_crawl)
+        return dfd
+
+    def _wait(self, dfd, retry_after):
+        metrics.inc_value("crawl_queue/queued")
+        metrics.inc_value("crawl_queue/waiting")
+
+        def stop_waiting(result):
+            metrics.inc_value("crawl_queue/waiting", -1)
+            return result
+
+        def timed_out(failure):
+            failure.trap(defer.TimeoutError)
+            metrics.inc_value("crawl_queue/timeouts")
+            message = b"Timed out waiting for other crawls to finish"
+            raise ServiceUnavailable(message, retry_after)
+
+        dfd.addBoth(stop_waiting)
+        timeout = float(app_settings.CRAWL_QUEUE_TIMEOUT)
+        if timeout > 0:
+            clock = self.clock
+            if clock is None:
+                # pylint: disable-next=import-outside-toplevel
+                from twisted.internet import reactor
+
+                clock = reactor
+            dfd.addTimeout(timeout, clock)
+            dfd.addErrback(timed_out)
+        return dfd
+
+
+crawl_limiter = CrawlLimiter()
+
+
+class CrawlCoalescer:  # pylint: disable=too-few-public-methods
+    """Share the result of a running crawl with identical crawls.
+
+    Crawls started while a crawl with the same key is running do not run,
+    they get the result of the running crawl instead.
+
+    """
+
+    def __init__(self):
+        self._running = {}
+
+    def run(self, key, func, *args, **kwargs):
+        """Call func, or wait for the running call with the same key.
+
+        :return: Deferred fired with the result of func.
+
+        """
+        waiting = self._running.get(key)
+        if waiting is not None:
+            metrics.inc_value("crawls/coalesced")
+            dfd: Deferred = Deferred()
+            waiting.append(dfd)
+            return dfd
+        waiting = self._running[key] = []
+
+        def crawl_finished(result):
+            del self._running[key]
+            for dfd in waiting:
+                if isinstance(result, Failure):
+                    dfd.errback(result)
+                else:
+                    dfd.callback(result)
+            return result
+
+        try:
+            dfd = func(*args, **kwargs)
+        except Exception:
+            del self._running[key]
+            raise
+        dfd.addBoth(crawl_finished)
+        return dfd
+
+
+crawl_coalescer = CrawlCoalescer()
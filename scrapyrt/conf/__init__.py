@@ -7,18 +7,56 @@ from . import default_settings
 
 
 class Settings:
+    COALESCE_CRAWLS: bool
+    COMPRESSION_ENCODINGS: list[str] | str
+    COMPRESSION_LEVELS: dict[str, int] | str
+    COMPRESSION_MIN_SIZE: int
     CRAWL_MANAGER: str
+    CRAWL_QUEUE_TIMEOUT: float
+    CRAWL_RETRY_AFTER: int
     DEBUG: bool
     DEFAULT_ERRBACK_NAME: str | None
+    DNS_CACHE_TTL: float
+    DROPPED_ITEMS_DETAIL: str
+    DROPPED_ITEM_SUMMARY_LENGTH: int
+    DNS_PREFETCH: bool
+    EVENTS_PROGRESS_INTERVAL: float
+    ITEMS_MEMORY_LIMIT: int
+    ITEMS_SPILL_DIR: str | None
+    JOB_RESULT_TTL: float
+    JSON_SERIALIZER: str
     LOG_DIR: str
     LOG_ENCODING: str
     LOG_FILE: str | None
+    MAX_BATCH_REQUESTS: int
+    MAX_CONCURRENT_CRAWLS: int
+    MAX_IDLE_CONNECTIONS_PER_HOST: int | None
+    MAX_ITEMS_PER_CRAWL: int
+    MAX_JOB_WAIT: float
+    MAX_JOBS: int
+    MAX_QUEUED_CRAWLS: int
     PROJECT_SETTINGS: str | None
+    REACTOR_LAG_INTERVAL: float
+    REACTOR_STALL_THRESHOLD: float
+    RESIDENT_SPIDERS: list[str] | str
     RESOURCES: dict[str, str]
+    RESPONSE_SERIALIZERS: dict[str, str] | str
+    RESULT_CACHE: str | None
+    RESULT_CACHE_MAX_SIZE: float
+    RESULT_CACHE_PATH: str
+    RESULT_CACHE_SPIDER_TTL: dict[str, float] | str
+    RESULT_CACHE_TTL: float
     SERVICE_ROOT: str
+    SHARED_CRAWLER_RUNNER: bool
+    SHARED_HTTP_CONNECTIONS: bool
+    SHARED_HTTPCACHE_MEMORY_SIZE: float
     SPIDER_LOG_FILE_TIMEFORMAT: str
+    THREADED_SERIALIZATION_MIN_ITEMS: int
     TIMEOUT_LIMIT: int
     TWISTED_REACTOR: str | None
+    WORKER_GRACE_TIMEOUT: float
+    WORKER_MAX_CRAWLS: int
+    WORKER_MAX_MEMORY: int
 
     def __init__(self):
         self.frozen = False
@@ -27,6 +27,122 @@ RESOURCES = {
 
 CRAWL_MANAGER = "scrapyrt.core.CrawlManager"
 
+# Serializer of JSON responses, scrapyrt.serialization.OrjsonSerializer is
+# faster but requires orjson
+JSON_SERIALIZER = "scrapyrt.serialization.ScrapyJSONSerializer"
+# Serializers of the other response formats clients can ask for with the
+# Accept header, by content type; they require msgpack and cbor2
+RESPONSE_SERIALIZERS = {
+    "application/msgpack": "scrapyrt.serialization.MsgpackSerializer",
+    "application/cbor": "scrapyrt.serialization.CborSerializer",
+}
+# Serialize responses with at least this number of items in a thread, 0 to
+# always serialize in the reactor thread
+THREADED_SERIALIZATION_MIN_ITEMS = 1000
+
+# Seconds between measures of the reactor lag, 0 to disable them
+REACTOR_LAG_INTERVAL = 1.0
+# Minimum reactor lag, in seconds, counted as a stall
+REACTOR_STALL_THRESHOLD = 0.1
+
+# Encodings to compress responses with, in order of preference, among gzip,
+# br (requires brotli) and zstd (requires zstandard)
+COMPRESSION_ENCODINGS = ["gzip"]
+# Minimum size of responses to compress, in bytes
+COMPRESSION_MIN_SIZE = 1024
+# Compression level of each encoding
+COMPRESSION_LEVELS = {"gzip": 6, "br": 4, "zstd": 3}
+
+# Load project spiders once and share one crawler runner between crawls,
+# instead of creating them for every crawl
+SHARED_CRAWLER_RUNNER = True
+
+# Keep HTTP(S) connections open between crawls, in a connection pool shared
+# by all crawls
+SHARED_HTTP_CONNECTIONS = True
+# Maximum idle connections kept open per host, None to use the
+# CONCURRENT_REQUESTS_PER_DOMAIN setting of the project
+MAX_IDLE_CONNECTIONS_PER_HOST = None
+
+# Maximum size of the responses kept in memory by
+# scrapyrt.httpcache.SharedCacheStorage, in MiB
+SHARED_HTTPCACHE_MEMORY_SIZE = 64
+
+# Seconds to cache resolved host names for, shared by all crawls, 0 to
+# disable the cache
+DNS_CACHE_TTL = 60
+# Start resolving the host name of the API request URL before creating the
+# crawl
+DNS_PREFETCH = True
+
+# Names of spiders whose crawl stays open between API calls
+RESIDENT_SPIDERS: list[str] = []
+
+# With --workers, restart a worker after it finished this number of crawls,
+# 0 for no limit
+WORKER_MAX_CRAWLS = 0
+# With --workers, restart a worker when its resident memory exceeds this
+# number of MiB, 0 for no limit
+WORKER_MAX_MEMORY = 0
+# Maximum number of seconds a recycled worker waits for its crawls and the
+# HTTP requests it is handling to finish before stopping
+WORKER_GRACE_TIMEOUT = 60
+
+# Maximum number of crawls running at the same time, 0 for no limit
+MAX_CONCURRENT_CRAWLS = 0
+# Maximum number of crawls waiting for a running crawl to finish, more crawls
+# are rejected with a 503 response
+MAX_QUEUED_CRAWLS = 100
+# Seconds a crawl can wait for a running crawl to finish, 0 for no limit
+CRAWL_QUEUE_TIMEOUT = 30
+# Value of the Retry-After header of 503 responses to rejected crawls
+CRAWL_RETRY_AFTER = 5
+
+# Give crawls started while an identical crawl is running the result of the
+# running crawl, instead of running them
+COALESCE_CRAWLS = False
+
+# Class of the cache of crawl responses, scrapyrt.cache.MemoryResultCache or
+# scrapyrt.cache.SQLiteResultCache, None to disable the cache
+RESULT_CACHE = None
+# Seconds to cache crawl responses for
+RESULT_CACHE_TTL = 300
+# Seconds to cache crawl responses for, by spider name, instead of
+# RESULT_CACHE_TTL
+RESULT_CACHE_SPIDER_TTL: dict[str, float] = {}
+# Maximum size of the responses in MemoryResultCache, in MiB
+RESULT_CACHE_MAX_SIZE = 100
+# Path of the database of SQLiteResultCache
+RESULT_CACHE_PATH = "result_cache.sqlite"
+
+# Maximum number of requests in a batch crawl
+MAX_BATCH_REQUESTS = 1000
+
+# Maximum number of jobs kept by the jobs resource, running or finished
+MAX_JOBS = 1000
+# Seconds to keep the result of a finished job for
+JOB_RESULT_TTL = 3600
+# Maximum seconds a GET request to the jobs resource can wait for a job to
+# finish
+MAX_JOB_WAIT = 60
+
+# Minimum seconds between two progress events of the events resource
+EVENTS_PROGRESS_INTERVAL = 1.0
+
+# What to keep of dropped items: "item" to keep them whole, "summary" to keep
+# the beginning of their representation, "none" to only count them in stats
+DROPPED_ITEMS_DETAIL = "item"
+# Maximum length of dropped item summaries
+DROPPED_ITEM_SUMMARY_LENGTH = 200
+
+# Items of a crawl kept in memory, further items are written to a temporary
+# file in ITEMS_SPILL_DIR, or the default temporary directory if None; 0 to
+# keep all items in memory
+ITEMS_MEMORY_LIMIT = 100000
+ITEMS_SPILL_DIR = None
+# Close the spider of crawls that reach this number of items, 0 for no limit
+MAX_ITEMS_PER_CRAWL = 0
+
 # Limit spider run time
 TIMEOUT_LIMIT = 1000
 # disable in production
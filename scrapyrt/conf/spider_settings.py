@@ -1,10 +1,26 @@
-from scrapy.settings import Settings
+import builtins
+from copy import deepcopy
+
+from scrapy.settings import (
+    BaseSettings,
+    Settings,
+    SettingsAttribute,
+    get_settings_priority,
+)
+from scrapy.settings import default_settings as scrapy_default_settings
 
 from . import app_settings
 
+# Project settings built by get_project_settings_snapshot(), keyed by project
+# settings module and custom settings.
+_snapshots: dict[tuple, Settings] = {}
+
+# Types of setting values that cannot be changed in place.
+_IMMUTABLE_TYPES = (type(None), bool, int, float, str, bytes, tuple, frozenset)
+
 
 def get_scrapyrt_settings(log_file=None):
-    return {
+    settings = {
         "LOG_LEVEL": "DEBUG",
         "LOG_ENABLED": bool(log_file),
         "LOG_FILE": log_file,
@@ -15,6 +31,15 @@ def get_scrapyrt_settings(log_file=None):
             "scrapy.extensions.throttle.AutoThrottle": None,
         },
     }
+    if app_settings.SHARED_HTTP_CONNECTIONS:
+        # Set as base handlers, so that handlers set by the project in
+        # DOWNLOAD_HANDLERS take precedence.
+        settings["DOWNLOAD_HANDLERS_BASE"] = {
+            **scrapy_default_settings.DOWNLOAD_HANDLERS_BASE,
+            "http": "scrapyrt.downloader.SharedHTTP11DownloadHandler",
+            "https": "scrapyrt.downloader.SharedHTTP11DownloadHandler",
+        }
+    return settings
 
 
 def get_project_settings(module=None, custom_settings=None):
@@ -26,3 +51,96 @@ def get_project_settings(module=None, custom_settings=None):
         assert isinstance(custom_settings, dict)
         crawler_settings.setdict(custom_settings, priority="cmdline")
     return crawler_settings
+
+
+def get_project_settings_snapshot(module=None, custom_settings=None):
+    """Return frozen project settings, built only once per process.
+
+    Takes the same arguments as get_project_settings(). The returned object
+    is shared by all callers, use overlay_settings() to get settings that
+    can be changed.
+
+    """
+    if module is None:
+        module = app_settings.PROJECT_SETTINGS
+    key = (module, repr(sorted((custom_settings or {}).items())))
+    try:
+        return _snapshots[key]
+    except KeyError:
+        pass
+    settings = get_project_settings(module=module, custom_settings=custom_settings)
+    settings.freeze()
+    _snapshots[key] = settings
+    return settings
+
+
+class OverlaySettings(Settings):
+    """Settings sharing the attributes of other settings until they are
+    changed, see overlay_settings().
+    """
+
+    # Names of the attributes shared with the original settings. The set
+    # method shadows the builtin in the class body.
+    _shared: builtins.set[str]
+
+    def _own(self, name):
+        """Replace the shared attribute of name with a copy."""
+        if name not in self._shared:
+            return
+        self._shared.discard(name)
+        attribute = self.attributes[name]
+        value = attribute.value
+        if isinstance(value, BaseSettings):
+            value = value.copy()
+        elif not isinstance(value, _IMMUTABLE_TYPES):
+            value = deepcopy(value)
+        self.attributes[name] = SettingsAttribute(value, attribute.priority)
+
+    def __getitem__(self, opt_name):
+        if opt_name in self._shared and not isinstance(
+            self.attributes[opt_name].value,
+            _IMMUTABLE_TYPES,
+        ):
+            # Settings like EXTENSIONS, or plain dicts and lists, can be
+            # changed in place.
+            self._own(opt_name)
+        return super().__getitem__(opt_name)
+
+    def set(self, name, value, priority="project"):
+        self._assert_mutability()
+        self._own(name)
+        super().set(name, value, priority)
+
+    def __delitem__(self, name):
+        self._assert_mutability()
+        self._shared.discard(name)
+        super().__delitem__(name)
+
+    def copy(self):
+        result = super().copy()
+        # Deep copies share nothing.
+        result._shared = set()  # pylint: disable=protected-access
+        return result
+
+
+def overlay_settings(settings, values, priority="cmdline"):
+    """Return a copy of settings with values set on top of it.
+
+    Unlike Settings.copy() this does not deep copy the settings, the copy
+    shares them with the original settings object until they are changed,
+    which makes it cheap enough to be created for every crawl. Changing the
+    copy never changes the original settings.
+
+    """
+    result = OverlaySettings.__new__(OverlaySettings)
+    result.__dict__.update(settings.__dict__)
+    result.frozen = False
+    result.attributes = dict(settings.attributes)
+    result._shared = set(settings.attributes)  # pylint: disable=protected-access
+    priority = get_settings_priority(priority)
+    for name, value in values.items():
+        current = result.attributes.get(name)
+        if current is None or current.priority <= priority:
+            result._shared.discard(name)  # pylint: disable=protected-access
+            result.attributes[name] = SettingsAttribute(value, priority)
+    return result
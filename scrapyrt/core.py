@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import datetime as dt
+import pickle
 from collections import OrderedDict
 from copy import deepcopy
 from pathlib import Path
@@ -10,16 +11,26 @@ from scrapy import Spider, signals
 from scrapy.crawler import Crawler, CrawlerRunner
 from scrapy.exceptions import DontCloseSpider
 from scrapy.http import Request
+from scrapy.settings import default_settings as scrapy_default_settings
+from twisted.internet.defer import Deferred, succeed
+from twisted.python.failure import Failure
 from twisted.web.error import Error
 
 from . import log
 from .conf import app_settings
-from .conf.spider_settings import get_project_settings, get_scrapyrt_settings
+from .conf.spider_settings import (
+    get_project_settings_snapshot,
+    get_scrapyrt_settings,
+    overlay_settings,
+)
 from .log import setup_spider_logging
+from .metrics import metrics
+from .resident import get_resident_crawl, is_resident_spider
+from .spill import SpilledItems, SpillFile
 
 
 class ScrapyrtCrawlerRunner(CrawlerRunner):
-    def __init__(self, settings, scrapyrt_manager):
+    def __init__(self, settings, scrapyrt_manager=None):
         super().__init__(settings)
         self.scrapyrt_manager = scrapyrt_manager
 
@@ -27,52 +38,198 @@ class ScrapyrtCrawlerRunner(CrawlerRunner):
         self,
         crawler_or_spidercls: type[Spider] | str | Crawler,
     ) -> Crawler:
-        crawler = super().create_crawler(crawler_or_spidercls)
-        self.scrapyrt_manager.crawler = crawler
-        crawler.signals.connect(self.scrapyrt_manager.get_item, signals.item_scraped)
-        crawler.signals.connect(
-            self.scrapyrt_manager.collect_dropped,
-            signals.item_dropped,
-        )
-        crawler.signals.connect(self.scrapyrt_manager.spider_idle, signals.spider_idle)
-        crawler.signals.connect(
-            self.scrapyrt_manager.handle_spider_error,
-            signals.spider_error,
-        )
-        crawler.signals.connect(
-            self.scrapyrt_manager.handle_scheduling,
-            signals.request_scheduled,
-        )
-        crawler.signals.connect(
-            self.scrapyrt_manager.read_spider,
-            signals.spider_opened,
-        )
+        if isinstance(crawler_or_spidercls, Crawler):
+            # CrawlManager creates crawlers with per-crawl settings, which
+            # must not be merged with the settings of the runner.
+            crawler = crawler_or_spidercls
+        else:
+            crawler = super().create_crawler(crawler_or_spidercls)
+        if self.scrapyrt_manager is not None:
+            self.scrapyrt_manager.connect_crawler(crawler)
         return crawler
 
 
+# Crawler runners shared by all crawls, keyed by spider loader settings.
+_shared_runners: dict[tuple, ScrapyrtCrawlerRunner] = {}
+
+
+def get_shared_crawler_runner(settings):
+    """Return a crawler runner shared by all crawls with the same spiders.
+
+    Creating a crawler runner creates a spider loader, which imports every
+    module in SPIDER_MODULES, so doing it for every crawl is slow on projects
+    with many spiders.
+
+    """
+    key = (settings["SPIDER_LOADER_CLASS"], tuple(settings.getlist("SPIDER_MODULES")))
+    try:
+        return _shared_runners[key]
+    except KeyError:
+        pass
+    runner = _shared_runners[key] = ScrapyrtCrawlerRunner(settings)
+    return runner
+
+
+# Subclasses of spider classes without start requests, keyed by spider class.
+_no_start_classes: dict[type, type] = {}
+
+
+def spider_class_without_start(spidercls):
+    """Return a subclass of a spider class that sends no start requests."""
+    try:
+        return _no_start_classes[spidercls]
+    except KeyError:
+        pass
+
+    async def start(*_args, **_kwargs):
+        return
+        yield
+
+    def start_requests(*_args, **_kwargs):
+        return
+        yield
+
+    attrs = {
+        "__module__": spidercls.__module__,
+        "__qualname__": spidercls.__qualname__,
+    }
+    if hasattr(spidercls, "start"):
+        attrs["start"] = start
+    if hasattr(spidercls, "start_requests"):
+        attrs["start_requests"] = start_requests
+    subclass = _no_start_classes[spidercls] = type(
+        spidercls.__name__,
+        (spidercls,),
+        attrs,
+    )
+    return subclass
+
+
+# Request meta key with the position of a request in a batch.
+BATCH_INDEX_META_KEY = "_scrapyrt_batch_index"
+
+
+def get_batch_index(response):
+    """Return the batch position of the request of a response or failure."""
+    request = getattr(response, "request", None)
+    if request is None:
+        return None
+    return request.meta.get(BATCH_INDEX_META_KEY)
+
+
+class BatchMiddleware:
+    """Spider middleware that gives requests sent from the response of a
+    batch request the batch position of that request, so that the items
+    they lead to are returned with the right batch request.
+    """
+
+    def process_spider_output(self, response, result, spider=None):  # pylint: disable=unused-argument
+        index = get_batch_index(response)
+        for obj in result:
+            yield self._set_batch_index(obj, index)
+
+    async def process_spider_output_async(self, response, result, spider=None):  # pylint: disable=unused-argument
+        index = get_batch_index(response)
+        async for obj in result:
+            yield self._set_batch_index(obj, index)
+
+    def _set_batch_index(self, obj, index):
+        if index is not None and isinstance(obj, Request):
+            obj.meta.setdefault(BATCH_INDEX_META_KEY, index)
+        return obj
+
+
+class BatchRequest:
+    """Request of a batch crawl, with the items and errors it led to."""
+
+    def __init__(self, request, callback_name, errback_name):
+        self.request = request
+        self.callback_name = callback_name
+        self.errback_name = errback_name
+        self.items = []
+        # Items past ITEMS_MEMORY_LIMIT, see CrawlManager._store_item().
+        self.spill_file = None
+        self.errors = []
+
+    def add_error(self, failure):
+        self.errors.append(f"{type(failure.value).__name__}: {failure.value}")
+
+    def get_result(self):
+        result = {"url": self.request.url, "items": self.items, "errors": self.errors}
+        if self.spill_file is not None:
+            self.spill_file.finish()
+            result["items"] = SpilledItems(self.items, self.spill_file)
+        return result
+
+
 class CrawlManager:  # pylint: disable=too-many-instance-attributes
     """Runs crawls."""
 
-    def __init__(  # pylint: disable=too-many-positional-arguments
+    def __init__(  # noqa: PLR0913  # pylint: disable=too-many-positional-arguments
         self,
         spider_name,
         request_kwargs,
         max_requests=None,
         start_requests=None,
         spider_start=None,
+        projection=None,
+        max_items=None,
+        timeout=None,
     ):
         self.spider_name = spider_name
+        # ResponseProjection applied to items, dropped items and stats.
+        self.projection = projection
+        # Requests of a batch crawl, when given a list of request arguments.
+        self.batch = None
+        if isinstance(request_kwargs, list):
+            self.batch = [
+                self._create_batch_request(deepcopy(kwargs))
+                for kwargs in request_kwargs
+            ]
+            request_kwargs = {}
         self.log_dir = Path(app_settings.LOG_DIR)
         self.items = []
+        # Items past ITEMS_MEMORY_LIMIT.
+        self.spill_file = None
+        # Number of items kept in memory, in items and in the items of
+        # batch requests.
+        self.items_in_memory = 0
+        # Number of items scraped, wherever they are kept.
+        self.item_count = 0
+        # Called with each scraped item instead of keeping it in items, for
+        # streamed responses.
+        self.item_handler = None
+        # Called with the reason to stop the crawl instead of closing the
+        # spider, for resident crawls.
+        self.close_handler = None
+        self.close_reason = None
+        # Deferred returned by crawl().
+        self._crawl_result = None
+        # Deferreds of wait_finished(), None if the crawl is not running.
+        self._finish_waiters = None
+        # Called without arguments when a request is scheduled, an item is
+        # scraped or dropped, or a spider error happens.
+        self.progress_handler = None
         self.items_dropped = []
+        self.items_dropped_count = 0
         self.errors = []
         self.user_error = None
         self.max_requests = int(max_requests) if max_requests else None
-        self.timeout_limit = int(app_settings.TIMEOUT_LIMIT)
+        self.max_items = int(max_items) if max_items else None
+        # Seconds after which the crawl is closed, TIMEOUT_LIMIT or a lower
+        # timeout.
+        self.timeout_limit: float = int(app_settings.TIMEOUT_LIMIT)
+        if timeout and float(timeout) < self.timeout_limit:
+            self.timeout_limit = float(timeout)
+        # IReactorTime of the timeout of the crawl, the reactor if None.
+        self.clock = None
+        self._timeout_call = None
         self.request_count = 0
         self.debug = app_settings.DEBUG
         self.crawler_runner = None
         self.crawler = None
+        # Stats of the crawl, if not those of the crawler.
+        self.stats = None
         self.crawl_start_time = dt.datetime.now(dt.timezone.utc)
         # callback will be added after instantiation of crawler object
         # because we need to know if spider has method available
@@ -87,7 +244,6 @@ class CrawlManager:  # pylint: disable=too-many-instance-attributes
         else:
             self.request = None
         self._request_scheduled = False
-        self.original_start_methods = {}
         self._cleanup_handler = None
         self._init_spider_start(start_requests, spider_start)
 
@@ -128,7 +284,10 @@ class CrawlManager:  # pylint: disable=too-many-instance-attributes
 
     def crawl(self, *args, **kwargs):
         settings = self.get_project_settings()
-        self.crawler_runner = ScrapyrtCrawlerRunner(settings, self)
+        if app_settings.SHARED_CRAWLER_RUNNER:
+            self.crawler_runner = get_shared_crawler_runner(settings)
+        else:
+            self.crawler_runner = ScrapyrtCrawlerRunner(settings)
         spidercls = self.crawler_runner.spider_loader.load(self.spider_name)
         for kw in kwargs:
             attr_or_m = getattr(spidercls, kw, None)
@@ -139,61 +298,190 @@ class CrawlManager:  # pylint: disable=too-many-instance-attributes
                     400,
                     message=msg.format(kw, getattr(spidercls, kw)).encode(),
                 )
+        if self._is_resident_crawl(args, kwargs):
+            resident_crawl = get_resident_crawl(
+                self.crawler_runner,
+                spider_class_without_start(spidercls),
+                self.get_resident_settings,
+            )
+            dfd = resident_crawl.submit(self)
+            self._track_crawl(dfd)
+            self._notify_finished(dfd)
+            dfd.addCallback(self.return_items)
+            return dfd
         if not self.spider_start:
-            self.set_dummy_start_methods(spidercls)
-        dfd = self.crawler_runner.crawl(spidercls, *args, **kwargs)
+            # A subclass is used instead of changing the spider class, which
+            # is shared with concurrent crawls that may have spider_start.
+            spidercls = spider_class_without_start(spidercls)
+        crawler = self._create_crawler(spidercls, settings)
+        dfd = self.crawler_runner.crawl(crawler, *args, **kwargs)
+        self._track_crawl(dfd)
+        self._notify_finished(dfd)
 
         def cleanup_logging(result):
             if self._cleanup_handler:
                 self._cleanup_handler()
             return result
 
-        dfd.addBoth(self.restore_start_methods)
         dfd.addBoth(cleanup_logging)
         dfd.addCallback(self.return_items)
+        result = self._get_crawl_result(dfd)
+        self._start_timeout(dfd)
+        return result
+
+    def _get_crawl_result(self, dfd):
+        """Return a Deferred fired with the result of the crawl of dfd, or
+        by close_crawl() with the items scraped so far, whichever is first.
+        """
+        self._crawl_result = Deferred()
+
+        def crawl_finished(result):
+            assert self._crawl_result is not None
+            if self._crawl_result.called:
+                if isinstance(result, Failure):
+                    log.err(result)
+            elif isinstance(result, Failure):
+                self._crawl_result.errback(result)
+            else:
+                self._crawl_result.callback(result)
+
+        dfd.addBoth(crawl_finished)
+        return self._crawl_result
+
+    def get_remaining_time(self):
+        """Return the seconds left before the crawl times out."""
+        elapsed_time = dt.datetime.now(dt.timezone.utc) - self.crawl_start_time
+        return max(self.timeout_limit - elapsed_time.total_seconds(), 0)
+
+    def _start_timeout(self, dfd):
+        """Close the crawl of dfd once it runs for timeout_limit seconds,
+        time spent waiting in the crawl queue included.
+        """
+        clock = self.clock
+        if clock is None:
+            # pylint: disable-next=import-outside-toplevel
+            from twisted.internet import reactor
+
+            clock = reactor
+        self._timeout_call = clock.callLater(
+            self.get_remaining_time(),
+            self.close_crawl,
+            "timeout",
+        )
+
+        def crawl_finished(result):
+            if self._timeout_call is not None and self._timeout_call.active():
+                self._timeout_call.cancel()
+            return result
+
+        dfd.addBoth(crawl_finished)
+
+    def _notify_finished(self, dfd):
+        """Fire the Deferreds of wait_finished() once dfd fires."""
+        self._finish_waiters = []
+
+        def crawl_finished(result):
+            waiters, self._finish_waiters = self._finish_waiters or [], None
+            for waiter in waiters:
+                waiter.callback(None)
+            return result
+
+        dfd.addBoth(crawl_finished)
+
+    def wait_finished(self):
+        """Return a Deferred fired once the crawl is finished and its spider
+        closed, which can be after the result of crawl(), see close_crawl().
+        It fires right away if the crawl is not running.
+        """
+        if self._finish_waiters is None:
+            return succeed(None)
+        dfd: Deferred = Deferred()
+        self._finish_waiters.append(dfd)
         return dfd
 
-    def set_dummy_start_methods(self, spidercls):
-        if hasattr(spidercls, "start"):
+    def _track_crawl(self, dfd):
+        """Count a crawl in metrics until its deferred fires."""
+        metrics.inc_value("crawls/started")
+        metrics.inc_value("crawls/running")
 
-            async def dummy_start(*_args, **_kwargs):
-                return
-                yield
+        def crawl_finished(result):
+            metrics.inc_value("crawls/running", -1)
+            metrics.inc_value("crawls/finished")
+            return result
 
-            self.original_start_methods["start"] = spidercls.start
-            spidercls.start = dummy_start
-        if hasattr(spidercls, "start_requests"):
+        dfd.addBoth(crawl_finished)
 
-            def dummy_start_requests(*_args, **_kwargs):
-                return
-                yield
+    def _is_resident_crawl(self, args, kwargs):
+        """Return True if the crawl can be handled by a resident crawl.
 
-            self.original_start_methods["start_requests"] = spidercls.start_requests
-            spidercls.start_requests = dummy_start_requests
+        Resident crawls only handle the request given to the API, so crawls
+        with start requests or with spider arguments are run separately.
 
-    def restore_start_methods(self, result):
-        assert self.crawler is not None
-        for method_name in list(self.original_start_methods):
-            original_method = self.original_start_methods.pop(method_name)
-            setattr(self.crawler.spider.__class__, method_name, original_method)
-        return result
+        """
+        return (
+            self.request is not None
+            and not self.spider_start
+            and not args
+            and not kwargs
+            and is_resident_spider(self.spider_name)
+        )
+
+    def _create_crawler(self, spidercls, settings):
+        crawler = Crawler(spidercls, settings)
+        self.connect_crawler(crawler)
+        return crawler
+
+    def connect_crawler(self, crawler):
+        self.crawler = crawler
+        crawler.signals.connect(self.get_item, signals.item_scraped)
+        crawler.signals.connect(self.collect_dropped, signals.item_dropped)
+        crawler.signals.connect(self.spider_idle, signals.spider_idle)
+        crawler.signals.connect(self.handle_spider_error, signals.spider_error)
+        crawler.signals.connect(self.handle_scheduling, signals.request_scheduled)
+        crawler.signals.connect(self.read_spider, signals.spider_opened)
 
     def read_spider(self, spider):
         self._cleanup_handler = setup_spider_logging(spider, spider.settings)
 
-    def _get_log_file_path(self):
+    def _get_log_file_path(self, prefix=""):
         log_dir = self.log_dir / self.spider_name
         if not log_dir.exists():
             log_dir.mkdir(parents=True, exist_ok=True)
         time_format = app_settings.SPIDER_LOG_FILE_TIMEFORMAT
-        filename = dt.datetime.now().strftime(time_format) + ".log"
+        filename = prefix + dt.datetime.now().strftime(time_format) + ".log"
         return log_dir / filename
 
+    def _get_settings(self, log_file):
+        custom_settings = get_scrapyrt_settings(log_file=log_file)
+        # Only log settings change from crawl to crawl, so project settings
+        # are built once and log settings are set on top of them.
+        values = {
+            name: custom_settings.pop(name) for name in ("LOG_ENABLED", "LOG_FILE")
+        }
+        snapshot = get_project_settings_snapshot(custom_settings=custom_settings)
+        if self.batch is not None:
+            values["SPIDER_MIDDLEWARES_BASE"] = {
+                **snapshot.getdict(
+                    "SPIDER_MIDDLEWARES_BASE",
+                    scrapy_default_settings.SPIDER_MIDDLEWARES_BASE,
+                ),
+                "scrapyrt.core.BatchMiddleware": 0,
+            }
+        return overlay_settings(snapshot, values)
+
     def get_project_settings(self):
         # set logfile for a job
-        log_file = self._get_log_file_path()
-        custom_settings = get_scrapyrt_settings(log_file=log_file)
-        return get_project_settings(custom_settings=custom_settings)
+        return self._get_settings(self._get_log_file_path())
+
+    def get_resident_settings(self):
+        """Return the settings of a resident crawl of the spider.
+
+        A resident crawl handles the API calls of many crawl managers, so its
+        settings are the project settings with a log file of its own, and
+        never the settings of the call that happens to start it.
+
+        """
+        return self._get_settings(self._get_log_file_path(prefix="resident-"))
 
     def spider_idle(self, spider):
         """Handler of spider_idle signal.
@@ -208,59 +496,130 @@ class CrawlManager:  # pylint: disable=too-many-instance-attributes
 
         """
         assert self.crawler is not None
+        if spider is self.crawler.spider and self.batch and not self._request_scheduled:
+            requests = self._prepare_batch_requests()
+            if requests is None:
+                return
+            for request in requests:
+                spider.crawler.engine.crawl(request)
+            self._request_scheduled = True
+            raise DontCloseSpider
         if (
             spider is self.crawler.spider
             and self.request
             and not self._request_scheduled
         ):
-            try:
-                callback = getattr(self.crawler.spider, self.callback_name)
-                assert callable(callback), "Invalid callback"
-                self.request = self.request.replace(callback=callback)
-            except (AssertionError, AttributeError):
-                msg = f"Invalid spider callback {self.callback_name}, callback not callable or not a method of a spider {self.spider_name}".encode()
-                self.user_error = Error(400, message=msg)
-            try:
-                if self.errback_name:
-                    errback = getattr(self.crawler.spider, self.errback_name)
-                    assert callable(errback), "Invalid errback"
-                    self.request = self.request.replace(errback=errback)
-            except (AssertionError, AttributeError):
-                msg = f"Invalid spider errback {self.errback_name}, errback not callable or not a method of a spider {self.spider_name}".encode()
-                self.user_error = Error(400, message=msg)
-            if self.user_error:
-                log.msg(self.user_error.message, level=log.ERROR)
+            request = self.prepare_request()
+            if request is None:
                 return
-
-            modify_request = getattr(
-                self.crawler.spider,
-                "modify_realtime_request",
-                None,
-            )
-            if callable(modify_request):
-                self.request = modify_request(self.request)
-
-            spider.crawler.engine.crawl(self.request)
+            spider.crawler.engine.crawl(request)
             self._request_scheduled = True
             raise DontCloseSpider
 
+    def prepare_request(self):
+        """Set the callback and errback of the request given to the API.
+
+        :return: request to schedule, or None if the callback or the errback
+            is invalid, in which case user_error is set.
+
+        """
+        request = self._prepare_request(
+            self.request,
+            self.callback_name,
+            self.errback_name,
+        )
+        if request is not None:
+            self.request = request
+        return request
+
+    def _prepare_batch_requests(self):
+        """Prepare the requests of a batch crawl like prepare_request().
+
+        :return: requests to schedule, or None if the callback or the errback
+            of any request is invalid, in which case user_error is set.
+
+        """
+        assert self.batch is not None
+        requests = []
+        for index, batch_request in enumerate(self.batch):
+            request = self._prepare_request(
+                batch_request.request,
+                batch_request.callback_name,
+                batch_request.errback_name,
+            )
+            if request is None:
+                return None
+            requests.append(
+                request.replace(
+                    errback=self._batch_errback(batch_request, request.errback),
+                    meta={**request.meta, BATCH_INDEX_META_KEY: index},
+                ),
+            )
+        return requests
+
+    def _batch_errback(self, batch_request, errback):
+        def record_error(failure):
+            if self.close_reason is None:
+                # Errors after the response of the crawl was sent are
+                # dropped, like items.
+                batch_request.add_error(failure)
+            if errback is None:
+                # Let Scrapy handle the failure as if the request had no
+                # errback.
+                return failure
+            return errback(failure)
+
+        return record_error
+
+    def _prepare_request(self, request, callback_name, errback_name):
+        assert self.crawler is not None
+        try:
+            callback = getattr(self.crawler.spider, callback_name)
+            assert callable(callback), "Invalid callback"
+            request = request.replace(callback=callback)
+        except (AssertionError, AttributeError):
+            msg = f"Invalid spider callback {callback_name}, callback not callable or not a method of a spider {self.spider_name}".encode()
+            self.user_error = Error(400, message=msg)
+        try:
+            if errback_name:
+                errback = getattr(self.crawler.spider, errback_name)
+                assert callable(errback), "Invalid errback"
+                request = request.replace(errback=errback)
+        except (AssertionError, AttributeError):
+            msg = f"Invalid spider errback {errback_name}, errback not callable or not a method of a spider {self.spider_name}".encode()
+            self.user_error = Error(400, message=msg)
+        if self.user_error:
+            log.msg(self.user_error.message, level=log.ERROR)
+            return None
+
+        modify_request = getattr(
+            self.crawler.spider,
+            "modify_realtime_request",
+            None,
+        )
+        if callable(modify_request):
+            request = modify_request(request)
+        return request
+
     def handle_scheduling(self, request, spider):  # pylint: disable=unused-argument
         """Handler of request_scheduled signal.
 
         For every scheduled request check if number of requests is less
-        then limit and runtime doesn't exceed limit as well.
+        then limit and runtime doesn't exceed limit as well. Crawls are also
+        closed by a timer once they run for timeout_limit seconds, see
+        _start_timeout().
 
         """
         assert self.crawler is not None
-        if spider is self.crawler.spider:
+        if spider is self.crawler.spider and self.close_reason is None:
             self.limit_requests(spider)
             self.limit_runtime(spider)
+            self._notify_progress()
 
-    def limit_runtime(self, spider):
+    def limit_runtime(self, spider):  # pylint: disable=unused-argument
         """Stop crawl if it takes too long."""
-        time_now = dt.datetime.now(dt.timezone.utc)
-        if (time_now - self.crawl_start_time).seconds >= self.timeout_limit:
-            spider.crawler.engine.close_spider(spider, reason="timeout")
+        if not self.get_remaining_time():
+            self.close_crawl("timeout")
 
     def limit_requests(self, spider):
         """Stop crawl after reaching max_requests."""
@@ -272,27 +631,155 @@ class CrawlManager:  # pylint: disable=too-many-instance-attributes
         else:
             self.request_count += 1
 
-    def handle_spider_error(self, failure, spider):
+    def handle_spider_error(self, failure, spider, response=None):
         assert self.crawler is not None
-        if spider is self.crawler.spider and self.debug:
+        if spider is not self.crawler.spider or self.close_reason is not None:
+            return
+        if self.debug:
             fail_data = failure.getTraceback()
             self.errors.append(fail_data)
+        index = get_batch_index(response)
+        if self.batch is not None and index is not None:
+            self.batch[index].add_error(failure)
+        self._notify_progress()
 
-    def get_item(self, item, response, spider):  # pylint: disable=unused-argument
+    def get_item(self, item, response, spider):
+        assert self.crawler is not None
+        if spider is not self.crawler.spider:
+            return
+        if self.close_reason is not None:
+            # Scraped while the spider was closing, after the response of
+            # the crawl was sent.
+            return
+        max_items = self.get_max_items()
+        self.item_count += 1
+        if self.projection is not None:
+            item = self.projection.project_item(item)
+        if self.item_handler is not None:
+            self.item_handler(item)
+        else:
+            index = get_batch_index(response)
+            if self.batch is not None and index is not None:
+                self._store_item(item, self.batch[index])
+            else:
+                self._store_item(item)
+        self._notify_progress()
+        if max_items and self.item_count >= max_items:
+            self.close_crawl("closespider_itemcount")
+
+    def get_max_items(self):
+        """Return the maximum number of items of the crawl, from max_items
+        and MAX_ITEMS_PER_CRAWL, or None for no limit.
+        """
+        limits = [
+            limit
+            for limit in (self.max_items, int(app_settings.MAX_ITEMS_PER_CRAWL))
+            if limit
+        ]
+        return min(limits) if limits else None
+
+    def _store_item(self, item, batch_request=None):
+        """Keep an item in the items of the crawl, or of batch_request, or in
+        their spill_file once ITEMS_MEMORY_LIMIT items are in memory.
+        """
+        holder = self if batch_request is None else batch_request
+        limit = int(app_settings.ITEMS_MEMORY_LIMIT)
+        if limit and self.items_in_memory >= limit:
+            if holder.spill_file is None:
+                # Counted once per crawl, whatever the number of files.
+                if self.spill_file is None and not any(
+                    other.spill_file for other in self.batch or ()
+                ):
+                    metrics.inc_value("crawls/spilled")
+                holder.spill_file = SpillFile(app_settings.ITEMS_SPILL_DIR)
+            try:
+                holder.spill_file.write(item)
+            except (pickle.PicklingError, TypeError, AttributeError) as e:
+                # Returned before the spilled items, but not lost.
+                log.msg(
+                    f"Keeping an item in memory, it cannot be pickled: {e}",
+                    level=log.WARNING,
+                )
+            else:
+                return
+        holder.items.append(item)
+        self.items_in_memory += 1
+
+    def close_crawl(self, reason):
+        """Stop the crawl, its response has the items scraped so far."""
+        if self.close_reason is not None:
+            return
+        self.close_reason = reason
+        if self.close_handler is not None:
+            self.close_handler(reason)
+            return
         assert self.crawler is not None
-        if spider is self.crawler.spider:
-            self.items.append(item)
+        if self._crawl_result is not None and not self._crawl_result.called:
+            # The engine only closes once downloads in progress finish, which
+            # may take DOWNLOAD_TIMEOUT, the response does not wait for it.
+            self.crawler.stats.set_value("finish_reason", reason)
+            self._crawl_result.callback(self.return_items(None))
+        engine = self.crawler.engine
+        if engine is not None and engine.spider is not None:
+            engine.close_spider(engine.spider, reason=reason)
 
     def collect_dropped(self, item, response, exception, spider):
         assert self.crawler is not None
-        if spider is self.crawler.spider:
-            self.items_dropped.append(
-                {"item": item, "exception": str(exception), "response": response},
+        if spider is not self.crawler.spider or self.close_reason is not None:
+            return
+        self.items_dropped_count += 1
+        if self.projection is None or self.projection.items_dropped:
+            if self.projection is not None:
+                item = self.projection.project_item(item)
+            record = self._get_dropped_item_record(item, response, exception)
+            if record is not None:
+                self.items_dropped.append(record)
+        self._notify_progress()
+
+    def _get_dropped_item_record(self, item, response, exception):
+        """Return what to keep of a dropped item, depending on
+        DROPPED_ITEMS_DETAIL, or None to keep nothing.
+
+        Responses are not kept, to free their body as soon as possible.
+
+        """
+        detail = app_settings.DROPPED_ITEMS_DETAIL
+        if detail == "none":
+            return None
+        if detail == "summary":
+            max_length = int(app_settings.DROPPED_ITEM_SUMMARY_LENGTH)
+            summary = repr(item)
+            if len(summary) > max_length:
+                summary = summary[:max_length] + "..."
+            item = summary
+        record = {
+            "item": item,
+            "exception": str(exception),
+            "exception_class": type(exception).__name__,
+            "url": None,
+            "status": None,
+            "response": None,
+        }
+        if response is not None:
+            record["url"] = response.url
+            record["status"] = response.status
+            # Formatted like responses in JSON responses of older versions.
+            record["response"] = (
+                f"<{type(response).__name__} {response.status} {response.url}>"
             )
+        return record
+
+    def _notify_progress(self):
+        # The response of closed crawls may be sent already.
+        if self.close_reason is not None:
+            return
+        if self.progress_handler is not None:
+            self.progress_handler()
 
     def return_items(self, result):  # pylint: disable=unused-argument
         assert self.crawler is not None
-        stats = self.crawler.stats.get_stats()
+        stats_collector = self.stats if self.stats is not None else self.crawler.stats
+        stats = stats_collector.get_stats()
         stats = OrderedDict((k, v) for k, v in sorted(stats.items()))
         results = {
             "items": self.items,
@@ -300,13 +787,40 @@ class CrawlManager:  # pylint: disable=too-many-instance-attributes
             "stats": stats,
             "spider_name": self.spider_name,
         }
+        if self.spill_file is not None:
+            # No items are stored once the result of the crawl is returned.
+            self.spill_file.finish()
+            results["items"] = SpilledItems(self.items, self.spill_file)
+        if self.projection is not None:
+            results["stats"] = self.projection.filter_stats(stats)
+            if not self.projection.items_dropped:
+                del results["items_dropped"]
+
+        if self.close_reason is not None:
+            # Stopped before the spider was done, see close_crawl().
+            results["partial"] = True
+            results["stop_reason"] = self.close_reason
 
         results["user_error"] = self.user_error
 
+        if self.batch is not None:
+            results["results"] = [
+                batch_request.get_result() for batch_request in self.batch
+            ]
+
         if self.debug:
             results["errors"] = self.errors
         return results
 
+    def _create_batch_request(self, kwargs):
+        callback_name = kwargs.pop("callback", None) or "parse"
+        errback_name = kwargs.pop("errback", None) or app_settings.DEFAULT_ERRBACK_NAME
+        return BatchRequest(
+            self.create_spider_request(kwargs),
+            callback_name,
+            errback_name,
+        )
+
     def create_spider_request(self, kwargs):
         url = kwargs.pop("url")
         try:
@@ -0,0 +1,112 @@
+"""Download handlers that keep connections open between crawls."""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+
+from scrapy.core.downloader.handlers.http11 import HTTP11DownloadHandler
+from twisted.internet.defer import DeferredList
+from twisted.web.iweb import IPolicyForHTTPS
+from zope.interface import implementer  # type: ignore[import-untyped]
+
+from .conf import app_settings
+from .metrics import metrics
+
+# Settings that affect the connections of a pool, connections are only
+# shared between crawls with the same values for them.
+CONNECTION_SETTINGS = (
+    "CONCURRENT_REQUESTS_PER_DOMAIN",
+    "DOWNLOADER_CLIENTCONTEXTFACTORY",
+    "DOWNLOADER_CLIENT_TLS_CIPHERS",
+    "DOWNLOADER_CLIENT_TLS_METHOD",
+    "DOWNLOADER_CLIENT_TLS_VERBOSE_LOGGING",
+    "DOWNLOAD_BIND_ADDRESS",
+    "DOWNLOAD_TLS_MAX_VERSION",
+    "DOWNLOAD_TLS_MIN_VERSION",
+    "DOWNLOAD_VERIFY_CERTIFICATES",
+)
+
+# Connection pools and TLS context factories shared by all crawls, keyed by
+# the values of CONNECTION_SETTINGS.
+_shared_connections: dict[str, tuple] = {}
+
+
+@implementer(IPolicyForHTTPS)
+class CachingContextFactory:
+    """Context factory that reuses the TLS client options of each host.
+
+    Scrapy context factories create new TLS client options, and so a new
+    OpenSSL context, for every connection.
+
+    """
+
+    def __init__(self, context_factory, max_size=1000):
+        self.context_factory = context_factory
+        self.max_size = max_size
+        self._creators = OrderedDict()
+
+    def creatorForNetloc(self, hostname, port):
+        key = (hostname, port)
+        try:
+            self._creators.move_to_end(key)
+            return self._creators[key]
+        except KeyError:
+            pass
+        creator = self.context_factory.creatorForNetloc(hostname, port)
+        self._creators[key] = creator
+        if len(self._creators) > self.max_size:
+            self._creators.popitem(last=False)
+        return creator
+
+    def __getattr__(self, name):
+        return getattr(self.context_factory, name)
+
+
+class SharedHTTP11DownloadHandler(HTTP11DownloadHandler):
+    """HTTP(S) download handler with connections shared by all crawls.
+
+    Scrapy creates a download handler, with its own connection pool, for
+    every crawl, and closes its connections when the crawl finishes. This
+    handler uses a connection pool that lives as long as the server, so
+    API calls to the same hosts reuse open connections.
+
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        settings = self._crawler.settings
+        key = repr([settings[name] for name in CONNECTION_SETTINGS])
+        try:
+            self._pool, self._contextFactory = _shared_connections[key]
+        except KeyError:
+            max_idle = app_settings.MAX_IDLE_CONNECTIONS_PER_HOST
+            if max_idle is not None:
+                self._pool.maxPersistentPerHost = int(max_idle)
+            self._contextFactory = CachingContextFactory(self._contextFactory)  # type: ignore[assignment]
+            _shared_connections[key] = (self._pool, self._contextFactory)
+            metrics.inc_value("http_connections/pools")
+            if len(_shared_connections) == 1:
+                _close_on_shutdown()
+
+    async def close(self) -> None:
+        """Keep the shared connections open.
+
+        Shared connections are closed when the server stops, not when the
+        crawl finishes. Scrapy versions where the close() method of download
+        handlers returns a Deferred yield its result in inlineCallbacks,
+        which also accepts coroutines.
+
+        """
+
+
+def _close_on_shutdown():
+    from twisted.internet import reactor  # pylint: disable=import-outside-toplevel
+
+    reactor.addSystemEventTrigger("before", "shutdown", close_shared_connections)  # type: ignore[arg-type]
+
+
+def close_shared_connections():
+    """Close the connections of all shared connection pools."""
+    pools = [pool for pool, _ in _shared_connections.values()]
+    _shared_connections.clear()
+    return DeferredList([pool.closeCachedConnections() for pool in pools])
@@ -0,0 +1,154 @@
+"""HTTP cache storage shared by all crawls."""
+
+from __future__ import annotations
+
+import pickle
+import sqlite3
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+from scrapy.utils.project import data_path
+
+from .conf import app_settings
+
+# Shared caches, keyed by database path.
+_shared_caches: dict[str, SharedHttpCache] = {}
+
+
+def _response_to_data(response):
+    return (response.status, response.url, dict(response.headers), response.body)
+
+
+def _response_from_data(data):
+    status, url, headers, body = data
+    headers = Headers(headers)
+    respcls = responsetypes.from_args(headers=headers, url=url, body=body)
+    return respcls(url=url, headers=headers, status=status, body=body)
+
+
+class SharedHttpCache:
+    """Cached responses of all crawls of a process.
+
+    The most recently used responses are kept in memory, up to
+    SHARED_HTTPCACHE_MEMORY_SIZE MiB, in front of a SQLite database that
+    has all cached responses. The database is memory-mapped, so that
+    processes started with --workers share the pages of the database read
+    by any of them through the page cache of the operating system.
+
+    """
+
+    def __init__(self, path, memory_size):
+        self.path = path
+        self.memory_size = memory_size
+        self.size = 0
+        self._entries = OrderedDict()
+        self._db = sqlite3.connect(path, timeout=10, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(f"PRAGMA mmap_size={256 * 1024 * 1024}")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses"
+            " (key TEXT PRIMARY KEY, time REAL, data BLOB)",
+        )
+
+    def get(self, key):
+        """Return the time and pickled data of a response, and whether it
+        was found in memory, or None if it is not cached.
+        """
+        try:
+            entry = self._entries[key]
+        except KeyError:
+            pass
+        else:
+            self._entries.move_to_end(key)
+            return (*entry, True)
+        row = self._db.execute(
+            "SELECT time, data FROM responses WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+        timestamp, data = row[0], bytes(row[1])
+        self._remember(key, timestamp, data)
+        return timestamp, data, False
+
+    def set(self, key, timestamp, data):
+        self._db.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?)",
+            (key, timestamp, data),
+        )
+        self._remember(key, timestamp, data)
+
+    def _remember(self, key, timestamp, data):
+        if key in self._entries:
+            self.size -= len(self._entries.pop(key)[1])
+        if len(data) > self.memory_size:
+            return
+        self._entries[key] = (timestamp, data)
+        self.size += len(data)
+        while self.size > self.memory_size:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+
+
+def get_shared_http_cache(path):
+    try:
+        return _shared_caches[path]
+    except KeyError:
+        pass
+    memory_size = float(app_settings.SHARED_HTTPCACHE_MEMORY_SIZE) * 1024 * 1024
+    cache = _shared_caches[path] = SharedHttpCache(path, memory_size)
+    return cache
+
+
+class SharedCacheStorage:
+    """HTTPCACHE_STORAGE for responses shared between crawls.
+
+    Unlike the storages of Scrapy, which are opened for every crawl and read
+    every response from disk, all crawls of the process use the same
+    SharedHttpCache. HTTPCACHE_POLICY, HTTPCACHE_EXPIRATION_SECS and
+    HTTPCACHE_DIR work as with the storages of Scrapy.
+
+    """
+
+    def __init__(self, settings):
+        cachedir = Path(data_path(settings["HTTPCACHE_DIR"], createdir=True))
+        self.path = str(cachedir / "scrapyrt.sqlite")
+        self.expiration_secs = settings.getint("HTTPCACHE_EXPIRATION_SECS")
+        self.cache = None
+        self.stats = None
+        self._fingerprinter = None
+
+    def open_spider(self, spider):
+        self.cache = get_shared_http_cache(self.path)
+        self.stats = spider.crawler.stats
+        self._fingerprinter = spider.crawler.request_fingerprinter
+
+    def close_spider(self, spider):
+        pass
+
+    def _get_key(self, spider, request):
+        assert self._fingerprinter is not None
+        return f"{spider.name}/{self._fingerprinter.fingerprint(request).hex()}"
+
+    def retrieve_response(self, spider, request):
+        assert self.cache is not None
+        result = self.cache.get(self._get_key(spider, request))
+        if result is None:
+            return None
+        timestamp, data, in_memory = result
+        if 0 < self.expiration_secs < time.time() - timestamp:
+            return None
+        if self.stats is not None:
+            tier = "memory" if in_memory else "disk"
+            self.stats.inc_value(f"httpcache/shared/{tier}_hit")
+        request.meta["cache_timestamp"] = timestamp
+        return _response_from_data(pickle.loads(data))  # noqa: S301
+
+    def store_response(self, spider, request, response):
+        assert self.cache is not None
+        data = pickle.dumps(_response_to_data(response), protocol=4)
+        self.cache.set(self._get_key(spider, request), time.time(), data)
@@ -0,0 +1,172 @@
+"""Crawls run in the background, with results kept for later requests."""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from uuid import uuid4
+
+from twisted.internet.defer import Deferred, succeed
+
+from .conf import app_settings
+from .metrics import metrics
+
+
+class Job:
+    """Crawl started by the jobs resource.
+
+    The crawl manager is kept while the crawl runs, to report progress, and
+    replaced by the response of the crawl once it finishes.
+
+    """
+
+    def __init__(self, spider_name):
+        self.id = uuid4().hex
+        self.spider_name = spider_name
+        self.manager = None
+        self.result = None
+        # "finished" or "failed" once the crawl is over.
+        self._outcome = None
+        self._progress = None
+        self._waiting = []
+
+    @property
+    def finished(self):
+        return self._outcome is not None
+
+    @property
+    def failed(self):
+        return self._outcome == "failed"
+
+    @property
+    def state(self):
+        if self._outcome is not None:
+            return self._outcome
+        if self.manager is None or self.manager.crawler is None:
+            # Waiting for MAX_CONCURRENT_CRAWLS.
+            return "queued"
+        return "running"
+
+    def get_progress(self):
+        if self._progress is not None:
+            return self._progress
+        manager = self.manager
+        if manager is None:
+            return {"requests": 0, "items": 0, "items_dropped": 0}
+        return {
+            "requests": manager.request_count,
+            "items": manager.item_count,
+            "items_dropped": manager.items_dropped_count,
+        }
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "state": self.state,
+            "spider_name": self.spider_name,
+            "progress": self.get_progress(),
+        }
+
+    def finish(self, result, failed=False):
+        """Keep the result of the crawl and fire the deferreds waiting for
+        it.
+        """
+        self._progress = self.get_progress()
+        self.manager = None
+        self.result = result
+        self._outcome = "failed" if failed else "finished"
+        waiting, self._waiting = self._waiting, []
+        for dfd, delayed_call in waiting:
+            delayed_call.cancel()
+            dfd.callback(self)
+
+    def wait(self, timeout, clock):
+        """Return a deferred fired with the job when it finishes, or after
+        timeout seconds.
+        """
+        if self.finished:
+            return succeed(self)
+        dfd: Deferred = Deferred()
+
+        def timed_out():
+            self._waiting.remove(entry)
+            dfd.callback(self)
+
+        entry = (dfd, clock.callLater(timeout, timed_out))
+        self._waiting.append(entry)
+        return dfd
+
+
+class JobStore:
+    """Jobs that are running or finished less than JOB_RESULT_TTL ago.
+
+    Up to MAX_JOBS jobs are kept. When the store is full, the job that
+    finished first is removed to make room for a new job, and new jobs are
+    refused if all jobs are running.
+
+    """
+
+    def __init__(self, clock=None):
+        self.clock = clock
+        self._jobs = {}
+        # Finished jobs in the order they finished, with their expiry time.
+        self._finished = OrderedDict()
+
+    def _get_clock(self):
+        if self.clock is not None:
+            return self.clock
+        from twisted.internet import reactor  # pylint: disable=import-outside-toplevel
+
+        return reactor
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def create(self, spider_name):
+        """Return a new job, or None if MAX_JOBS jobs are running."""
+        self.remove_expired()
+        if len(self._jobs) >= int(app_settings.MAX_JOBS):
+            if not self._finished:
+                metrics.inc_value("jobs/rejected")
+                return None
+            job_id, _ = self._finished.popitem(last=False)
+            del self._jobs[job_id]
+            metrics.inc_value("jobs/evicted")
+        job = Job(spider_name)
+        self._jobs[job.id] = job
+        metrics.inc_value("jobs/created")
+        return job
+
+    def get(self, job_id):
+        self.remove_expired()
+        return self._jobs.get(job_id)
+
+    def remove(self, job):
+        self._jobs.pop(job.id, None)
+        self._finished.pop(job.id, None)
+
+    def remove_expired(self):
+        now = self._get_clock().seconds()
+        while self._finished:
+            job_id, expiry = next(iter(self._finished.items()))
+            if expiry > now:
+                break
+            del self._finished[job_id]
+            del self._jobs[job_id]
+            metrics.inc_value("jobs/expired")
+
+    def finish(self, job, result, failed=False):
+        """Store the result of a job and fire the deferreds waiting for it."""
+        metrics.inc_value("jobs/failed" if failed else "jobs/finished")
+        if job.id in self._jobs:
+            ttl = float(app_settings.JOB_RESULT_TTL)
+            self._finished[job.id] = self._get_clock().seconds() + ttl
+        job.finish(result, failed)
+
+    def wait(self, job, timeout):
+        """Return a deferred fired with the job when it finishes, or after
+        timeout seconds.
+        """
+        return job.wait(timeout, self._get_clock())
+
+
+job_store = JobStore()
@@ -0,0 +1,82 @@
+"""Process-wide counters of the ScrapyRT server."""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+
+
+class Metrics:
+    """Server metrics, with an interface similar to Scrapy stats collectors.
+
+    Unlike crawl stats, which are collected separately for each crawl,
+    metrics are kept for the whole life of the server process.
+
+    """
+
+    def __init__(self):
+        self._metrics = {}
+
+    def get_value(self, key, default=None):
+        return self._metrics.get(key, default)
+
+    def get_metrics(self):
+        return OrderedDict(sorted(self._metrics.items()))
+
+    def set_value(self, key, value):
+        self._metrics[key] = value
+
+    def inc_value(self, key, count=1, start=0):
+        self._metrics[key] = self._metrics.setdefault(key, start) + count
+
+    def max_value(self, key, value):
+        self._metrics[key] = max(self._metrics.setdefault(key, value), value)
+
+    def clear(self):
+        self._metrics.clear()
+
+
+metrics = Metrics()
+
+
+class ReactorLagMonitor:
+    """Measure how long the reactor is blocked.
+
+    A timed call is scheduled every interval seconds, the time it runs after
+    it was due is the lag of the reactor, caused by code that blocks it, like
+    spider callbacks or the serialization of responses. Lags of at least
+    stall_threshold seconds are counted as stalls.
+
+    """
+
+    def __init__(self, interval, stall_threshold, clock=None):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.clock = clock
+        self._due = None
+        self._call = None
+
+    def _get_clock(self):
+        if self.clock is not None:
+            return self.clock
+        from twisted.internet import reactor  # pylint: disable=import-outside-toplevel
+
+        return reactor
+
+    def start(self):
+        clock = self._get_clock()
+        self._due = clock.seconds() + self.interval
+        self._call = clock.callLater(self.interval, self._check)
+
+    def stop(self):
+        if self._call is not None and self._call.active():
+            self._call.cancel()
+        self._call = None
+
+    def _check(self):
+        lag = max(0.0, self._get_clock().seconds() - self._due)
+        metrics.set_value("reactor/lag", round(lag, 3))
+        metrics.max_value("reactor/lag_max", round(lag, 3))
+        if lag >= self.stall_threshold:
+            metrics.inc_value("reactor/stalls")
+            metrics.inc_value("reactor/stall_time", round(lag, 3))
+        self.start()
@@ -0,0 +1,148 @@
+"""Selection of the parts of crawl results that API clients ask for."""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from collections.abc import Mapping
+from fnmatch import fnmatchcase
+
+from itemadapter import ItemAdapter, is_item
+
+# Value of a field that is not in a projected item.
+_MISSING = object()
+
+
+def parse_names(value, name):
+    """Return a list of names given as a list or a comma-separated string."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return [part.strip() for part in value.split(",") if part.strip()]
+    if isinstance(value, list) and all(isinstance(part, str) for part in value):
+        return value
+    msg = f"{name!r} must be a list of strings or a comma-separated string"
+    raise ValueError(msg)
+
+
+def parse_bool(value, name):
+    if isinstance(value, bool):
+        return value
+    if str(value).lower() in ("true", "1"):
+        return True
+    if str(value).lower() in ("false", "0"):
+        return False
+    msg = f"{name!r} must be true or false"
+    raise ValueError(msg)
+
+
+def get_field_tree(fields):
+    """Return the tree of dotted field paths, None being a whole field:
+    ``{"name": None, "offers": {"price": None}}`` for ``name`` and
+    ``offers.price``.
+    """
+    tree: dict = {}
+    for field in fields:
+        node = tree
+        *parents, last = field.split(".")
+        for parent in parents:
+            child = node.get(parent, {})
+            if child is None:
+                # The whole parent field is selected already.
+                break
+            node[parent] = child
+            node = child
+        else:
+            node[last] = None
+    return tree
+
+
+def project(value, tree):
+    """Return the fields of tree from value, a list of values or an item."""
+    if tree is None:
+        return value
+    if isinstance(value, (list, tuple)):
+        return [project(element, tree) for element in value]
+    if not isinstance(value, Mapping):
+        if not is_item(value):
+            return _MISSING
+        value = ItemAdapter(value)
+    result = {}
+    for name, subtree in tree.items():
+        if name not in value:
+            continue
+        field = project(value[name], subtree)
+        if field is not _MISSING:
+            result[name] = field
+    return result
+
+
+class ResponseProjection:
+    """Parts of crawl results that API clients ask for, applied by crawl
+    managers as the crawl runs, so that the other parts are never kept.
+
+    :param fields: item fields to keep, with dots between the names of
+        nested fields, or None to keep whole items.
+    :param stats: patterns of the stats keys to keep, or None to keep all
+        stats.
+    :param exclude_stats: patterns of the stats keys to remove.
+    :param items_dropped: whether to keep dropped items.
+
+    """
+
+    def __init__(
+        self,
+        fields=None,
+        stats=None,
+        exclude_stats=None,
+        items_dropped=True,
+    ):
+        self.fields = fields
+        self.field_tree = None if fields is None else get_field_tree(fields)
+        self.stats = stats
+        self.exclude_stats = exclude_stats or []
+        self.items_dropped = items_dropped
+
+    @classmethod
+    def from_api_params(cls, api_params):
+        """Return the projection asked for in API parameters, or None if
+        there is none.
+
+        :raises ValueError: if a parameter is not valid.
+
+        """
+        if not any(
+            name in api_params
+            for name in ("fields", "stats", "exclude_stats", "items_dropped")
+        ):
+            return None
+        return cls(
+            fields=parse_names(api_params.get("fields"), "fields"),
+            stats=parse_names(api_params.get("stats"), "stats"),
+            exclude_stats=parse_names(api_params.get("exclude_stats"), "exclude_stats"),
+            items_dropped=parse_bool(
+                api_params.get("items_dropped", True),
+                "items_dropped",
+            ),
+        )
+
+    def get_key(self):
+        """Return a JSON-serializable value equal for equal projections."""
+        return [self.fields, self.stats, self.exclude_stats, self.items_dropped]
+
+    def project_item(self, item):
+        """Return the fields of item to keep, as a dict."""
+        if self.field_tree is None:
+            return item
+        return project(item, self.field_tree)
+
+    def filter_stats(self, stats):
+        return OrderedDict(
+            (key, value) for key, value in stats.items() if self._keep_stat(key)
+        )
+
+    def _keep_stat(self, key):
+        if self.stats is not None and not any(
+            fnmatchcase(key, pattern) for pattern in self.stats
+        ):
+            return False
+        return not any(fnmatchcase(key, pattern) for pattern in self.exclude_stats)
@@ -0,0 +1,312 @@
+"""Resident crawls: crawls that stay open to handle many API calls."""
+
+from __future__ import annotations
+
+import datetime as dt
+import inspect
+from dataclasses import dataclass, field
+from functools import partial
+from itertools import count
+from typing import Any
+
+from itemadapter import is_item
+from scrapy import signals
+from scrapy.crawler import Crawler
+from scrapy.exceptions import DontCloseSpider
+from scrapy.http import Request
+from scrapy.statscollectors import StatsCollector
+from scrapy.utils.misc import arg_to_iter
+from twisted.internet.defer import Deferred
+from twisted.python.failure import Failure
+
+from . import log
+from .conf import app_settings
+from .log import setup_spider_logging
+from .metrics import metrics
+
+CALL_ID_META_KEY = "_scrapyrt_call_id"
+
+# Running resident crawls, keyed by spider class.
+_resident_crawls: dict[type, ResidentCrawl] = {}
+
+
+def is_resident_spider(spider_name):
+    spider_names = app_settings.RESIDENT_SPIDERS
+    if isinstance(spider_names, str):
+        spider_names = spider_names.split(",")
+    return spider_name in spider_names
+
+
+def get_resident_crawl(crawler_runner, spidercls, get_settings):
+    """Return the resident crawl of a spider class, starting it if needed.
+
+    ``get_settings`` is only called to start the crawl, so the settings of
+    the crawl never come from the API call that starts it.
+
+    """
+    resident_crawl = _resident_crawls.get(spidercls)
+    if resident_crawl is None:
+        resident_crawl = ResidentCrawl(crawler_runner, spidercls, get_settings())
+        _resident_crawls[spidercls] = resident_crawl
+        resident_crawl.start()
+    return resident_crawl
+
+
+@dataclass
+class ResidentCall:
+    """API call handled by a resident crawl."""
+
+    id: int
+    manager: Any
+    stats: StatsCollector
+    deferred: Deferred[None] = field(default_factory=Deferred)
+    pending_items: int = 0
+    output_done: bool = False
+    timeout: Any = None
+
+
+class ResidentCrawl:
+    """Crawl that stays open and handles the API calls for one spider.
+
+    The request of each API call is scheduled in the running crawl, tagged
+    with an ID in its meta. Items, dropped items and errors are routed back
+    to the CrawlManager of the call by that ID. Requests sent by callbacks
+    are ignored, so each API call gets the output of a single response.
+
+    A call is finished once the callback or errback of its request has
+    returned all its output and all its items went through item pipelines.
+
+    """
+
+    def __init__(self, crawler_runner, spidercls, settings):
+        self.crawler_runner = crawler_runner
+        self.crawler = Crawler(spidercls, settings)
+        self._call_ids = count(1)
+        self._calls = {}
+        self._unscheduled = []
+        self._opened = False
+        self._cleanup_handler = None
+
+    def start(self):
+        crawler = self.crawler
+        crawler.signals.connect(self.spider_opened, signals.spider_opened)
+        crawler.signals.connect(self.spider_idle, signals.spider_idle)
+        crawler.signals.connect(self.spider_closed, signals.spider_closed)
+        crawler.signals.connect(self.response_received, signals.response_received)
+        crawler.signals.connect(self.request_dropped, signals.request_dropped)
+        crawler.signals.connect(self.item_scraped, signals.item_scraped)
+        crawler.signals.connect(self.item_dropped, signals.item_dropped)
+        crawler.signals.connect(self.item_error, signals.item_error)
+        crawler.signals.connect(self.spider_error, signals.spider_error)
+        metrics.inc_value("resident/crawls")
+        log.msg(f"Starting resident crawl for spider {crawler.spidercls.name}")
+        dfd = self.crawler_runner.crawl(crawler)
+        dfd.addBoth(self._crawl_finished)
+
+    def submit(self, manager):
+        """Handle an API call, return a Deferred fired when it is finished."""
+        from twisted.internet import reactor  # pylint: disable=import-outside-toplevel
+
+        call = ResidentCall(next(self._call_ids), manager, StatsCollector(self.crawler))
+        self._calls[call.id] = call
+        manager.crawler = self.crawler
+        manager.stats = call.stats
+        manager.close_handler = partial(self._finish, call)
+        call.stats.set_value("start_time", dt.datetime.now(dt.timezone.utc))
+        call.timeout = reactor.callLater(
+            manager.get_remaining_time(),
+            manager.close_crawl,
+            "timeout",
+        )
+        metrics.inc_value("resident/calls")
+        if self._opened:
+            self._schedule(call)
+        else:
+            self._unscheduled.append(call)
+        return call.deferred
+
+    def _schedule(self, call):
+        if call.id not in self._calls:
+            return
+        request = call.manager.prepare_request()
+        if request is None:
+            self._finish(call, "finished")
+            return
+        call.stats.inc_value("resident/request_count")
+        errback = request.errback or self._default_errback(call)
+        request = request.replace(
+            callback=self._wrap_callback(call, request.callback),
+            errback=self._wrap_callback(call, errback),
+            meta={**request.meta, CALL_ID_META_KEY: call.id},
+        )
+        self.crawler.engine.crawl(request)
+
+    def _get_call(self, request=None, response=None):
+        # The response of items from errbacks is a Failure, which gets a
+        # request attribute as well.
+        if request is None:
+            request = getattr(response, "request", None)
+        if request is None:
+            return None
+        return self._calls.get(request.meta.get(CALL_ID_META_KEY))
+
+    def _wrap_callback(self, call, callback):
+        def callback_wrapper(*args, **kwargs):
+            try:
+                output = callback(*args, **kwargs)
+            except BaseException:
+                self._output_done(call)
+                raise
+            return self._wrap_output(call, output)
+
+        return callback_wrapper
+
+    def _default_errback(self, call):
+        def errback(failure):
+            # Let Scrapy handle the failure as if the request had no errback.
+            self._output_done(call)
+            return failure
+
+        return errback
+
+    def _wrap_output(self, call, output):
+        if isinstance(output, Failure):
+            self._output_done(call)
+            return output
+        if inspect.isasyncgen(output):
+            return self._iterate_async_output(call, output)
+        if inspect.iscoroutine(output):
+            return self._await_output(call, output)
+        return self._iterate_output(call, arg_to_iter(output))
+
+    def _iterate_output(self, call, output):
+        try:
+            for obj in output:
+                if self._accept_output(call, obj):
+                    yield obj
+        finally:
+            self._output_done(call)
+
+    async def _iterate_async_output(self, call, output):
+        try:
+            async for obj in output:
+                if self._accept_output(call, obj):
+                    yield obj
+        finally:
+            self._output_done(call)
+
+    async def _await_output(self, call, coroutine):
+        try:
+            output = await coroutine
+        except BaseException:
+            self._output_done(call)
+            raise
+        return self._wrap_output(call, output)
+
+    def _accept_output(self, call, obj):
+        if isinstance(obj, Request):
+            call.stats.inc_value("resident/request_ignored_count")
+            return False
+        # Scrapy only sends items to item pipelines, other objects (e.g.
+        # None) are ignored or logged as errors and never reach item signals.
+        if is_item(obj):
+            call.pending_items += 1
+        return True
+
+    def _output_done(self, call):
+        call.output_done = True
+        self._maybe_finish(call)
+
+    def _item_done(self, call):
+        call.pending_items = max(call.pending_items - 1, 0)
+        self._maybe_finish(call)
+
+    def _maybe_finish(self, call):
+        if call.output_done and not call.pending_items:
+            self._finish(call, "finished")
+
+    def _finish(self, call, reason):
+        if self._calls.pop(call.id, None) is None:
+            return
+        if call.timeout is not None and call.timeout.active():
+            call.timeout.cancel()
+        finish_time = dt.datetime.now(dt.timezone.utc)
+        elapsed_time = finish_time - call.stats.get_value("start_time")
+        call.stats.set_value("elapsed_time_seconds", elapsed_time.total_seconds())
+        call.stats.set_value("finish_time", finish_time)
+        call.stats.set_value("finish_reason", reason)
+        call.deferred.callback(None)
+
+    def spider_opened(self, spider):
+        self._cleanup_handler = setup_spider_logging(spider, spider.settings)
+        self._opened = True
+        unscheduled, self._unscheduled = self._unscheduled, []
+        for call in unscheduled:
+            self._schedule(call)
+
+    def spider_idle(self, spider):
+        raise DontCloseSpider
+
+    def spider_closed(self, spider, reason):  # pylint: disable=unused-argument
+        self._opened = False
+        if _resident_crawls.get(self.crawler.spidercls) is self:
+            del _resident_crawls[self.crawler.spidercls]
+        for call in list(self._calls.values()):
+            self._finish(call, reason)
+
+    def response_received(self, response, request, spider):  # pylint: disable=unused-argument
+        call = self._get_call(request=request)
+        if call is not None:
+            call.stats.inc_value("response_received_count")
+            call.stats.inc_value(
+                f"downloader/response_status_count/{response.status}",
+            )
+
+    def request_dropped(self, request, spider):  # pylint: disable=unused-argument
+        call = self._get_call(request=request)
+        if call is not None:
+            self._finish(call, "request_dropped")
+
+    def item_scraped(self, item, response, spider):
+        call = self._get_call(response=response)
+        if call is not None:
+            call.stats.inc_value("item_scraped_count")
+            call.manager.get_item(item, response, spider)
+            self._item_done(call)
+
+    def item_dropped(self, item, response, exception, spider):
+        call = self._get_call(response=response)
+        if call is not None:
+            call.stats.inc_value("item_dropped_count")
+            reason = type(exception).__name__
+            call.stats.inc_value(f"item_dropped_reasons_count/{reason}")
+            call.manager.collect_dropped(item, response, exception, spider)
+            self._item_done(call)
+
+    def item_error(self, item, response, spider, failure):  # pylint: disable=unused-argument
+        call = self._get_call(response=response)
+        if call is not None:
+            call.manager.handle_spider_error(failure, spider)
+            self._item_done(call)
+
+    def spider_error(self, failure, response, spider):
+        call = self._get_call(response=response)
+        if call is not None:
+            call.manager.handle_spider_error(failure, spider)
+
+    def _crawl_finished(self, result):
+        if _resident_crawls.get(self.crawler.spidercls) is self:
+            del _resident_crawls[self.crawler.spidercls]
+        if self._cleanup_handler:
+            self._cleanup_handler()
+        self._unscheduled = []
+        calls, self._calls = list(self._calls.values()), {}
+        for call in calls:
+            if call.timeout is not None and call.timeout.active():
+                call.timeout.cancel()
+            if isinstance(result, Failure):
+                call.deferred.errback(result)
+            else:
+                call.deferred.callback(None)
+        if isinstance(result, Failure) and not calls:
+            log.err(result)
@@ -0,0 +1,207 @@
+"""DNS cache shared by all crawls."""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from time import monotonic
+from typing import Any
+from urllib.parse import urlparse
+
+import attr
+from twisted.internet.abstract import isIPAddress, isIPv6Address
+from twisted.internet.interfaces import (
+    IHostnameResolver,
+    IHostResolution,
+    IResolutionReceiver,
+)
+from zope.interface import implementer, provider  # type: ignore[import-untyped]
+
+from .metrics import metrics
+
+# Resolver installed by install_resolver(), if any.
+_resolver: CachingHostnameResolver | None = None
+
+
+def _address_with_port(address, port):
+    if getattr(address, "port", port) == port:
+        return address
+    return attr.evolve(address, port=port)
+
+
+@implementer(IHostResolution)
+@dataclass(eq=False)
+class HostResolution:
+    """Resolution of a host name for one caller."""
+
+    name: str
+    resolver: CachingHostnameResolver
+    receiver: Any = None
+
+    def cancel(self):
+        """Stop passing addresses to the receiver of this resolution.
+
+        The lookup itself goes on, since it is shared by all callers waiting
+        for the same host name and its result is cached.
+
+        """
+        self.resolver.cancel(self)
+
+
+@provider(IResolutionReceiver)
+class _CachingResolutionReceiver:
+    def __init__(self, resolver, host_name):
+        self.resolver = resolver
+        self.host_name = host_name
+        self.addresses = []
+
+    def resolutionBegan(self, resolution):
+        pass
+
+    def addressResolved(self, address):
+        self.addresses.append(_address_with_port(address, 0))
+
+    def resolutionComplete(self):
+        self.resolver.resolved(self.host_name, self.addresses, self)
+
+
+@implementer(IHostnameResolver)
+class CachingHostnameResolver:
+    """Name resolver that caches resolved addresses for all crawls.
+
+    Scrapy only installs its caching resolver when running crawls with
+    CrawlerProcess, so without this resolver every crawl resolves host names
+    again. Addresses are kept for ttl seconds, since the system resolver used
+    by Twisted does not expose the TTL of DNS records. Lookups of a host that
+    is being resolved wait for the pending resolution.
+
+    """
+
+    def __init__(self, reactor, ttl, cache_size=10000, timeout=60):
+        self.reactor = reactor
+        self.original_resolver = reactor.nameResolver
+        self.ttl = ttl
+        self.cache_size = cache_size
+        self.timeout = timeout
+        self._cache = OrderedDict()
+        # Pending lookups, keyed by host name: the receiver of the lookup,
+        # the call that times it out and the resolutions waiting for it.
+        self._pending: dict[str, tuple[Any, Any, list]] = {}
+
+    def install_on_reactor(self):
+        self.reactor.installNameResolver(self)
+
+    def resolveHostName(  # pylint: disable=too-many-positional-arguments
+        self,
+        resolutionReceiver,
+        hostName,
+        portNumber=0,
+        addressTypes=None,
+        transportSemantics="TCP",
+    ):
+        if addressTypes is not None or transportSemantics != "TCP":
+            return self.original_resolver.resolveHostName(
+                resolutionReceiver,
+                hostName,
+                portNumber,
+                addressTypes,
+                transportSemantics,
+            )
+        resolution = HostResolution(hostName, self, resolutionReceiver)
+        resolutionReceiver.resolutionBegan(resolution)
+        addresses = self._get_cached(hostName)
+        if addresses is not None:
+            metrics.inc_value("dns_cache/hit")
+            self._replay(resolutionReceiver, addresses, portNumber)
+            return resolution
+        metrics.inc_value("dns_cache/miss")
+        self._resolve(hostName, resolution, portNumber)
+        return resolution
+
+    def prefetch(self, host_name):
+        """Resolve a host name in the background, if it is not cached."""
+        if self._get_cached(host_name) is None:
+            metrics.inc_value("dns_cache/prefetch")
+            self._resolve(host_name)
+
+    def cancel(self, resolution):
+        """Stop passing addresses to the receiver of a resolution."""
+        pending = self._pending.get(resolution.name)
+        if pending is not None:
+            _, _, waiting = pending
+            waiting[:] = [entry for entry in waiting if entry[0] is not resolution]
+
+    def resolved(self, host_name, addresses, receiver):
+        """Pass the addresses of a finished lookup to the waiting callers."""
+        pending = self._pending.get(host_name)
+        if pending is None or pending[0] is not receiver:
+            # The lookup timed out, its callers already got no addresses.
+            return
+        del self._pending[host_name]
+        _, timeout_call, waiting = pending
+        if timeout_call.active():
+            timeout_call.cancel()
+        # Failed lookups are not cached.
+        if addresses:
+            self._cache[host_name] = (monotonic() + self.ttl, addresses)
+            self._cache.move_to_end(host_name)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        for resolution, port in waiting:
+            self._replay(resolution.receiver, addresses, port)
+
+    def _get_cached(self, host_name):
+        try:
+            expiry, addresses = self._cache[host_name]
+        except KeyError:
+            return None
+        if expiry <= monotonic():
+            del self._cache[host_name]
+            return None
+        # Least recently used host names are removed first.
+        self._cache.move_to_end(host_name)
+        return addresses
+
+    def _resolve(self, host_name, resolution=None, port=0):
+        pending = self._pending.get(host_name)
+        if pending is None:
+            receiver = _CachingResolutionReceiver(self, host_name)
+            timeout_call = self.reactor.callLater(
+                self.timeout,
+                self._time_out,
+                host_name,
+                receiver,
+            )
+            pending = self._pending[host_name] = (receiver, timeout_call, [])
+            self.original_resolver.resolveHostName(receiver, host_name)
+        if resolution is not None:
+            pending[2].append((resolution, port))
+
+    def _time_out(self, host_name, receiver):
+        metrics.inc_value("dns_cache/timeout")
+        self.resolved(host_name, [], receiver)
+
+    def _replay(self, receiver, addresses, port):
+        for address in addresses:
+            receiver.addressResolved(_address_with_port(address, port))
+        receiver.resolutionComplete()
+
+
+def install_resolver(reactor, ttl, cache_size=10000, timeout=60):
+    """Install a CachingHostnameResolver on the reactor."""
+    global _resolver  # noqa: PLW0603  # pylint: disable=global-statement
+    _resolver = CachingHostnameResolver(reactor, ttl, cache_size, timeout)
+    _resolver.install_on_reactor()
+    return _resolver
+
+
+def prefetch_url(url):
+    """Start resolving the host name of a URL, if a resolver is installed."""
+    if _resolver is None or not url:
+        return
+    try:
+        host_name = urlparse(url).hostname
+    except ValueError:
+        return
+    if host_name and not isIPAddress(host_name) and not isIPv6Address(host_name):
+        _resolver.prefetch(host_name)
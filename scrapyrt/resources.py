@@ -1,49 +1,95 @@
 import json
+from functools import partial
 from urllib.parse import unquote
 
+from scrapy import Request
 from scrapy.utils.misc import load_object
 from scrapy.utils.python import to_bytes
-from scrapy.utils.serialize import ScrapyJSONEncoder
-from twisted.internet.defer import Deferred
+from scrapy.utils.request import fingerprint
+from twisted.internet.defer import Deferred, maybeDeferred, succeed
+from twisted.internet.threads import deferToThread
 from twisted.python.failure import Failure
 from twisted.web import resource, server
 from twisted.web.error import Error, UnsupportedMethod
 
 from . import log
+from .cache import get_cache_ttl, get_result_cache
+from .compression import ResponseEncoderFactory
+from .concurrency import ServiceUnavailable, crawl_coalescer, crawl_limiter
 from .conf import app_settings
+from .jobs import job_store
+from .metrics import metrics
+from .projection import ResponseProjection
+from .resolver import prefetch_url
+from .serialization import (
+    JSON_CONTENT_TYPE,
+    AdaptedScrapyJSONEncoder,
+    ScrapyJSONSerializer,
+    SerializedResponse,
+    get_json_serializer,
+    get_response_serializer,
+    iter_dumps,
+)
+from .spill import SpilledItems
+from .streams import ChunkProducer, EventStream, ItemStream
 from .utils import extract_scrapy_request_args
 
 
-class AdaptedScrapyJSONEncoder(ScrapyJSONEncoder):
-    def default(self, o):
-        if isinstance(o, bytes):
-            return o.decode("utf8")
-        return super().default(o)
+def get_item_count(obj):
+    """Return the number of items and dropped items of a response."""
+    if not isinstance(obj, dict):
+        return 0
+    count = len(obj.get("items") or ()) + len(obj.get("items_dropped") or ())
+    for result in obj.get("results") or ():
+        count += get_item_count(result)
+    # Responses of the jobs resource.
+    return count + get_item_count(obj.get("result"))
 
 
 class ServiceResource(resource.Resource):
+    # Encoder of JSON responses if a subclass changes it, JSON_SERIALIZER
+    # otherwise.
     json_encoder = AdaptedScrapyJSONEncoder()
 
     def __init__(self, root=None):
         super().__init__()
         self.root = root
 
+    def getChildWithDefault(self, path, request):
+        """Return the child resource at path, compressing its response if
+        the client accepts it.
+        """
+        child = super().getChildWithDefault(path, request)
+        if isinstance(child, ServiceResource):
+            return resource.EncodingResourceWrapper(child, [ResponseEncoderFactory()])
+        return child
+
     def render(self, request):
         try:
             result = resource.Resource.render(self, request)
         except Exception as e:  # pylint: disable=broad-exception-caught
             result = self.handle_error(e, request)
 
+        if result is server.NOT_DONE_YET:
+            # The response is written by the resource.
+            return result
         if not isinstance(result, Deferred):
-            return self.render_object(result, request)
+            if request.code == 304 or not self.is_large_response(result):  # noqa: PLR2004
+                return self.render_object(result, request)
+            result = succeed(result)
 
         # deferred result - add appropriate callbacks and errbacks
         result.addErrback(self.handle_error, request)
+        result.addCallback(self.render_object_in_thread, request)
 
-        def finish_request(obj):
-            request.write(self.render_object(obj, request))
+        def render_error(failure):
+            return self.render_object(self.handle_error(failure, request), request)
+
+        def finish_request(response):
+            request.write(response)
             request.finish()
 
+        result.addErrback(render_error)
         result.addCallback(finish_request)
         return server.NOT_DONE_YET
 
@@ -71,6 +117,9 @@ class ServiceResource(resource.Resource):
             elif isinstance(exception, Error):
                 code = int(exception.status)
                 request.setResponseCode(code)
+                retry_after = getattr(exception, "retry_after", None)
+                if retry_after is not None:
+                    request.setHeader(b"Retry-After", str(retry_after).encode())
             else:
                 request.setResponseCode(500)
             if request.code == 500:  # noqa: PLR2004
@@ -86,16 +135,85 @@ class ServiceResource(resource.Resource):
         return {"status": "error", "message": msg, "code": request.code}
 
     def render_object(self, obj, request):
-        response = self.json_encoder.encode(obj) + "\n"
-        request.setHeader(b"Content-Type", b"application/json")
+        if request.code == 304:  # noqa: PLR2004
+            # Not Modified responses have no body.
+            return b""
+        if isinstance(obj, SerializedResponse):
+            return self.render_body(obj.body, obj.content_type, request)
+        content_type, serializer = self.get_serializer(request)
+        return self.render_body(serializer.dumps(obj), content_type, request)
+
+    def render_body(self, body, content_type, request):
+        if content_type == JSON_CONTENT_TYPE:
+            body += b"\n"
+        self.set_headers(request, content_type)
+        request.setHeader(b"Content-Length", str(len(body)).encode())
+        return body
+
+    def render_object_in_thread(self, obj, request):
+        """Like render_object(), but return a Deferred and serialize large
+        responses in a thread, so that other crawls keep running meanwhile.
+        """
+        if request.code == 304 or isinstance(obj, SerializedResponse):  # noqa: PLR2004
+            return succeed(self.render_object(obj, request))
+        content_type, serializer = self.get_serializer(request)
+        dfd = self.serialize_in_thread(obj, serializer)
+        dfd.addCallback(self.render_body, content_type, request)
+        return dfd
+
+    def serialize_in_thread(self, obj, serializer=None):
+        """Return a Deferred fired with obj serialized, as JSON by default,
+        in a thread if it is a large response.
+        """
+        if serializer is None:
+            serializer = self.get_json_serializer()
+        return self.run_serialization(obj, serializer.dumps, obj)
+
+    def run_serialization(self, obj, func, *args):
+        """Return a Deferred fired with the result of func(*args), called in
+        a thread if obj is a large response.
+        """
+        if not self.is_large_response(obj):
+            return maybeDeferred(func, *args)
+        metrics.inc_value("serialization/threaded")
+        return deferToThread(func, *args)
+
+    def is_large_response(self, obj):
+        """Return True if obj has at least THREADED_SERIALIZATION_MIN_ITEMS
+        items.
+        """
+        min_items = int(app_settings.THREADED_SERIALIZATION_MIN_ITEMS)
+        return 0 < min_items <= get_item_count(obj)
+
+    def encode_json(self, obj):
+        """Return obj as JSON bytes, see get_json_serializer()."""
+        return self.get_json_serializer().dumps(obj)
+
+    def get_json_serializer(self):
+        """Return the serializer of JSON responses: the one set in
+        JSON_SERIALIZER, or one using json_encoder if a subclass sets it.
+        """
+        if self.json_encoder is ServiceResource.json_encoder:
+            return get_json_serializer()
+        return ScrapyJSONSerializer(self.json_encoder)
+
+    def get_serializer(self, request):
+        """Return the content type and the serializer of the response to
+        request, negotiated with its Accept header.
+        """
+        content_type, serializer = get_response_serializer(request)
+        if content_type == JSON_CONTENT_TYPE:
+            serializer = self.get_json_serializer()
+        return content_type, serializer
+
+    def set_headers(self, request, content_type):
+        request.setHeader(b"Content-Type", content_type)
         request.setHeader(b"Access-Control-Allow-Origin", b"*")
         request.setHeader(
             b"Access-Control-Allow-Methods",
             b", ".join(getattr(self, "allowedMethods", [])),
         )
         request.setHeader(b"Access-Control-Allow-Headers", b"X-Requested-With")
-        request.setHeader(b"Content-Length", str(len(response)).encode())
-        return response.encode("utf-8")
 
 
 class RealtimeApi(ServiceResource):
@@ -106,9 +224,18 @@ class RealtimeApi(ServiceResource):
             self.putChild(to_bytes(route), resource_cls(self, **kwargs))
 
 
+class MetricsResource(ServiceResource):
+    isLeaf = True
+    allowedMethods = (b"GET",)
+
+    def render_GET(self, request, **kwargs):  # pylint: disable=unused-argument
+        return {"status": "ok", "metrics": metrics.get_metrics()}
+
+
 class CrawlResource(ServiceResource):
     isLeaf = True
     allowedMethods = (b"GET", b"POST")
+    stream_class: type[ItemStream] = ItemStream
 
     def render_GET(self, request, **kwargs):  # pylint: disable=invalid-name
         """Request querysting must contain following keys: url, spider_name.
@@ -123,7 +250,7 @@ class CrawlResource(ServiceResource):
         scrapy_request_args = extract_scrapy_request_args(api_params, raise_error=False)
         self.validate_options(scrapy_request_args, api_params)
 
-        return self.prepare_crawl(api_params, scrapy_request_args, **kwargs)
+        return self.render_crawl(request, api_params, scrapy_request_args, **kwargs)
 
     def render_POST(self, request, **kwargs):  # pylint: disable=invalid-name
         """
@@ -149,6 +276,9 @@ class CrawlResource(ServiceResource):
             raise Error(400, message=message) from e
 
         log.msg(f"{api_params}")
+        if "requests" in api_params:
+            scrapy_request_args = self.get_batch_request_args(api_params)
+            return self.render_crawl(request, api_params, scrapy_request_args, **kwargs)
         if api_params.get("spider_start") or api_params.get("start_requests"):
             # start requests passed so 'request' argument is optional
             _request = api_params.get("request", {})
@@ -164,7 +294,31 @@ class CrawlResource(ServiceResource):
             raise Error(400, str(e).encode()) from e
 
         self.validate_options(scrapy_request_args, api_params)
-        return self.prepare_crawl(api_params, scrapy_request_args, **kwargs)
+        return self.render_crawl(request, api_params, scrapy_request_args, **kwargs)
+
+    def get_batch_request_args(self, api_params):
+        """Return the Scrapy Request arguments of each request of a batch."""
+        if "request" in api_params:
+            raise Error(400, b"'request' and 'requests' cannot be used together")
+        requests = api_params["requests"]
+        if not isinstance(requests, list) or not requests:
+            raise Error(400, b"'requests' must be a non-empty list of requests")
+        if len(requests) > int(app_settings.MAX_BATCH_REQUESTS):
+            message = f"'requests' cannot have more than {app_settings.MAX_BATCH_REQUESTS} requests"
+            raise Error(400, message.encode())
+        batch_request_args = []
+        for request in requests:
+            try:
+                scrapy_request_args = extract_scrapy_request_args(
+                    request,
+                    raise_error=True,
+                )
+            except (AttributeError, ValueError) as e:
+                raise Error(400, str(e).encode()) from e
+            if not scrapy_request_args.get("url"):
+                raise Error(400, b"'url' is required for every request of a batch")
+            batch_request_args.append(scrapy_request_args)
+        return batch_request_args
 
     def validate_options(self, scrapy_request_args, api_params):
         url = scrapy_request_args.get("url")
@@ -207,11 +361,92 @@ class CrawlResource(ServiceResource):
             Request object that will be created
         """
         spider_name = self.get_required_argument(api_params, "spider_name")
+        if app_settings.DNS_PREFETCH:
+            # Resolve host names while the crawl is being set up.
+            if isinstance(scrapy_request_args, list):
+                for request_args in scrapy_request_args:
+                    prefetch_url(request_args["url"])
+            else:
+                prefetch_url(scrapy_request_args.get("url"))
+        max_requests = self.get_max_requests(api_params)
+        crawl_args = self.get_crawl_args(api_params)
+        projection = self.get_projection(api_params)
+        max_items = self.get_max_items(api_params)
+        timeout = self.get_timeout(api_params)
+
+        run_crawl = self.run_crawl
+        # Arguments added by subclasses are not part of the key.
+        if (
+            app_settings.COALESCE_CRAWLS
+            and not args
+            and not kwargs
+            and str(api_params.get("coalesce", True)).lower() not in ("false", "0")
+        ):
+            key = self.get_crawl_key(
+                spider_name,
+                scrapy_request_args,
+                api_params,
+                max_requests,
+                crawl_args,
+            )
+            if key is not None:
+                run_crawl = partial(crawl_coalescer.run, key, self.run_crawl)
+        dfd = run_crawl(
+            spider_name,
+            scrapy_request_args,
+            max_requests,
+            start_requests=api_params.get("start_requests"),
+            crawl_args=crawl_args,
+            spider_start=api_params.get("spider_start"),
+            *args,  # noqa: B026
+            projection=projection,
+            max_items=max_items,
+            timeout=timeout,
+            **kwargs,  # type: ignore[misc]
+        )
+        dfd.addCallback(self.prepare_response, request_data=api_params, *args, **kwargs)  # noqa: B026
+        return dfd
+
+    def get_max_requests(self, api_params):
         try:
-            max_requests = api_params["max_requests"]
+            return api_params["max_requests"]
         except (KeyError, IndexError):
-            max_requests = None
+            return None
 
+    def get_max_items(self, api_params):
+        value = api_params.get("max_items")
+        if value is None:
+            return None
+        try:
+            max_items = int(value)
+        except (TypeError, ValueError):
+            max_items = 0
+        if max_items <= 0:
+            raise Error(400, message=b"'max_items' must be a positive integer")
+        return max_items
+
+    def get_timeout(self, api_params):
+        value = api_params.get("timeout")
+        if value is None:
+            return None
+        try:
+            timeout = float(value)
+        except (TypeError, ValueError):
+            timeout = 0
+        if not timeout > 0:
+            raise Error(400, message=b"'timeout' must be a positive number")
+        return timeout
+
+    def get_projection(self, api_params):
+        """Return the ResponseProjection asked for in API parameters, or
+        None.
+        """
+        try:
+            return ResponseProjection.from_api_params(api_params)
+        except ValueError as e:
+            raise Error(400, message=str(e).encode()) from e
+
+    def get_crawl_args(self, api_params):
         crawl_args = api_params.get("crawl_args")
         if isinstance(crawl_args, str):
             try:
@@ -221,20 +456,219 @@ class CrawlResource(ServiceResource):
                 msg += " this string cannot be decoded with JSON"
                 msg += f" {e!s}"
                 raise Error(400, message=msg.encode()) from e
+        return crawl_args
 
-        dfd = self.run_crawl(
+    def render_crawl(self, request, api_params, scrapy_request_args, **kwargs):
+        """Return the cached response of a crawl, or run the crawl and cache
+        its response, if RESULT_CACHE is set.
+        """
+        if self.is_stream_requested(request, api_params):
+            if "requests" in api_params:
+                # Streamed items are not grouped by request.
+                raise Error(400, b"Batch crawls cannot be streamed")
+            return self.render_stream(
+                request,
+                api_params,
+                scrapy_request_args,
+                **kwargs,
+            )
+        cache = get_result_cache()
+        spider_name = api_params.get("spider_name")
+        if cache is None or kwargs or get_cache_ttl(spider_name) <= 0:
+            return self.prepare_crawl(api_params, scrapy_request_args, **kwargs)
+        key = self.get_crawl_key(
             spider_name,
             scrapy_request_args,
-            max_requests,
-            start_requests=api_params.get("start_requests"),
-            crawl_args=crawl_args,
-            spider_start=api_params.get("spider_start"),
-            *args,  # noqa: B026
-            **kwargs,  # type: ignore[misc]
+            api_params,
+            self.get_max_requests(api_params),
+            self.get_crawl_args(api_params),
+        )
+        if key is None:
+            return self.prepare_crawl(api_params, scrapy_request_args, **kwargs)
+        # Responses are cached in each format clients asked for.
+        content_type, serializer = self.get_serializer(request)
+        key = f"{content_type.decode()} {key}"
+        if b"no-cache" not in self._get_cache_directives(request):
+            cached = self._get_cached_response(request, cache, key, content_type)
+            if cached is not None:
+                return cached
+        dfd = self.prepare_crawl(api_params, scrapy_request_args)
+        store = partial(cache.set, key, ttl=get_cache_ttl(spider_name))
+        dfd.addCallback(
+            self._cache_response,
+            request,
+            store,
+            content_type,
+            serializer,
         )
-        dfd.addCallback(self.prepare_response, request_data=api_params, *args, **kwargs)  # noqa: B026
         return dfd
 
+    def _get_cache_directives(self, request):
+        cache_control = request.getHeader(b"Cache-Control") or b""
+        return {value.strip().lower() for value in cache_control.split(b",")}
+
+    def _get_cached_response(self, request, cache, key, content_type):
+        cached = cache.get(key)
+        if cached is None:
+            metrics.inc_value("result_cache/miss")
+            return None
+        metrics.inc_value("result_cache/hit")
+        etag, body = cached
+        return self._render_cached(
+            request,
+            etag,
+            SerializedResponse(content_type, body),
+        )
+
+    def _cache_response(  # pylint: disable=too-many-positional-arguments
+        self,
+        response,
+        request,
+        store,
+        content_type,
+        serializer,
+    ):
+        """Serialize the response of a crawl with serializer, cache it with
+        store(body) and return it serialized.
+        """
+        if isinstance(response.get("items"), SpilledItems):
+            # Too large to cache.
+            return response
+        if response.get("stop_reason") == "timeout":
+            # The next crawl may have time to finish.
+            return response
+
+        def cache_body(body):
+            etag = store(body)
+            return self._render_cached(
+                request,
+                etag,
+                SerializedResponse(content_type, body),
+            )
+
+        return self.serialize_in_thread(response, serializer).addCallback(cache_body)
+
+    def is_stream_requested(self, request, api_params):
+        if str(api_params.get("stream", False)).lower() in ("true", "1"):
+            return True
+        accept = request.getHeader(b"Accept") or b""
+        return ItemStream.content_type in accept.lower()
+
+    def render_stream(self, request, api_params, scrapy_request_args, **kwargs):
+        """Run a crawl and write its items as JSON lines as they are scraped,
+        followed by the response of the crawl without items.
+        """
+        stream = self.stream_class(request, self)
+        dfd = self.prepare_crawl(
+            api_params,
+            scrapy_request_args,
+            stream=stream,
+            **kwargs,
+        )
+
+        def remove_items(response):
+            del response["items"]
+            return response
+
+        dfd.addCallback(remove_items)
+        dfd.addErrback(self.handle_error, request)
+        dfd.addCallback(stream.finish)
+        return server.NOT_DONE_YET
+
+    def render_object_in_thread(self, obj, request):
+        items = obj.get("items") if isinstance(obj, dict) else None
+        if isinstance(items, SpilledItems) and request.code != 304:  # noqa: PLR2004
+            return self.render_spilled(obj, items, request)
+        return super().render_object_in_thread(obj, request)
+
+    def render_spilled(self, obj, items, request):
+        """Write a response whose items are partly in a SpillFile.
+
+        Items are serialized as the client reads the response, they are
+        never all loaded in memory. Items are the last key of the response.
+
+        :return: Deferred fired with the end of the response.
+
+        """
+        content_type, serializer = self.get_serializer(request)
+        response = {key: value for key, value in obj.items() if key != "items"}
+        self.set_headers(request, content_type)
+        producer = ChunkProducer(
+            request,
+            iter_dumps(serializer, response, "items", items),
+        )
+        dfd = producer.start()
+        if content_type == JSON_CONTENT_TYPE:
+            dfd.addCallback(lambda _: b"\n")
+        else:
+            dfd.addCallback(lambda _: b"")
+        return dfd
+
+    def _render_cached(self, request, etag, response):
+        """Set the ETag of a response, and return an empty 304 response if
+        the client has it already.
+        """
+        request.setHeader(b"ETag", etag)
+        if_none_match = request.getHeader(b"If-None-Match") or b""
+        # Compressed responses have weak ETags, see ResponseEncoder.
+        tags = {tag.strip().removeprefix(b"W/") for tag in if_none_match.split(b",")}
+        if etag in tags or b"*" in tags:
+            request.setResponseCode(304)
+        return response
+
+    def get_crawl_key(  # pylint: disable=too-many-positional-arguments
+        self,
+        spider_name,
+        scrapy_request_args,
+        api_params,
+        max_requests,
+        crawl_args,
+    ):
+        """Return the key of crawls that have the same result, or None if
+        the crawl is not comparable with other crawls.
+
+        Only crawls of GET and HEAD requests are comparable, requests with
+        other methods may change something on each crawl.
+
+        """
+        if isinstance(scrapy_request_args, list):
+            return None
+        request_args = dict(scrapy_request_args)
+        request_fingerprint = None
+        if request_args.get("url"):
+            try:
+                request = Request(
+                    request_args.pop("url"),
+                    method=request_args.pop("method", "GET"),
+                    body=request_args.pop("body", None),
+                )
+            except (TypeError, ValueError):
+                return None
+            if request.method not in ("GET", "HEAD"):
+                return None
+            request_fingerprint = fingerprint(request).hex()
+        spider_start = api_params.get("spider_start") or api_params.get(
+            "start_requests",
+        )
+        projection = self.get_projection(api_params)
+        # Request arguments other than those in the fingerprint, like meta,
+        # headers or the callback, can change the result of the crawl.
+        return json.dumps(
+            [
+                spider_name,
+                request_fingerprint,
+                request_args,
+                max_requests,
+                crawl_args,
+                bool(spider_start),
+                None if projection is None else projection.get_key(),
+                self.get_max_items(api_params),
+                self.get_timeout(api_params),
+            ],
+            sort_keys=True,
+            default=repr,
+        )
+
     def run_crawl(  # noqa: PLR0913  # pylint: disable=keyword-arg-before-vararg,too-many-positional-arguments
         self,
         spider_name,
@@ -244,19 +678,37 @@ class CrawlResource(ServiceResource):
         start_requests=None,
         spider_start=None,
         *args,
+        projection=None,
+        max_items=None,
+        timeout=None,
         **kwargs,
     ):
         crawl_manager_cls = load_object(app_settings.CRAWL_MANAGER)
+        manager_kwargs = {}
+        # Custom CRAWL_MANAGER classes may not accept these arguments.
+        if projection is not None:
+            manager_kwargs["projection"] = projection
+        if max_items is not None:
+            manager_kwargs["max_items"] = max_items
+        if timeout is not None:
+            manager_kwargs["timeout"] = timeout
         manager = crawl_manager_cls(
             spider_name,
             scrapy_request_args,
             max_requests,
             start_requests=start_requests,
             spider_start=spider_start,
+            **manager_kwargs,
         )
         if crawl_args:
             kwargs.update(crawl_args)
-        return manager.crawl(*args, **kwargs)
+        return self.start_crawl(manager, *args, **kwargs)
+
+    def start_crawl(self, manager, *args, **kwargs):
+        stream = kwargs.pop("stream", None)
+        if stream is not None:
+            stream.attach(manager)
+        return crawl_limiter.run_crawl(manager, *args, **kwargs)
 
     def prepare_response(self, result, request_data, *_args, **_kwargs):
         items = result.get("items")
@@ -270,6 +722,14 @@ class CrawlResource(ServiceResource):
             "stats": result.get("stats"),
             "spider_name": result.get("spider_name"),
         }
+        projection = self.get_projection(request_data)
+        if projection is not None and not projection.items_dropped:
+            del response["items_dropped"]
+        if result.get("partial"):
+            response["partial"] = True
+            response["stop_reason"] = result.get("stop_reason")
+        if "results" in result:
+            response["results"] = result["results"]
         errors = result.get("errors")
         if errors:
             response["errors"] = errors
@@ -278,3 +738,108 @@ class CrawlResource(ServiceResource):
                 "The start_requests parameter is deprecated, use spider_start instead.",
             ]
         return response
+
+
+class EventsResource(CrawlResource):
+    """Run crawls like crawl.json, sending their progress and items as
+    server-sent events.
+
+    A progress event is sent when the crawl makes progress, at most every
+    EVENTS_PROGRESS_INTERVAL seconds, an item event is sent for every item,
+    and a result event with the crawl.json response without items ends the
+    response.
+
+    """
+
+    stream_class = EventStream
+
+    def is_stream_requested(self, request, api_params):
+        return True
+
+
+class JobsResource(CrawlResource):
+    """Run crawls in the background.
+
+    POST starts a crawl with the arguments of a crawl.json POST and returns
+    the id of its job right away. GET /<job id> returns the state and
+    progress of the job, and the crawl.json response once the crawl finished.
+    The wait argument makes GET wait for up to that many seconds for the crawl
+    to finish.
+
+    """
+
+    def render_GET(self, request, **kwargs):
+        job_id = b"/".join(request.postpath).decode("utf-8", "replace")
+        if not job_id:
+            raise Error(400, message=b"Missing job id")
+        job = job_store.get(job_id)
+        if job is None:
+            raise Error(404, message=f"Job not found: {job_id}".encode())
+        try:
+            wait = float(request.args.get(b"wait", [b"0"])[0])
+        except ValueError as e:
+            raise Error(400, message=b"wait must be a number of seconds") from e
+        wait = min(wait, float(app_settings.MAX_JOB_WAIT))
+        if wait > 0 and not job.finished:
+            dfd = job_store.wait(job, wait)
+            dfd.addCallback(self.prepare_job_response)
+            return dfd
+        return self.prepare_job_response(job)
+
+    def render_POST(self, request, **kwargs):
+        result = super().render_POST(request, **kwargs)
+        request.setResponseCode(202)
+        return result
+
+    def render_crawl(self, request, api_params, scrapy_request_args, **kwargs):
+        # Jobs are not cached, their response is not the crawl response.
+        return self.prepare_crawl(api_params, scrapy_request_args, **kwargs)
+
+    def prepare_crawl(self, api_params, scrapy_request_args, *args, **kwargs):
+        job = job_store.create(api_params.get("spider_name"))
+        if job is None:
+            retry_after = int(app_settings.CRAWL_RETRY_AFTER)
+            raise ServiceUnavailable(b"Too many jobs", retry_after)
+        try:
+            dfd = super().prepare_crawl(
+                api_params,
+                scrapy_request_args,
+                *args,
+                job=job,
+                **kwargs,
+            )
+        except Exception:
+            job_store.remove(job)
+            raise
+        dfd.addCallbacks(
+            self.handle_job_result,
+            self.handle_job_error,
+            callbackArgs=(job,),
+            errbackArgs=(job,),
+        )
+        return self.prepare_job_response(job)
+
+    def start_crawl(self, manager, *args, job, **kwargs):  # pylint: disable=arguments-differ
+        job.manager = manager
+        return super().start_crawl(manager, *args, **kwargs)
+
+    def handle_job_result(self, result, job):
+        job_store.finish(job, result)
+
+    def handle_job_error(self, failure, job):
+        """Store the crawl.json error response of a failed crawl."""
+        exception = failure.value
+        if isinstance(exception, Error):
+            code = int(exception.status)
+        else:
+            code = 500
+            log.err(failure)
+        message = exception.message if hasattr(exception, "message") else str(exception)
+        result = {"status": "error", "message": message, "code": code}
+        job_store.finish(job, result, failed=True)
+
+    def prepare_job_response(self, job):
+        response = {"status": "ok", "job": job.to_dict()}
+        if job.finished:
+            response["result"] = job.result
+        return response
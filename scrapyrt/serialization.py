@@ -0,0 +1,328 @@
+"""Serializers of API responses.
+
+JSON responses use the serializer set in JSON_SERIALIZER, clients can ask
+for the other formats of RESPONSE_SERIALIZERS with the Accept header.
+
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import json
+import struct
+import weakref
+from typing import Any, NamedTuple
+
+from scrapy import Item
+from scrapy.utils.misc import load_object
+from scrapy.utils.serialize import ScrapyJSONEncoder
+
+from . import log
+from .conf import app_settings
+from .spill import SpilledItems
+from .utils import parse_accept_header
+
+JSON_CONTENT_TYPE = b"application/json"
+
+# Serializers created by load_serializer(), keyed by import path.
+_serializers: dict[str, Any] = {}
+
+# Serializers of RESPONSE_SERIALIZERS whose library is missing, already
+# reported in the log.
+_unavailable_serializers: set[str] = set()
+
+# Content types and serializers negotiated for requests, see
+# get_response_serializer().
+_negotiated: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+class SerializedResponse(NamedTuple):
+    """Response body that is already serialized, e.g. a cached response."""
+
+    content_type: bytes
+    body: bytes
+
+
+class AdaptedScrapyJSONEncoder(ScrapyJSONEncoder):
+    def default(self, o):
+        if isinstance(o, bytes):
+            return o.decode("utf8")
+        if isinstance(o, Item):
+            # Much faster than the deep copy of ItemAdapter.asdict(), nested
+            # items are converted when they are encoded.
+            return dict(o)
+        if isinstance(o, SpilledItems):
+            return list(o)
+        return super().default(o)
+
+
+def load_serializer(path):
+    """Return the serializer with the given import path."""
+    try:
+        return _serializers[path]
+    except KeyError:
+        pass
+    serializer = _serializers[path] = load_object(path)()
+    return serializer
+
+
+def get_json_serializer():
+    """Return the serializer set in JSON_SERIALIZER."""
+    return load_serializer(app_settings.JSON_SERIALIZER)
+
+
+def get_response_serializers():
+    serializers = app_settings.RESPONSE_SERIALIZERS or {}
+    if isinstance(serializers, str):
+        # Set with the -s command line option.
+        serializers = json.loads(serializers)
+    return serializers
+
+
+def get_response_serializer(request):
+    """Return the content type and the serializer of the response to
+    request: the format of RESPONSE_SERIALIZERS preferred by the client, or
+    JSON. The format is negotiated once per request.
+    """
+    try:
+        return _negotiated[request]
+    except KeyError:
+        pass
+    negotiated = _negotiated[request] = _negotiate_serializer(request)
+    return negotiated
+
+
+def _negotiate_serializer(request):
+    serializers = get_response_serializers()
+    if not serializers:
+        return JSON_CONTENT_TYPE, get_json_serializer()
+    # The response depends on Accept even if it is JSON.
+    request.responseHeaders.addRawHeader(b"Vary", b"Accept")
+    header = b",".join(request.requestHeaders.getRawHeaders(b"Accept", []))
+    qualities = parse_accept_header(header.decode("latin-1"))
+
+    def get_quality(content_type):
+        main_type = content_type.partition("/")[0]
+        return qualities.get(
+            content_type,
+            qualities.get(f"{main_type}/*", qualities.get("*/*", 0.0)),
+        )
+
+    while True:
+        # JSON is preferred when qualities are equal, and when the client
+        # accepts none of the formats.
+        best_quality = get_quality(JSON_CONTENT_TYPE.decode()) if qualities else 1.0
+        best_content_type, best_path = JSON_CONTENT_TYPE, None
+        for content_type, path in serializers.items():
+            quality = get_quality(content_type.lower())
+            if quality > best_quality and path not in _unavailable_serializers:
+                best_quality = quality
+                best_content_type, best_path = content_type.encode(), path
+        if best_path is None:
+            return best_content_type, get_json_serializer()
+        try:
+            return best_content_type, load_serializer(best_path)
+        except ImportError as e:
+            _unavailable_serializers.add(best_path)
+            log.msg(
+                f"Disabling {best_content_type.decode()} responses: {e}",
+                level=log.WARNING,
+            )
+
+
+def iter_dumps(serializer, obj, key, values):
+    """Yield obj serialized with serializer in chunks of bytes, with a key
+    whose value is the list of the values of an iterable, serialized one by
+    one, last.
+
+    Serializers without an iter_dumps() method get the whole list at once.
+
+    """
+    if hasattr(serializer, "iter_dumps"):
+        yield from serializer.iter_dumps(obj, key, values)
+    else:
+        yield serializer.dumps({**obj, key: list(values)})
+
+
+def iter_json_dumps(dumps, obj, key, values):
+    """iter_dumps() of JSON serializers, dumps being their dumps()."""
+    head = dumps(obj)[:-1]
+    if obj:
+        head += b", "
+    yield head + dumps(key) + b": ["
+    for index, value in enumerate(values):
+        yield dumps(value) if not index else b",\n" + dumps(value)
+    yield b"]}"
+
+
+class ScrapyJSONSerializer:
+    """Serializer using the json module of the standard library, with the
+    encoder of Scrapy for items, dates, decimals and bytes.
+
+    :param encoder: JSON encoder to use instead, see
+        ServiceResource.json_encoder.
+
+    """
+
+    def __init__(self, encoder=None):
+        self.encoder = encoder or AdaptedScrapyJSONEncoder()
+
+    def dumps(self, obj):
+        """Return obj as JSON bytes."""
+        return self.encoder.encode(obj).encode("utf-8")
+
+    def iter_dumps(self, obj, key, values):
+        return iter_json_dumps(self.dumps, obj, key, values)
+
+
+class OrjsonSerializer:
+    """Serializer using orjson.
+
+    Objects orjson does not support, like items and bytes, and dates, which
+    orjson formats differently, are converted by the encoder of
+    ScrapyJSONSerializer. Objects orjson cannot serialize even then, like
+    integers over 64 bits, are serialized by ScrapyJSONSerializer.
+
+    """
+
+    def __init__(self):
+        try:
+            import orjson  # noqa: PLC0415  # pylint: disable=import-outside-toplevel
+        except ImportError as e:
+            msg = (
+                "OrjsonSerializer requires orjson, install it with: pip install orjson"
+            )
+            raise ImportError(msg) from e
+        self._orjson = orjson
+        self.fallback = ScrapyJSONSerializer()
+        self.option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def dumps(self, obj):
+        """Return obj as JSON bytes."""
+        try:
+            return self._orjson.dumps(
+                obj,
+                default=self.fallback.encoder.default,
+                option=self.option,
+            )
+        except TypeError:
+            return self.fallback.dumps(obj)
+
+    def iter_dumps(self, obj, key, values):
+        return iter_json_dumps(self.dumps, obj, key, values)
+
+
+class BinarySerializer:  # pylint: disable=too-few-public-methods
+    """Base class of the serializers of binary formats.
+
+    Unlike JSON, these formats have types of their own for bytes and dates:
+    bytes are kept as they are, and dates of stats are serialized as dates,
+    naive ones being in UTC like the dates of Scrapy stats. Objects the
+    format does not support are converted by the encoder of JSON responses.
+
+    """
+
+    def __init__(self):
+        self.encoder = ScrapyJSONEncoder()
+
+    def convert(self, o):
+        """Return an object the format supports in place of o."""
+        if isinstance(o, Item):
+            return dict(o)
+        if isinstance(o, SpilledItems):
+            return list(o)
+        if isinstance(o, dt.datetime) and o.tzinfo is None:
+            return o.replace(tzinfo=dt.timezone.utc)
+        return self.encoder.default(o)
+
+
+class MsgpackSerializer(BinarySerializer):
+    """Serializer using msgpack, dates being MessagePack timestamps."""
+
+    def __init__(self):
+        try:
+            import msgpack  # type: ignore[import-untyped,import-not-found]  # noqa: PLC0415  # pylint: disable=import-outside-toplevel
+        except ImportError as e:
+            msg = (
+                "MsgpackSerializer requires msgpack, install it with: "
+                "pip install msgpack"
+            )
+            raise ImportError(msg) from e
+        super().__init__()
+        self._msgpack = msgpack
+
+    def convert(self, o):
+        if isinstance(o, int):
+            # MessagePack integers have at most 64 bits.
+            return str(o)
+        return super().convert(o)
+
+    def dumps(self, obj):
+        """Return obj as MessagePack bytes."""
+        return self._msgpack.packb(
+            obj,
+            default=self.convert,
+            use_bin_type=True,
+            datetime=True,
+        )
+
+    def iter_dumps(self, obj, key, values):
+        packer = self._msgpack.Packer(
+            default=self.convert,
+            use_bin_type=True,
+            datetime=True,
+        )
+        yield packer.pack_map_header(len(obj) + 1)
+        for obj_key, value in obj.items():
+            yield packer.pack(obj_key) + packer.pack(value)
+        yield packer.pack(key) + packer.pack_array_header(len(values))
+        for value in values:
+            yield packer.pack(value)
+
+
+class CborSerializer(BinarySerializer):
+    """Serializer using cbor2, dates being CBOR date/time strings."""
+
+    def __init__(self):
+        try:
+            import cbor2  # type: ignore[import-untyped,import-not-found]  # noqa: PLC0415  # pylint: disable=import-outside-toplevel
+        except ImportError as e:
+            msg = "CborSerializer requires cbor2, install it with: pip install cbor2"
+            raise ImportError(msg) from e
+        super().__init__()
+        self._cbor2 = cbor2
+
+    def _default(self, encoder, o):
+        encoder.encode(self.convert(o))
+
+    def dumps(self, obj):
+        """Return obj as CBOR bytes."""
+        return self._cbor2.dumps(
+            obj,
+            default=self._default,
+            timezone=dt.timezone.utc,
+        )
+
+    def iter_dumps(self, obj, key, values):
+        yield _cbor_header(_CBOR_MAP, len(obj) + 1)
+        for obj_key, value in obj.items():
+            yield self.dumps(obj_key) + self.dumps(value)
+        yield self.dumps(key) + _cbor_header(_CBOR_ARRAY, len(values))
+        for value in values:
+            yield self.dumps(value)
+
+
+# Major types of CBOR arrays and maps.
+_CBOR_ARRAY = 4
+_CBOR_MAP = 5
+
+
+def _cbor_header(major_type, length):
+    """Return the head of a CBOR array or map of the given length."""
+    if length < 24:  # noqa: PLR2004
+        return bytes([major_type << 5 | length])
+    for info, size_format in ((24, ">B"), (25, ">H"), (26, ">I"), (27, ">Q")):
+        if length < 1 << (8 * struct.calcsize(size_format)):
+            return bytes([major_type << 5 | info]) + struct.pack(size_format, length)
+    msg = f"CBOR length too large: {length}"
+    raise ValueError(msg)
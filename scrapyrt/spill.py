@@ -0,0 +1,90 @@
+"""Temporary files of the items of crawls with more items than
+ITEMS_MEMORY_LIMIT.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import os
+import pickle
+import tempfile
+import weakref
+from pathlib import Path
+
+
+def _remove(path, file):
+    file.close()
+    with contextlib.suppress(OSError):
+        path.unlink()
+
+
+class SpillFile:
+    """Append-only temporary file of items.
+
+    Items are pickled, so that they are read back as they were scraped, and
+    can be serialized in any response format. The file is closed and removed
+    by close(), or when the SpillFile is garbage collected.
+
+    :param directory: directory of the file, the default temporary
+        directory if None.
+
+    """
+
+    def __init__(self, directory=None):
+        fd, path = tempfile.mkstemp(
+            prefix="scrapyrt-items-",
+            suffix=".pickle",
+            dir=directory,
+        )
+        self.path = Path(path)
+        self._file = os.fdopen(fd, "wb")
+        self._finalizer = weakref.finalize(self, _remove, self.path, self._file)
+        self.count = 0
+
+    def write(self, item):
+        """Append item to the file.
+
+        Items that cannot be pickled raise the error of pickle, and leave
+        the file as it was.
+
+        """
+        data = pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL)
+        self._file.write(data)
+        self.count += 1
+
+    def finish(self):
+        """Close the file for writing, once all items are written."""
+        self._file.close()
+
+    def __iter__(self):
+        """Iterate over the items written so far."""
+        if not self._file.closed:
+            self._file.flush()
+        with self.path.open("rb") as f:
+            for _ in range(self.count):
+                yield pickle.load(f)  # noqa: S301
+
+    def close(self):
+        """Close and remove the file."""
+        self._finalizer()
+
+
+class SpilledItems:
+    """Items of a crawl, the first ones in memory and the others in a
+    SpillFile.
+
+    Items are read back from the file as they are iterated over, see
+    CrawlResource.render_spilled().
+
+    """
+
+    def __init__(self, items, spill_file):
+        self.items = items
+        self.spill_file = spill_file
+
+    def __len__(self):
+        return len(self.items) + self.spill_file.count
+
+    def __iter__(self):
+        yield from self.items
+        yield from self.spill_file
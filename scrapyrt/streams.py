@@ -0,0 +1,244 @@
+"""Responses written while crawls run, instead of once they are finished."""
+
+from twisted.internet.defer import Deferred
+from twisted.internet.error import ConnectionLost
+from twisted.internet.interfaces import IPullProducer, IPushProducer
+from twisted.python.failure import Failure
+from zope.interface import implementer  # type: ignore[import-untyped]
+
+from .conf import app_settings
+
+
+@implementer(IPushProducer)
+class ItemStream:  # pylint: disable=too-many-instance-attributes
+    """Write the items of a crawl to the response as they are scraped.
+
+    Every item is a JSON line of the response. The crawl is paused while the
+    client does not read the response fast enough, and stopped if the
+    client disconnects.
+
+    """
+
+    content_type = b"application/x-ndjson"
+
+    def __init__(self, request, crawl_resource):
+        self.request = request
+        self.resource = crawl_resource
+        self.manager = None
+        self.paused = False
+        self.disconnected = False
+        # Whether the response is finished, later writes are ignored.
+        self.finished = False
+        self._producing = False
+        self._started = False
+        request.notifyFinish().addErrback(self._connection_lost)
+
+    def attach(self, manager):
+        """Send the items of the crawl of a crawl manager to the client."""
+        self.manager = manager
+        manager.item_handler = self.write_item
+
+    def write_item(self, item):
+        if self.finished:
+            return
+        if not self._producing and not self.disconnected:
+            self.request.registerProducer(self, True)
+            self._producing = True
+        self.write_event("item", item)
+
+    def write_event(self, event, obj):
+        if self.disconnected or self.finished:
+            return
+        if not self._started:
+            self.resource.set_headers(self.request, self.content_type)
+            self._started = True
+        self.request.write(self.format_event(event, obj))
+
+    def format_event(self, event, obj):  # pylint: disable=unused-argument
+        return self.resource.encode_json(obj) + b"\n"
+
+    def finish(self, obj):
+        """Write the last line of the response and finish it.
+
+        Errors that happen before any item was written are sent as usual
+        error responses.
+
+        """
+        if self.finished:
+            return
+        if self._producing:
+            self.request.unregisterProducer()
+            self._producing = False
+        if self.disconnected:
+            return
+        if not self._started and self.request.code != 200:  # noqa: PLR2004
+            self.request.write(self.resource.render_object(obj, self.request))
+        else:
+            self.write_event("result", obj)
+        self.finished = True
+        self.request.finish()
+
+    def _get_engine(self):
+        manager = self.manager
+        if manager is None or manager.crawler is None or manager.stats is not None:
+            # Resident crawls share their engine with other API calls.
+            return None
+        return manager.crawler.engine
+
+    def pauseProducing(self):  # pylint: disable=invalid-name
+        engine = self._get_engine()
+        if engine is not None and not self.paused:
+            engine.pause()
+            self.paused = True
+
+    def resumeProducing(self):  # pylint: disable=invalid-name
+        engine = self._get_engine()
+        if engine is not None and self.paused:
+            engine.unpause()
+        self.paused = False
+
+    def stopProducing(self):  # pylint: disable=invalid-name
+        self._stop()
+
+    def _connection_lost(self, _failure):
+        self._stop()
+
+    def _stop(self):
+        if self.disconnected:
+            return
+        self.disconnected = True
+        self.resumeProducing()
+        engine = self._get_engine()
+        if engine is not None and engine.spider is not None:
+            engine.close_spider(engine.spider, reason="client_disconnected")
+
+
+class EventStream(ItemStream):
+    """Write the items and the progress of a crawl as server-sent events.
+
+    Progress events are sent at most every EVENTS_PROGRESS_INTERVAL seconds,
+    however often the crawl makes progress.
+
+    """
+
+    content_type = b"text/event-stream"
+
+    def __init__(self, request, crawl_resource, clock=None):
+        super().__init__(request, crawl_resource)
+        self.clock = clock
+        self.items = 0
+        self._last_progress = None
+        self._progress_call = None
+
+    def _get_clock(self):
+        if self.clock is not None:
+            return self.clock
+        from twisted.internet import reactor  # pylint: disable=import-outside-toplevel
+
+        return reactor
+
+    def attach(self, manager):
+        super().attach(manager)
+        manager.progress_handler = self.schedule_progress
+
+    def write_item(self, item):
+        self.items += 1
+        super().write_item(item)
+
+    def write_event(self, event, obj):
+        if not self.disconnected and not self._started:
+            self.request.setHeader(b"Cache-Control", b"no-cache")
+        super().write_event(event, obj)
+
+    def format_event(self, event, obj):
+        data = self.resource.encode_json(obj)
+        return b"event: " + event.encode() + b"\ndata: " + data + b"\n\n"
+
+    def get_progress(self):
+        manager = self.manager
+        assert manager is not None
+        assert manager.crawler is not None
+        stats_collector = manager.stats
+        if stats_collector is None:
+            stats_collector = manager.crawler.stats
+        stats = stats_collector.get_stats() if stats_collector is not None else {}
+        return {
+            "requests": manager.request_count,
+            "responses": stats.get("response_received_count", 0),
+            "items": self.items,
+            "items_dropped": manager.items_dropped_count,
+            "errors": stats.get("spider_exceptions/count", 0),
+        }
+
+    def schedule_progress(self):
+        if self._progress_call is not None or self.disconnected or self.finished:
+            return
+        clock = self._get_clock()
+        delay = 0.0
+        if self._last_progress is not None:
+            interval = float(app_settings.EVENTS_PROGRESS_INTERVAL)
+            delay = max(0.0, self._last_progress + interval - clock.seconds())
+        self._progress_call = clock.callLater(delay, self.write_progress)
+
+    def write_progress(self):
+        self._progress_call = None
+        self._last_progress = self._get_clock().seconds()
+        self.write_event("progress", self.get_progress())
+
+    def finish(self, obj):
+        if self._progress_call is not None:
+            self._progress_call.cancel()
+            self.write_progress()
+        super().finish(obj)
+
+
+@implementer(IPullProducer)
+class ChunkProducer:
+    """Write the chunks of bytes of an iterator to a request as the client
+    reads them, in writes of at least CHUNK_SIZE bytes.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, request, chunks):
+        self.request = request
+        self.chunks = chunks
+        self.deferred: Deferred = Deferred()
+
+    def start(self):
+        """Start writing, return a Deferred fired once all chunks are
+        written.
+        """
+        self.request.registerProducer(self, False)
+        return self.deferred
+
+    def resumeProducing(self):  # pylint: disable=invalid-name
+        data = []
+        size = 0
+        try:
+            while size < self.CHUNK_SIZE:
+                chunk = next(self.chunks)
+                data.append(chunk)
+                size += len(chunk)
+        except StopIteration:
+            self.request.write(b"".join(data))
+            self._finish(None)
+            return
+        except Exception:  # pylint: disable=broad-exception-caught
+            self._finish(Failure())
+            return
+        self.request.write(b"".join(data))
+
+    def stopProducing(self):  # pylint: disable=invalid-name
+        self._finish(Failure(ConnectionLost("Client disconnected")))
+
+    def _finish(self, result):
+        if self.deferred.called:
+            return
+        self.request.unregisterProducer()
+        # Closes the files the chunks are read from.
+        self.chunks.close()
+        if isinstance(result, Failure):
+            self.deferred.errback(result)
+        else:
+            self.deferred.callback(result)
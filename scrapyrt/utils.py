@@ -23,3 +23,24 @@ def extract_scrapy_request_args(dictionary, raise_error=False):
                 msg = "{!r} is not a valid argument for scrapy.Request.__init__"
                 raise ValueError(msg.format(key))
     return result
+
+
+def parse_accept_header(header):
+    """Return the quality of each value of an Accept or Accept-Encoding
+    header, lowercased.
+    """
+    qualities = {}
+    for entry in header.split(","):
+        value, *params = (part.strip() for part in entry.split(";"))
+        if not value:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, param_value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(param_value)
+                except ValueError:
+                    quality = 0.0
+        qualities[value.lower()] = quality
+    return qualities
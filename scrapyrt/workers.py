@@ -0,0 +1,215 @@
+"""Running the server in several worker processes."""
+
+from __future__ import annotations
+
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+from contextlib import suppress
+from pathlib import Path
+
+from twisted.application.service import Service
+from twisted.internet.task import LoopingCall
+
+from . import log
+from .conf import app_settings
+from .metrics import metrics
+
+# Seconds a worker must have run for to be restarted right away when it
+# exits, to avoid restarting workers that fail on startup in a busy loop.
+MIN_WORKER_UPTIME = 1
+
+
+def listen(ip, port, backlog=50):
+    """Return a listening socket to be shared by all workers."""
+    family = socket.AF_INET6 if ":" in ip else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((ip, port))
+    sock.listen(backlog)
+    sock.setblocking(False)
+    return sock
+
+
+def get_rss():
+    """Return the resident set size of the current process in bytes."""
+    try:
+        statm = Path("/proc/self/statm").read_text(encoding="ascii")
+        return int(statm.split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # The resource module is not available on Windows.
+        import resource  # noqa: PLC0415  # pylint: disable=import-outside-toplevel
+
+        # Peak RSS, in kilobytes on Linux and in bytes on macOS.
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss if sys.platform == "darwin" else rss * 1024
+
+
+class WorkerSupervisor:
+    """Fork worker processes and restart them when they exit.
+
+    Workers accept connections on a listening socket created before forking,
+    so they share the port and the kernel balances connections between them.
+
+    """
+
+    def __init__(self, workers, run_worker):
+        self.workers = workers
+        self.run_worker = run_worker
+        self._pids = {}
+        self._stopping = False
+
+    def run(self, sock):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for _ in range(self.workers):
+            self._start_worker(sock)
+        while self._pids:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            started = self._pids.pop(pid, None)
+            if started is None:
+                continue
+            exit_code = os.waitstatus_to_exitcode(status)
+            log.msg(f"Worker {pid} exited with code {exit_code}")
+            if self._stopping:
+                continue
+            if time.monotonic() - started < MIN_WORKER_UPTIME:
+                time.sleep(MIN_WORKER_UPTIME)
+            self._start_worker(sock)
+
+    def _start_worker(self, sock):
+        pid = os.fork()
+        if pid:
+            self._pids[pid] = time.monotonic()
+            log.msg(f"Started worker {pid}")
+            return
+        status = 0
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+            self.run_worker(sock.fileno(), sock.family)
+        except BaseException:  # pylint: disable=broad-exception-caught
+            traceback.print_exc()
+            status = 1
+        finally:
+            os._exit(status)
+
+    def stop(self, signum, _frame):
+        """Stop the workers with the signal the supervisor received."""
+        self._stopping = True
+        for pid in list(self._pids):
+            with suppress(ProcessLookupError):
+                os.kill(pid, signum)
+
+
+class WorkerRecycler(Service):
+    """Stop the worker after a number of crawls or above a memory limit.
+
+    The worker stops accepting connections, waits for running crawls to
+    finish and for the HTTP requests it is handling to be answered, closing
+    idle connections, and stops, then the supervisor starts a new worker.
+    Requests still open after grace_timeout seconds are cut off.
+
+    """
+
+    # Seconds between checks of the worker
+    interval = 1
+
+    def __init__(  # noqa: PLR0913  # pylint: disable=too-many-positional-arguments
+        self,
+        server,
+        connections,
+        max_crawls=0,
+        max_memory=0,
+        grace_timeout=60,
+        clock=None,
+    ):
+        self.server = server
+        self.connections = connections
+        self.max_crawls = max_crawls
+        self.max_memory = max_memory
+        self.grace_timeout = grace_timeout
+        self._check = LoopingCall(self.check)
+        if clock is not None:
+            self._check.clock = clock
+        self._recycle_time = None
+
+    def startService(self):
+        super().startService()
+        self._check.start(self.interval, now=False)
+
+    def stopService(self):
+        if self._check.running:
+            self._check.stop()
+        return super().stopService()
+
+    def check(self):
+        if self._recycle_time is None:
+            reason = self.get_recycle_reason()
+            if reason:
+                log.msg(f"Recycling worker {os.getpid()}: {reason}")
+                self._recycle_time = self._seconds()
+                self.server.stopService()
+            return
+        timed_out = self._seconds() - self._recycle_time >= self.grace_timeout
+        if timed_out or self.close_idle_connections():
+            self._check.stop()
+            self._stop_reactor()
+
+    def close_idle_connections(self):
+        """Close the connections without requests being handled, return True
+        if no connection and no crawl is left.
+
+        Connections are closed once their response is written, so responses
+        still being serialized, streamed or written are not cut off.
+
+        """
+        if metrics.get_value("crawls/running", 0) > 0:
+            return False
+        for connection in list(self.connections.protocols):
+            if not connection.wrappedProtocol.requests:
+                connection.loseConnection()
+        return not self.connections.protocols
+
+    def _seconds(self):
+        return self._check.clock.seconds()  # type: ignore[misc]
+
+    def _stop_reactor(self):
+        from twisted.internet import reactor  # pylint: disable=import-outside-toplevel
+
+        reactor.stop()  # type: ignore[misc]
+
+    def get_recycle_reason(self):
+        crawls = metrics.get_value("crawls/finished", 0)
+        if self.max_crawls and crawls >= self.max_crawls:
+            return f"{crawls} crawls finished"
+        if self.max_memory:
+            rss = get_rss()
+            if rss > self.max_memory * 1024 * 1024:
+                return f"memory usage {rss // (1024 * 1024)} MiB"
+        return None
+
+
+def get_worker_recycler(server, connections):
+    """Return a WorkerRecycler for the worker settings, None if disabled.
+
+    connections is the WrappingFactory tracking the connections of server.
+
+    """
+    max_crawls = int(app_settings.WORKER_MAX_CRAWLS or 0)
+    max_memory = int(app_settings.WORKER_MAX_MEMORY or 0)
+    if not max_crawls and not max_memory:
+        return None
+    return WorkerRecycler(
+        server,
+        connections,
+        max_crawls=max_crawls,
+        max_memory=max_memory,
+        grace_timeout=float(app_settings.WORKER_GRACE_TIMEOUT),
+    )
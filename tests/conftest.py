@@ -0,0 +1,52 @@
+from functools import partial
+from unittest.mock import MagicMock, patch
+
+import pytest
+from twisted.web.http_headers import Headers
+from twisted.web.server import Request
+
+from scrapyrt.concurrency import CrawlCoalescer
+from scrapyrt.resources import CrawlResource
+
+from .servers import MockServer, ScrapyrtTestServer
+from .utils import generate_project
+
+# The resources that are not enabled by default are tested too.
+RESOURCES = {
+    "crawl.json": "scrapyrt.resources.CrawlResource",
+    "metrics.json": "scrapyrt.resources.MetricsResource",
+    "jobs": "scrapyrt.resources.JobsResource",
+    "events": "scrapyrt.resources.EventsResource",
+}
+
+
+@pytest.fixture
+def server(request):
+    """A ScrapyRT server crawling a mock site.
+
+    Parametrize it indirectly with a dict of settings to override them.
+    """
+    site = MockServer()
+    site.start()
+    server = ScrapyrtTestServer(
+        site=site,
+        project_generator=partial(generate_project, settings={"RESOURCES": RESOURCES}),
+        settings=getattr(request, "param", None),
+    )
+    server.start()
+    yield server
+    server.stop()
+    site.stop()
+
+
+@pytest.fixture
+def t_req():
+    return MagicMock(spec=Request, requestHeaders=Headers(), responseHeaders=Headers())
+
+
+@pytest.fixture
+def resource():
+    # Crawls that never finish must not be coalesced with crawls of other
+    # tests.
+    with patch("scrapyrt.resources.crawl_coalescer", CrawlCoalescer()):
+        yield CrawlResource()
@@ -20,3 +20,11 @@ class TestSpider(scrapy.Spider):
 
     def return_argument(self, response):
         return TestprojectItem(name=self.postcode)
+
+    def return_many(self, response):
+        for i in range(5):
+            yield TestprojectItem(name=f"Item {i}")
+
+    def follow_delayed(self, response):
+        yield TestprojectItem(name="Item 0")
+        yield scrapy.Request(response.urljoin("delay/3.0"), callback=self.return_many)
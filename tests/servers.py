@@ -109,7 +109,15 @@ class BaseTestServer:
 
 
 class ScrapyrtTestServer(BaseTestServer):
-    def __init__(self, site, *args, project_generator=generate_project, **kwargs):
+    def __init__(
+        self,
+        site,
+        *args,
+        project_generator=generate_project,
+        settings=None,
+        arguments=(),
+        **kwargs,
+    ):
         super().__init__(*args, **kwargs)
         self.arguments = [
             sys.executable,
@@ -118,6 +126,9 @@ class ScrapyrtTestServer(BaseTestServer):
             "-p",
             str(self.port),
         ]
+        for name, value in (settings or {}).items():
+            self.arguments.extend(["-s", f"{name}={value}"])
+        self.arguments.extend(arguments)
         self.stderr = PIPE
         self.tmp_dir = Path(tempfile.mkdtemp())
         self.cwd = self.tmp_dir
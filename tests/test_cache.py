@@ -0,0 +1,78 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from twisted.trial import unittest
+
+from scrapyrt.cache import MemoryResultCache, SQLiteResultCache, get_cache_ttl, get_etag
+from scrapyrt.conf import app_settings
+
+
+class TestMemoryResultCache(unittest.TestCase):
+    def test_get_set(self):
+        cache = MemoryResultCache(max_size=100)
+        assert cache.get("a") is None
+        etag = cache.set("a", b"body", 60)
+        assert etag == get_etag(b"body")
+        assert cache.get("a") == (etag, b"body")
+
+    def test_ttl(self):
+        cache = MemoryResultCache(max_size=100)
+        with patch("scrapyrt.cache.time.monotonic", return_value=0):
+            cache.set("a", b"body", 60)
+        with patch("scrapyrt.cache.time.monotonic", return_value=59):
+            assert cache.get("a") is not None
+        with patch("scrapyrt.cache.time.monotonic", return_value=60):
+            assert cache.get("a") is None
+        assert cache.size == 0
+
+    def test_max_size(self):
+        cache = MemoryResultCache(max_size=10)
+        cache.set("a", b"aaaa", 60)
+        cache.set("b", b"bbbb", 60)
+        cache.get("a")
+        cache.set("c", b"cccc", 60)
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.get("c") is not None
+        assert cache.size == 8
+        cache.set("d", b"d" * 11, 60)
+        assert cache.get("d") is None
+        cache.set("a", b"a", 60)
+        assert cache.size == 5
+
+
+class TestSQLiteResultCache(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.path = str(Path(tmp_dir.name) / "cache.sqlite")
+
+    def test_get_set(self):
+        cache = SQLiteResultCache(self.path)
+        assert cache.get("a") is None
+        etag = cache.set("a", b"body", 60)
+        assert cache.get("a") == (etag, b"body")
+        assert SQLiteResultCache(self.path).get("a") == (etag, b"body")
+
+    def test_ttl(self):
+        cache = SQLiteResultCache(self.path)
+        cache.purge_interval = 1
+        with patch("scrapyrt.cache.time.time", return_value=0):
+            cache.set("a", b"body", 60)
+        with patch("scrapyrt.cache.time.time", return_value=59):
+            assert cache.get("a") is not None
+        with patch("scrapyrt.cache.time.time", return_value=60):
+            assert cache.get("a") is None
+            cache.set("b", b"body", 60)
+        assert cache._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0] == 1
+
+
+class TestGetCacheTtl(unittest.TestCase):
+    def test_spider_ttl(self):
+        self.patch(app_settings, "RESULT_CACHE_TTL", 60)
+        self.patch(app_settings, "RESULT_CACHE_SPIDER_TTL", {"foo": 0})
+        assert get_cache_ttl("foo") == 0
+        assert get_cache_ttl("bar") == 60
+        self.patch(app_settings, "RESULT_CACHE_SPIDER_TTL", '{"foo": 10}')
+        assert get_cache_ttl("foo") == 10
@@ -1,3 +1,5 @@
+from __future__ import annotations
+
 import subprocess
 import sys
 import tempfile
@@ -5,17 +7,20 @@ from contextlib import contextmanager
 from os import chdir
 from pathlib import Path
 from tempfile import TemporaryDirectory
+from time import monotonic, sleep
 from typing import NamedTuple
 from unittest.mock import patch
 
 import port_for
 import pytest
+import requests
 from scrapy.utils.conf import closest_scrapy_cfg
 from twisted.python.components import Componentized
 
 from scrapyrt.cmdline import execute, find_scrapy_project, get_application
 from scrapyrt.conf import app_settings
 
+from .servers import MockServer, ScrapyrtTestServer
 from .utils import ASYNCIO_REACTOR_IS_DEFAULT, generate_project, get_testenv
 
 
@@ -25,6 +30,7 @@ class FakeArgs(NamedTuple):
     set: list
     project: str
     settings: str
+    workers: int | None = None
 
 
 def make_fake_args() -> FakeArgs:
@@ -170,6 +176,29 @@ def test_invalid_setting_definition():
     assert b"expected name=value: 'FOO'" in stderr
 
 
+@pytest.mark.parametrize(
+    ("value", "error"),
+    (
+        ("0", b"must be at least 1: 0"),
+        ("-2", b"must be at least 1: -2"),
+        ("foo", b"invalid int value: 'foo'"),
+    ),
+)
+def test_invalid_workers(value, error):
+    with ProjectDirectory() as directory:
+        stderr = run(directory, ["--workers", value])
+    assert b"argument -w/--workers" in stderr
+    assert error in stderr
+
+
+def test_workers_with_jobs():
+    with ProjectDirectory() as directory:
+        settings = directory / "app_settings.py"
+        settings.write_text('RESOURCES = {"jobs": "scrapyrt.resources.JobsResource"}\n')
+        stderr = run(directory, ["-S", "app_settings", "--workers", "2"])
+    assert b"The jobs resource keeps jobs in the memory of the worker" in stderr
+
+
 def test_log_file():
     """Simply tests that nothing breaks by setting a custom log file."""
     with ProjectDirectory() as directory:
@@ -179,3 +208,71 @@ def test_log_file():
         options = ["-S", "app_settings"]
         stderr = run(directory, options)
         assert not stderr
+
+
+def test_workers():
+    site = MockServer()
+    site.start()
+    server = ScrapyrtTestServer(
+        site=site,
+        settings={"WORKER_MAX_CRAWLS": 1},
+        arguments=["--workers", "2"],
+    )
+    server.start()
+    try:
+        for _ in range(4):
+            res = requests.get(
+                server.url("crawl.json"),
+                params={"spider_name": "test", "url": site.url("page1.html")},
+                timeout=30,
+            )
+            assert res.json()["items"] == [{"name": ["Page 1"]}]
+        assert server.proc is not None
+        # The output of the first workers was read when the server started.
+        # Wait for recycled workers to be restarted.
+        output = b""
+        deadline = monotonic() + 30
+        while b"Started worker" not in output and monotonic() < deadline:
+            sleep(0.1)
+            output += server._non_block_read(server.proc.stderr) or b""
+        server.proc.terminate()
+        _, stderr = server.proc.communicate(timeout=10)
+        stderr = output + stderr
+        assert server.proc.returncode == 0
+    finally:
+        server.stop()
+        site.stop()
+    # Workers are recycled and restarted after 1 crawl.
+    assert b"Recycling worker" in stderr
+    assert b"Started worker" in stderr
+
+
+def test_worker_recycled_during_serialization():
+    site = MockServer()
+    site.start()
+    server = ScrapyrtTestServer(
+        site=site,
+        settings={
+            "JSON_SERIALIZER": "tests.utils.SlowJSONSerializer",
+            "THREADED_SERIALIZATION_MIN_ITEMS": 1,
+            "WORKER_MAX_CRAWLS": 1,
+        },
+        arguments=["--workers", "1"],
+    )
+    server.start()
+    try:
+        # The crawl finishes, and the worker is recycled, while the response
+        # is serialized in a thread.
+        res = requests.get(
+            server.url("crawl.json"),
+            params={"spider_name": "test", "url": site.url("page1.html")},
+            timeout=30,
+        )
+        assert res.json()["items"] == [{"name": ["Page 1"]}]
+        assert server.proc is not None
+        server.proc.terminate()
+        _, stderr = server.proc.communicate(timeout=10)
+    finally:
+        server.stop()
+        site.stop()
+    assert b"Recycling worker" in stderr
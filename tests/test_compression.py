@@ -0,0 +1,149 @@
+import gzip
+import json
+import zlib
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+from twisted.trial import unittest
+from twisted.web.http_headers import Headers
+
+from scrapyrt.compression import ResponseEncoder, get_response_encoder
+from scrapyrt.conf import app_settings
+
+
+def get_request(accept_encoding=None, code=200):
+    request_headers = Headers()
+    if accept_encoding is not None:
+        request_headers.setRawHeaders(b"Accept-Encoding", [accept_encoding])
+    return MagicMock(
+        code=code,
+        requestHeaders=request_headers,
+        responseHeaders=Headers(),
+    )
+
+
+class TestGetResponseEncoder(unittest.TestCase):
+    def setUp(self):
+        self.patch(app_settings, "COMPRESSION_ENCODINGS", ["br", "gzip"])
+        self.patch(app_settings, "COMPRESSION_LEVELS", {"gzip": 6})
+
+    def get_encoding(self, accept_encoding):
+        encoder = get_response_encoder(get_request(accept_encoding))
+        return None if encoder is None else encoder.encoding
+
+    def test_negotiation(self):
+        pytest.importorskip("brotli")
+        assert self.get_encoding(b"gzip, br") == "br"
+        assert self.get_encoding(b"gzip, br;q=0.5") == "gzip"
+        assert self.get_encoding(b"gzip, br;q=0") == "gzip"
+        assert self.get_encoding(b"*") == "br"
+        assert self.get_encoding(b"deflate") is None
+        assert self.get_encoding(None) is None
+
+    def test_disabled(self):
+        self.patch(app_settings, "COMPRESSION_ENCODINGS", "")
+        request = get_request(b"gzip")
+        assert get_response_encoder(request) is None
+        assert not request.responseHeaders.hasHeader(b"Vary")
+
+    def test_vary(self):
+        request = get_request(b"deflate")
+        assert get_response_encoder(request) is None
+        assert request.responseHeaders.getRawHeaders(b"Vary") == [b"Accept-Encoding"]
+
+    @patch("scrapyrt.compression._unavailable_encodings", set())
+    def test_missing_library(self):
+        self.patch(app_settings, "COMPRESSION_ENCODINGS", "zstd,gzip")
+        with patch.dict(
+            "scrapyrt.compression.COMPRESSORS",
+            {"zstd": MagicMock(side_effect=ImportError)},
+        ):
+            assert self.get_encoding(b"zstd, gzip") == "gzip"
+            assert self.get_encoding(b"zstd") is None
+
+
+class TestResponseEncoder(unittest.TestCase):
+    def setUp(self):
+        self.patch(app_settings, "COMPRESSION_ENCODINGS", ["gzip"])
+        self.patch(app_settings, "COMPRESSION_MIN_SIZE", 10)
+
+    def test_compress(self):
+        request = get_request(b"gzip")
+        request.responseHeaders.setRawHeaders(b"Content-Length", [b"20"])
+        request.responseHeaders.setRawHeaders(b"ETag", [b'"foo"'])
+        encoder = get_response_encoder(request)
+        body = encoder.encode(b"a" * 20) + encoder.finish()
+        assert gzip.decompress(body) == b"a" * 20
+        headers = request.responseHeaders
+        assert headers.getRawHeaders(b"Content-Encoding") == [b"gzip"]
+        assert not headers.hasHeader(b"Content-Length")
+        assert headers.getRawHeaders(b"ETag") == [b'W/"foo"']
+
+    def test_min_size(self):
+        request = get_request(b"gzip")
+        request.responseHeaders.setRawHeaders(b"Content-Length", [b"9"])
+        encoder = get_response_encoder(request)
+        assert encoder.encode(b"a" * 9) == b"a" * 9
+        assert encoder.finish() == b""
+        assert not request.responseHeaders.hasHeader(b"Content-Encoding")
+
+    def test_not_modified(self):
+        encoder = get_response_encoder(get_request(b"gzip", code=304))
+        assert encoder.encode(b"") == b""
+        assert encoder.finish() == b""
+
+    def test_stream(self):
+        request = get_request(b"gzip")
+        encoder = get_response_encoder(request)
+        assert isinstance(encoder, ResponseEncoder)
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        # Every write can be decompressed before the response is finished.
+        assert decompressor.decompress(encoder.encode(b"item 1\n")) == b"item 1\n"
+        assert decompressor.decompress(encoder.encode(b"item 2\n")) == b"item 2\n"
+        assert decompressor.decompress(encoder.finish()) == b""
+        assert decompressor.eof
+
+
+@pytest.mark.parametrize(
+    "server",
+    ({"COMPRESSION_MIN_SIZE": 100},),
+    indirect=True,
+)
+class TestCompressionIntegration:
+    def test_crawl(self, server):
+        res = requests.get(
+            server.url("crawl.json"),
+            params={"spider_name": "test", "url": server.site.url("page1.html")},
+            headers={"Accept-Encoding": "gzip"},
+            timeout=30,
+        )
+        assert res.headers["Content-Encoding"] == "gzip"
+        assert "Accept-Encoding" in res.headers["Vary"]
+        assert res.json()["items"] == [{"name": ["Page 1"]}]
+        res = requests.get(
+            server.url("jobs/foo"),
+            headers={"Accept-Encoding": "gzip"},
+            timeout=30,
+        )
+        assert res.status_code == 404
+        assert "Content-Encoding" not in res.headers
+        res = requests.get(server.url("metrics.json"), timeout=30)
+        assert res.json()["metrics"]["compression/gzip"] == 1
+
+    def test_stream(self, server):
+        res = requests.get(
+            server.url("crawl.json"),
+            params={
+                "stream": "true",
+                "spider_name": "test",
+                "url": server.site.url("page1.html"),
+            },
+            headers={"Accept-Encoding": "gzip"},
+            timeout=30,
+        )
+        # Streamed responses have no Content-Length, whatever their size.
+        assert res.headers["Content-Encoding"] == "gzip"
+        lines = [json.loads(line) for line in res.text.splitlines()]
+        assert lines[0] == {"name": ["Page 1"]}
+        assert lines[1]["status"] == "ok"
@@ -0,0 +1,252 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+from twisted.internet.defer import Deferred
+from twisted.internet.task import Clock
+from twisted.trial import unittest
+from twisted.web.error import Error
+from twisted.web.server import Request
+
+from scrapyrt.concurrency import CrawlCoalescer, CrawlLimiter, ServiceUnavailable
+from scrapyrt.conf import app_settings
+from scrapyrt.metrics import metrics
+from scrapyrt.resources import CrawlResource
+
+from .test_resource_crawl import perform_get
+
+
+class TestCrawlLimiter(unittest.TestCase):
+    def setUp(self):
+        metrics.clear()
+        self.clock = Clock()
+        self.limiter = CrawlLimiter(clock=self.clock)
+        self.patch(app_settings, "MAX_CONCURRENT_CRAWLS", 1)
+        self.patch(app_settings, "MAX_QUEUED_CRAWLS", 1)
+        self.patch(app_settings, "CRAWL_QUEUE_TIMEOUT", 10)
+        self.crawls: list[Deferred] = []
+
+    def tearDown(self):
+        metrics.clear()
+
+    def crawl(self):
+        dfd: Deferred = Deferred()
+        self.crawls.append(dfd)
+        return dfd
+
+    def run_crawl(self):
+        results: list = []
+        self.limiter.run(self.crawl).addBoth(results.append)
+        return results
+
+    def test_queue(self):
+        first = self.run_crawl()
+        second = self.run_crawl()
+        assert len(self.crawls) == 1
+        assert metrics.get_value("crawl_queue/waiting") == 1
+        self.crawls[0].callback("first")
+        assert first == ["first"]
+        assert len(self.crawls) == 2
+        assert metrics.get_value("crawl_queue/waiting") == 0
+        self.crawls[1].callback("second")
+        assert second == ["second"]
+        assert metrics.get_value("crawl_queue/queued") == 1
+
+    def test_rejected(self):
+        self.run_crawl()
+        self.run_crawl()
+        rejected = self.run_crawl()
+        assert len(self.crawls) == 1
+        assert rejected[0].check(ServiceUnavailable)
+        assert rejected[0].value.status == b"503"
+        assert rejected[0].value.retry_after == 5
+        assert metrics.get_value("crawl_queue/rejected") == 1
+
+    def test_queue_timeout(self):
+        self.run_crawl()
+        queued = self.run_crawl()
+        self.clock.advance(10)
+        assert queued[0].check(ServiceUnavailable)
+        assert metrics.get_value("crawl_queue/timeouts") == 1
+        assert metrics.get_value("crawl_queue/waiting") == 0
+        self.crawls[0].callback(None)
+        assert len(self.crawls) == 1
+        self.run_crawl()
+        assert len(self.crawls) == 2
+
+    def test_crawl_error(self):
+        def crawl():
+            raise Error(400)
+
+        failed: list = []
+        self.limiter.run(crawl).addErrback(failed.append)
+        assert failed[0].check(Error)
+        self.run_crawl()
+        assert len(self.crawls) == 1
+
+    def test_run_crawl(self):
+        manager = MagicMock()
+        manager.crawl.side_effect = lambda *_args: self.crawl()
+        finished: Deferred = Deferred()
+        manager.wait_finished.return_value = finished
+        results: list = []
+        self.limiter.run_crawl(manager, "foo").addBoth(results.append)
+        manager.crawl.assert_called_once_with("foo")
+        # The result of a closed crawl is sent before its spider is closed.
+        self.crawls[0].callback("partial")
+        assert results == ["partial"]
+        self.run_crawl()
+        assert len(self.crawls) == 1
+        finished.callback(None)
+        assert len(self.crawls) == 2
+
+    def test_no_limit(self):
+        self.patch(app_settings, "MAX_CONCURRENT_CRAWLS", 0)
+        for _ in range(3):
+            self.run_crawl()
+        assert len(self.crawls) == 3
+
+    def test_retry_after_header(self):
+        request = MagicMock(spec=Request, code=200)
+        resource = CrawlResource()
+        resource.handle_error(ServiceUnavailable(b"Too many crawls", 5), request)
+        request.setResponseCode.assert_called_once_with(503)
+        request.setHeader.assert_called_once_with(b"Retry-After", b"5")
+
+
+class TestCrawlCoalescer(unittest.TestCase):
+    def setUp(self):
+        metrics.clear()
+        self.coalescer = CrawlCoalescer()
+        self.crawls: list[Deferred] = []
+
+    def tearDown(self):
+        metrics.clear()
+
+    def crawl(self):
+        dfd: Deferred = Deferred()
+        self.crawls.append(dfd)
+        return dfd
+
+    def run_crawl(self, key):
+        results: list = []
+        self.coalescer.run(key, self.crawl).addBoth(results.append)
+        return results
+
+    def test_coalesce(self):
+        first = self.run_crawl("a")
+        second = self.run_crawl("a")
+        other = self.run_crawl("b")
+        assert len(self.crawls) == 2
+        assert metrics.get_value("crawls/coalesced") == 1
+        self.crawls[0].callback("result")
+        assert first == second == ["result"]
+        assert not other
+        self.run_crawl("a")
+        assert len(self.crawls) == 3
+
+    def test_crawl_error(self):
+        first = self.run_crawl("a")
+        second = self.run_crawl("a")
+        self.crawls[0].errback(ValueError("foo"))
+        assert first[0].check(ValueError)
+        assert second[0].check(ValueError)
+
+    def test_crawl_raises(self):
+        def crawl():
+            raise Error(400)
+
+        with pytest.raises(Error):
+            self.coalescer.run("a", crawl)
+        self.run_crawl("a")
+        assert len(self.crawls) == 1
+
+
+class TestGetCrawlKey:
+    def get_crawl_key(self, resource, request_args=None, api_params=None, **kwargs):
+        return resource.get_crawl_key(
+            "test",
+            request_args or {"url": "http://foo.com/?b=2&a=1"},
+            api_params or {},
+            kwargs.get("max_requests"),
+            kwargs.get("crawl_args"),
+        )
+
+    def test_key(self, resource):
+        key = self.get_crawl_key(resource)
+        assert key is not None
+        assert key == self.get_crawl_key(
+            resource,
+            {"url": "http://foo.com/?a=1&b=2"},
+        )
+        assert key != self.get_crawl_key(
+            resource,
+            {"url": "http://foo.com/?a=1&b=2", "callback": "parse_foo"},
+        )
+        assert key != self.get_crawl_key(resource, max_requests=2)
+        assert key != self.get_crawl_key(resource, crawl_args={"foo": "bar"})
+        assert key != self.get_crawl_key(resource, api_params={"spider_start": True})
+
+    def test_invalid_request(self, resource):
+        assert self.get_crawl_key(resource, {"url": "foo"}) is None
+
+    @pytest.mark.parametrize(
+        ("method", "comparable"),
+        (
+            ("GET", True),
+            ("head", True),
+            ("POST", False),
+            ("PUT", False),
+            ("DELETE", False),
+        ),
+    )
+    def test_method(self, resource, method, comparable):
+        key = self.get_crawl_key(
+            resource,
+            {"url": "http://foo.com/", "method": method},
+        )
+        assert (key is not None) == comparable
+
+
+class TestCrawlConcurrencyIntegration:
+    @pytest.mark.parametrize("server", ({"COALESCE_CRAWLS": True},), indirect=True)
+    def test_coalesce_crawls(self, server):
+        def crawl(_):
+            return perform_get(
+                server.url("crawl.json"),
+                {"spider_name": "test"},
+                {"url": server.site.url("delay/1.0")},
+            )
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            responses = list(executor.map(crawl, range(3)))
+        assert [res.json()["items"] for res in responses] == [
+            [{"name": ["Page 1"]}],
+        ] * 3
+        metrics = requests.get(server.url("metrics.json"), timeout=30).json()
+        assert metrics["metrics"]["crawls/coalesced"] == 2
+        assert metrics["metrics"]["crawls/started"] == 1
+
+    @pytest.mark.parametrize(
+        "server",
+        ({"MAX_CONCURRENT_CRAWLS": 1, "MAX_QUEUED_CRAWLS": 1},),
+        indirect=True,
+    )
+    def test_max_concurrent_crawls(self, server):
+        def crawl(_):
+            return perform_get(
+                server.url("crawl.json"),
+                {"spider_name": "test", "coalesce": "false"},
+                {"url": server.site.url("delay/1.0")},
+            )
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            responses = list(executor.map(crawl, range(3)))
+        status_codes = sorted(res.status_code for res in responses)
+        assert status_codes == [200, 200, 503]
+        rejected = next(res for res in responses if res.status_code == 503)
+        assert rejected.headers["Retry-After"] == "5"
+        metrics = requests.get(server.url("metrics.json"), timeout=30).json()
+        assert metrics["metrics"]["crawl_queue/rejected"] == 1
+        assert metrics["metrics"]["crawl_queue/queued"] == 1
@@ -3,21 +3,31 @@ import datetime as dt
 import re
 from pathlib import Path
 from time import sleep
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 import pytest
-from scrapy import Item
-from scrapy.exceptions import DontCloseSpider
-from scrapy.http import Response
+from scrapy import Item, Spider
+from scrapy.crawler import Crawler
+from scrapy.exceptions import DontCloseSpider, DropItem
+from scrapy.http import Request, Response
 from scrapy.settings import Settings
+from twisted.internet.defer import Deferred
+from twisted.internet.task import Clock
 from twisted.python.failure import Failure
 from twisted.trial import unittest
 from twisted.web.error import Error
 
 from scrapyrt.conf import app_settings
-from scrapyrt.core import CrawlManager
+from scrapyrt.core import (
+    BATCH_INDEX_META_KEY,
+    BatchMiddleware,
+    CrawlManager,
+    spider_class_without_start,
+)
+from scrapyrt.projection import ResponseProjection
 
 from .spiders import MetaSpider
+from .utils import get_settings
 
 
 class TestCrawlManager(unittest.TestCase):
@@ -44,6 +54,66 @@ class TestGetProjectSettings(TestCrawlManager):
     def test_get_project_settings(self):
         result = self.crawl_manager.get_project_settings()
         assert isinstance(result, Settings)
+        assert not result.frozen
+        assert result.getbool("LOG_ENABLED")
+        assert Path(result["LOG_FILE"]).parent == self.crawl_manager.log_dir / "meta"
+
+    def test_get_project_settings_per_crawl_log_file(self):
+        result1 = self.crawl_manager.get_project_settings()
+        result2 = self.create_crawl_manager().get_project_settings()
+        assert result1["LOG_FILE"] != result2["LOG_FILE"]
+        assert result1.attributes["BOT_NAME"] is result2.attributes["BOT_NAME"]
+
+    def test_get_resident_settings(self):
+        result = self.crawl_manager.get_resident_settings()
+        assert result.getbool("LOG_ENABLED")
+        log_file = Path(result["LOG_FILE"])
+        assert log_file.parent == self.crawl_manager.log_dir / "meta"
+        assert log_file.name.startswith("resident-")
+
+
+@patch("scrapyrt.core.ScrapyrtCrawlerRunner.crawl")
+class TestCrawl(TestCrawlManager):
+    def create_crawl_manager(self, kwargs=None):
+        crawl_manager = super().create_crawl_manager(kwargs)
+        crawl_manager.spider_start = True
+        # Crawls of the mocked crawler runner never finish.
+        crawl_manager.clock = Clock()
+        settings = get_settings()
+        settings.set("SPIDER_MODULES", ["tests.spiders"])
+        crawl_manager.get_project_settings = MagicMock(  # type: ignore[method-assign]
+            return_value=settings,
+        )
+        return crawl_manager
+
+    def test_crawl(self, crawl_mock):
+        self.crawl_manager.crawl()
+        crawler = crawl_mock.call_args[0][0]
+        assert isinstance(crawler, Crawler)
+        assert crawler.spidercls is MetaSpider
+        assert self.crawl_manager.crawler is crawler
+
+    def test_shared_crawler_runner(self, crawl_mock):
+        other_crawl_manager = self.create_crawl_manager()
+        self.crawl_manager.crawl()
+        other_crawl_manager.crawl()
+        runner = self.crawl_manager.crawler_runner
+        assert runner is other_crawl_manager.crawler_runner
+        assert runner.scrapyrt_manager is None
+        crawlers = [call[0][0] for call in crawl_mock.call_args_list]
+        assert crawlers == [self.crawl_manager.crawler, other_crawl_manager.crawler]
+
+    def test_not_shared_crawler_runner(self, crawl_mock):
+        other_crawl_manager = self.create_crawl_manager()
+        shared_crawler_runner = app_settings.SHARED_CRAWLER_RUNNER
+        try:
+            app_settings.SHARED_CRAWLER_RUNNER = False
+            self.crawl_manager.crawl()
+            other_crawl_manager.crawl()
+        finally:
+            app_settings.SHARED_CRAWLER_RUNNER = shared_crawler_runner
+        runner = self.crawl_manager.crawler_runner
+        assert runner is not other_crawl_manager.crawler_runner
 
 
 class TestSpiderIdle(TestCrawlManager):
@@ -121,6 +191,107 @@ class TestSpiderIdle(TestCrawlManager):
         assert mng.request.errback("something") == "something"
 
 
+class TestBatch(TestCrawlManager):
+    def setUp(self):
+        super().setUp()
+        self.crawl_manager = self.create_crawl_manager(
+            [{"url": "http://localhost/1"}, {"url": "http://localhost/2"}],
+        )
+
+    def _call_spider_idle(self):
+        with contextlib.suppress(DontCloseSpider):
+            self.crawl_manager.spider_idle(self.spider)
+        return [call[0][0] for call in self.crawler.engine.crawl.call_args_list]
+
+    def test_spider_idle(self):
+        requests = self._call_spider_idle()
+        assert [request.url for request in requests] == [
+            "http://localhost/1",
+            "http://localhost/2",
+        ]
+        assert [request.meta[BATCH_INDEX_META_KEY] for request in requests] == [0, 1]
+        assert requests[0].callback == self.spider.parse
+        self.crawler.engine.crawl.reset_mock()
+        assert self._call_spider_idle() == []
+
+    def test_invalid_callback(self):
+        self.crawl_manager = self.create_crawl_manager(
+            [
+                {"url": "http://localhost/1"},
+                {"url": "http://localhost/2", "callback": "foo"},
+            ],
+        )
+        assert self._call_spider_idle() == []
+        assert self.crawl_manager.user_error is not None
+
+    def test_items_and_errors(self):
+        requests = self._call_spider_idle()
+        item = Item()
+        self.crawl_manager.get_item(
+            item,
+            Response(requests[1].url, request=requests[1]),
+            self.spider,
+        )
+        self.crawl_manager.get_item(Item(), None, self.spider)
+        failure = Failure(ValueError("foo"))
+        assert requests[0].errback(failure) is failure
+        results = self.crawl_manager.return_items(None)["results"]
+        assert results == [
+            {"url": "http://localhost/1", "items": [], "errors": ["ValueError: foo"]},
+            {"url": "http://localhost/2", "items": [item], "errors": []},
+        ]
+        assert len(self.crawl_manager.items) == 1
+
+    def test_items_spill(self):
+        self.patch(app_settings, "ITEMS_MEMORY_LIMIT", 1)
+        requests = self._call_spider_idle()
+        for i in range(3):
+            request = requests[i % 2]
+            self.crawl_manager.get_item(
+                {"i": i},
+                Response(request.url, request=request),
+                self.spider,
+            )
+        batch = self.crawl_manager.batch
+        assert batch[0].items == [{"i": 0}]
+        assert batch[0].spill_file.count == 1
+        assert batch[1].spill_file.count == 1
+        self.addCleanup(batch[0].spill_file.close)
+        self.addCleanup(batch[1].spill_file.close)
+        results = self.crawl_manager.return_items(None)["results"]
+        assert [list(result["items"]) for result in results] == [
+            [{"i": 0}, {"i": 2}],
+            [{"i": 1}],
+        ]
+
+    def test_errors_after_close(self):
+        requests = self._call_spider_idle()
+        self.crawl_manager.close_reason = "timeout"
+        failure = Failure(ValueError("foo"))
+        assert requests[0].errback(failure) is failure
+        assert not self.crawl_manager.batch[0].errors
+
+    def test_spider_error(self):
+        requests = self._call_spider_idle()
+        failure = Failure(ValueError("foo"))
+        response = Response(requests[1].url, request=requests[1])
+        self.crawl_manager.handle_spider_error(failure, self.spider, response)
+        assert self.crawl_manager.batch[1].errors == ["ValueError: foo"]
+
+    def test_middleware(self):
+        requests = self._call_spider_idle()
+        response = Response(requests[1].url, request=requests[1])
+        output = [Item(), Request("http://localhost/3")]
+        result = list(BatchMiddleware().process_spider_output(response, output))
+        assert result[1].meta[BATCH_INDEX_META_KEY] == 1
+
+    def test_project_settings(self):
+        settings = self.crawl_manager.get_project_settings()
+        middlewares = settings.getdict("SPIDER_MIDDLEWARES_BASE")
+        assert middlewares["scrapyrt.core.BatchMiddleware"] == 0
+        assert "scrapy.spidermiddlewares.depth.DepthMiddleware" in middlewares
+
+
 class TestHandleScheduling(TestCrawlManager):
     def setUp(self):
         super().setUp()
@@ -176,6 +347,54 @@ class TestLimitRuntime(TestCrawlManager):
             app_settings.TIMEOUT_LIMIT = _timeout
 
 
+class TestTimeout(TestCrawlManager):
+    def setUp(self):
+        super().setUp()
+        self.patch(app_settings, "TIMEOUT_LIMIT", 10)
+        self.crawl_manager = self.create_crawl_manager()
+        self.clock = Clock()
+        self.crawl_manager.clock = self.clock
+        self.crawl_dfd: Deferred = Deferred()
+        self.results: list = []
+        result = self.crawl_manager._get_crawl_result(self.crawl_dfd)
+        result.addCallback(self.results.append)
+
+    def test_timeout_argument(self):
+        manager = CrawlManager(self.spider.name, self.kwargs.copy(), timeout=2.5)
+        assert manager.timeout_limit == 2.5
+        manager = CrawlManager(self.spider.name, self.kwargs.copy(), timeout=20)
+        assert manager.timeout_limit == 10
+
+    def test_timeout(self):
+        self.crawl_manager.items.append({"i": 0})
+        self.crawl_manager._start_timeout(self.crawl_dfd)
+        self.clock.advance(9)
+        assert not self.results
+        self.clock.advance(1)
+        # The response does not wait for the spider to close.
+        assert len(self.results) == 1
+        assert self.results[0]["items"] == [{"i": 0}]
+        assert self.results[0]["partial"] is True
+        assert self.results[0]["stop_reason"] == "timeout"
+        self.crawler.engine.close_spider.assert_called_once_with(
+            self.crawler.engine.spider,
+            reason="timeout",
+        )
+
+    def test_timeout_includes_queue_time(self):
+        self.crawl_manager.crawl_start_time -= dt.timedelta(seconds=4)
+        self.crawl_manager._start_timeout(self.crawl_dfd)
+        self.clock.advance(6)
+        assert self.results[0]["stop_reason"] == "timeout"
+
+    def test_finished(self):
+        self.crawl_manager._start_timeout(self.crawl_dfd)
+        self.crawl_dfd.callback(self.crawl_manager.return_items(None))
+        assert not self.clock.getDelayedCalls()
+        assert "partial" not in self.results[0]
+        assert "stop_reason" not in self.results[0]
+
+
 class TestHandleSpiderError(TestCrawlManager):
     def setUp(self):
         super().setUp()
@@ -229,6 +448,116 @@ class TestGetItem(TestCrawlManager):
         assert len(self.crawl_manager.items) == 1
         assert self.crawl_manager.items[0] == self.item
 
+    def test_get_item_projection(self):
+        self.crawl_manager.projection = ResponseProjection(fields=["name"])
+        self.crawl_manager.get_item(
+            {"name": "foo", "price": 1},
+            self.response,
+            self.spider,
+        )
+        assert self.crawl_manager.items == [{"name": "foo"}]
+
+    def test_get_item_spill(self):
+        self.patch(app_settings, "ITEMS_MEMORY_LIMIT", 1)
+        for i in range(3):
+            self.crawl_manager.get_item({"i": i}, self.response, self.spider)
+        assert self.crawl_manager.items == [{"i": 0}]
+        self.addCleanup(self.crawl_manager.spill_file.close)
+        assert self.crawl_manager.spill_file.count == 2
+        items = self.crawl_manager.return_items(None)["items"]
+        assert list(items) == [{"i": 0}, {"i": 1}, {"i": 2}]
+
+    def test_get_item_spill_unpicklable(self):
+        self.patch(app_settings, "ITEMS_MEMORY_LIMIT", 1)
+        unpicklable = {"i": 1, "f": lambda: None}
+        for item in ({"i": 0}, unpicklable, {"i": 2}):
+            self.crawl_manager.get_item(item, self.response, self.spider)
+        self.addCleanup(self.crawl_manager.spill_file.close)
+        # Kept in memory instead of being lost.
+        assert self.crawl_manager.items == [{"i": 0}, unpicklable]
+        assert list(self.crawl_manager.spill_file) == [{"i": 2}]
+
+    def test_get_item_max_items(self):
+        self.patch(app_settings, "MAX_ITEMS_PER_CRAWL", 2)
+        for i in range(3):
+            self.crawl_manager.get_item({"i": i}, self.response, self.spider)
+        assert self.crawl_manager.items == [{"i": 0}, {"i": 1}]
+        self.crawler.engine.close_spider.assert_called_once_with(
+            self.crawler.engine.spider,
+            reason="closespider_itemcount",
+        )
+
+    def test_get_item_after_max_items(self):
+        self.crawl_manager.max_items = 1
+        self.crawl_manager.item_handler = MagicMock()
+        self.crawl_manager.progress_handler = MagicMock()
+        for i in range(3):
+            self.crawl_manager.get_item({"i": i}, self.response, self.spider)
+        assert self.crawl_manager.item_count == 1
+        self.crawl_manager.item_handler.assert_called_once_with({"i": 0})
+        self.crawl_manager.progress_handler.assert_called_once_with()
+
+    def test_closed_crawl(self):
+        self.crawl_manager.progress_handler = MagicMock()
+        self.crawl_manager.close_crawl("timeout")
+        self.crawl_manager.get_item({"i": 0}, self.response, self.spider)
+        self.crawl_manager.collect_dropped(
+            {"i": 1},
+            self.response,
+            DropItem("foo"),
+            self.spider,
+        )
+        failure = Failure(ValueError("foo"))
+        self.crawl_manager.handle_spider_error(failure, self.spider, self.response)
+        self.crawl_manager.handle_scheduling(self.crawl_manager.request, self.spider)
+        assert not self.crawl_manager.items
+        assert not self.crawl_manager.items_dropped
+        assert not self.crawl_manager.errors
+        assert self.crawl_manager.request_count == 0
+        assert not self.crawl_manager.progress_handler.called
+
+    def test_wait_finished(self):
+        assert self.crawl_manager.wait_finished().called
+        crawl_dfd: Deferred = Deferred()
+        self.crawl_manager._notify_finished(crawl_dfd)
+        result = self.crawl_manager._get_crawl_result(crawl_dfd)
+        finished = self.crawl_manager.wait_finished()
+        self.crawl_manager.close_crawl("timeout")
+        assert result.called
+        assert not finished.called
+        crawl_dfd.callback({})
+        assert finished.called
+
+    def test_get_max_items(self):
+        assert self.crawl_manager.get_max_items() is None
+        self.crawl_manager.max_items = 5
+        assert self.crawl_manager.get_max_items() == 5
+        self.patch(app_settings, "MAX_ITEMS_PER_CRAWL", 3)
+        assert self.crawl_manager.get_max_items() == 3
+
+    def test_close_crawl_result(self):
+        crawl_dfd: Deferred = Deferred()
+        results: list = []
+        self.crawl_manager._get_crawl_result(crawl_dfd).addCallback(results.append)
+        self.crawl_manager.max_items = 1
+        self.crawl_manager.get_item({"i": 0}, self.response, self.spider)
+        # The response does not wait for the spider to close.
+        assert len(results) == 1
+        assert results[0]["items"] == [{"i": 0}]
+        self.crawler.stats.set_value.assert_called_with(
+            "finish_reason",
+            "closespider_itemcount",
+        )
+        crawl_dfd.callback({"items": []})
+        assert len(results) == 1
+
+    def test_close_crawl_handler(self):
+        self.crawl_manager.close_handler = MagicMock()
+        self.crawl_manager.close_crawl("foo")
+        self.crawl_manager.close_crawl("bar")
+        self.crawl_manager.close_handler.assert_called_once_with("foo")
+        assert not self.crawler.engine.close_spider.called
+
     def test_get_item_another_spider(self):
         assert len(self.crawl_manager.items) == 0
         self.crawl_manager.get_item(self.item, self.response, self.another_spider)
@@ -241,8 +570,11 @@ class TestCollectDropped(TestCrawlManager):
         self.exception = Exception("foo")
         self.expected_result = {
             "item": self.item,
-            "response": self.response,
             "exception": str(self.exception),
+            "exception_class": "Exception",
+            "url": "http://localhost",
+            "status": 200,
+            "response": "<Response 200 http://localhost>",
         }
 
     def test_collect_dropped(self):
@@ -257,6 +589,48 @@ class TestCollectDropped(TestCrawlManager):
         assert len(self.crawl_manager.items_dropped) == 1
         assert self.crawl_manager.items_dropped[0] == self.expected_result
 
+    def test_collect_dropped_summary(self):
+        self.patch(app_settings, "DROPPED_ITEMS_DETAIL", "summary")
+        self.patch(app_settings, "DROPPED_ITEM_SUMMARY_LENGTH", 10)
+        self.crawl_manager.collect_dropped(
+            {"name": "a" * 20},
+            None,
+            self.exception,
+            self.spider,
+        )
+        assert self.crawl_manager.items_dropped == [
+            {
+                "item": "{'name': '...",
+                "exception": "foo",
+                "exception_class": "Exception",
+                "url": None,
+                "status": None,
+                "response": None,
+            },
+        ]
+
+    def test_collect_dropped_none(self):
+        self.patch(app_settings, "DROPPED_ITEMS_DETAIL", "none")
+        self.crawl_manager.collect_dropped(
+            self.item,
+            self.response,
+            self.exception,
+            self.spider,
+        )
+        assert not self.crawl_manager.items_dropped
+        assert self.crawl_manager.items_dropped_count == 1
+
+    def test_collect_dropped_projection(self):
+        self.crawl_manager.projection = ResponseProjection(items_dropped=False)
+        self.crawl_manager.collect_dropped(
+            self.item,
+            self.response,
+            self.exception,
+            self.spider,
+        )
+        assert not self.crawl_manager.items_dropped
+        assert self.crawl_manager.items_dropped_count == 1
+
     def test_collect_dropped_another_spider(self):
         assert len(self.crawl_manager.items_dropped) == 0
         self.crawl_manager.collect_dropped(
@@ -300,6 +674,16 @@ class TestReturnItems(TestCrawlManager):
         assert self.expected_result == result
         assert "errors" not in result
 
+    def test_return_items_projection(self):
+        self.crawl_manager.projection = ResponseProjection(
+            stats=["scheduler/*"],
+            exclude_stats=["*/dequeued/*"],
+            items_dropped=False,
+        )
+        result = self.crawl_manager.return_items(None)
+        assert result["stats"] == {"scheduler/enqueued/memory": 4}
+        assert "items_dropped" not in result
+
 
 class TestCreateSpiderRequest(TestCrawlManager):
     def test_valid_arguments(self):
@@ -335,3 +719,14 @@ class TestCreateProperLogFile(TestCrawlManager):
         assert datetime_object
         delta = now - datetime_object
         assert delta.seconds < 60
+
+
+class TestSpiderClassWithoutStart(unittest.TestCase):
+    def test_spider_class_without_start(self):
+        spidercls = spider_class_without_start(MetaSpider)
+        assert issubclass(spidercls, MetaSpider)
+        assert spidercls.name == MetaSpider.name
+        assert spidercls.__name__ == MetaSpider.__name__
+        assert spidercls is spider_class_without_start(MetaSpider)
+        assert spidercls.start is not Spider.start
+        assert MetaSpider.start is Spider.start
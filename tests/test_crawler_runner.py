@@ -1,6 +1,7 @@
 from unittest.mock import MagicMock
 
 from scrapy import signals
+from scrapy.crawler import Crawler
 from twisted.internet.defer import Deferred
 from twisted.trial import unittest
 
@@ -45,3 +46,16 @@ class CralwerProcessTestCase(unittest.TestCase):
             )
             handler_mock = getattr(crawl_manager, handler)
             assert handler_mock.call_count == 1
+
+    def test_create_crawler_from_crawler(self):
+        crawl_manager = CrawlManager("test", {"url": "http://localhost"})
+        crawler = Crawler(MetaSpider, {"LOG_FILE": "foo.log"})
+        crawler_process = ScrapyrtCrawlerRunner(get_settings(), crawl_manager)
+        assert crawler_process.create_crawler(crawler) is crawler
+        assert crawler.settings["LOG_FILE"] == "foo.log"
+        assert crawl_manager.crawler is crawler
+
+    def test_no_manager(self):
+        crawler_process = ScrapyrtCrawlerRunner(get_settings())
+        crawler = crawler_process.create_crawler(MetaSpider)
+        assert isinstance(crawler, Crawler)
@@ -0,0 +1,67 @@
+from unittest.mock import MagicMock, patch
+
+from scrapy.utils.test import get_crawler
+from twisted.trial import unittest
+
+from scrapyrt.downloader import (
+    CachingContextFactory,
+    SharedHTTP11DownloadHandler,
+    _shared_connections,
+)
+
+from .spiders import MetaSpider
+
+
+def create_handler(settings=None) -> SharedHTTP11DownloadHandler:
+    return SharedHTTP11DownloadHandler.from_crawler(get_crawler(MetaSpider, settings))
+
+
+@patch("scrapyrt.downloader._close_on_shutdown")
+class TestSharedHTTP11DownloadHandler(unittest.TestCase):
+    def setUp(self):
+        _shared_connections.clear()
+
+    def tearDown(self):
+        _shared_connections.clear()
+
+    def test_shared_connections(self, close_on_shutdown_mock):
+        handler = create_handler()
+        other_handler = create_handler()
+        assert handler._pool is other_handler._pool
+        assert handler._contextFactory is other_handler._contextFactory
+        assert isinstance(handler._contextFactory, CachingContextFactory)
+        close_on_shutdown_mock.assert_called_once()
+
+    def test_connection_settings(self, close_on_shutdown_mock):
+        handler = create_handler()
+        other_handler = create_handler({"DOWNLOAD_VERIFY_CERTIFICATES": True})
+        assert handler._pool is not other_handler._pool
+
+    def test_max_idle_connections_per_host(self, close_on_shutdown_mock):
+        with patch(
+            "scrapyrt.downloader.app_settings.MAX_IDLE_CONNECTIONS_PER_HOST",
+            "2",
+        ):
+            handler = create_handler()
+        assert handler._pool.maxPersistentPerHost == 2
+
+    async def test_close(self, close_on_shutdown_mock):
+        handler = create_handler()
+        handler._pool = MagicMock()
+        await handler.close()
+        handler._pool.closeCachedConnections.assert_not_called()
+
+
+class TestCachingContextFactory(unittest.TestCase):
+    def test_creator_for_netloc(self):
+        context_factory = MagicMock()
+        context_factory.creatorForNetloc.side_effect = lambda *args: object()
+        caching_context_factory = CachingContextFactory(context_factory, max_size=2)
+        creator = caching_context_factory.creatorForNetloc(b"example.com", 443)
+        assert caching_context_factory.creatorForNetloc(b"example.com", 443) is creator
+        caching_context_factory.creatorForNetloc(b"example.org", 443)
+        caching_context_factory.creatorForNetloc(b"example.net", 443)
+        assert (
+            caching_context_factory.creatorForNetloc(b"example.com", 443) is not creator
+        )
+        assert context_factory.creatorForNetloc.call_count == 4
@@ -0,0 +1,122 @@
+from functools import partial
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+import requests
+from scrapy import Request
+from scrapy.http import HtmlResponse
+from scrapy.utils.test import get_crawler
+from twisted.trial import unittest
+
+from scrapyrt.httpcache import SharedCacheStorage, SharedHttpCache, _shared_caches
+
+from .servers import MockServer, ScrapyrtTestServer
+from .spiders import MetaSpider
+from .utils import generate_project
+
+
+class TestSharedCacheStorage(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.cachedir = str(Path(tmp_dir.name) / "httpcache")
+        self.addCleanup(_shared_caches.clear)
+        self.request = Request("http://example.com")
+        self.response = HtmlResponse(
+            "http://example.com",
+            headers={"Content-Type": "text/html"},
+            body=b"<html></html>",
+        )
+
+    def open_storage(self, **settings):
+        crawler = get_crawler(
+            MetaSpider,
+            {"HTTPCACHE_DIR": self.cachedir, **settings},
+        )
+        crawler.spider = MetaSpider.from_crawler(crawler)
+        storage = SharedCacheStorage(crawler.settings)
+        storage.open_spider(crawler.spider)
+        return storage, crawler
+
+    def test_shared(self):
+        storage, crawler = self.open_storage()
+        assert storage.retrieve_response(crawler.spider, self.request) is None
+        storage.store_response(crawler.spider, self.request, self.response)
+        other_storage, other_crawler = self.open_storage()
+        assert other_storage.cache is storage.cache
+        response = other_storage.retrieve_response(other_crawler.spider, self.request)
+        assert isinstance(response, HtmlResponse)
+        assert response.body == self.response.body
+        assert response.headers["Content-Type"] == b"text/html"
+        assert other_crawler.stats.get_value("httpcache/shared/memory_hit") == 1
+        assert "cache_timestamp" in self.request.meta
+
+    def test_disk(self):
+        storage, crawler = self.open_storage()
+        storage.store_response(crawler.spider, self.request, self.response)
+        _shared_caches.clear()
+        storage, crawler = self.open_storage()
+        for _ in range(2):
+            assert storage.retrieve_response(crawler.spider, self.request)
+        assert crawler.stats.get_value("httpcache/shared/disk_hit") == 1
+        assert crawler.stats.get_value("httpcache/shared/memory_hit") == 1
+
+    def test_expiration(self):
+        storage, crawler = self.open_storage(HTTPCACHE_EXPIRATION_SECS=60)
+        with patch("scrapyrt.httpcache.time.time", return_value=0):
+            storage.store_response(crawler.spider, self.request, self.response)
+        with patch("scrapyrt.httpcache.time.time", return_value=60):
+            assert storage.retrieve_response(crawler.spider, self.request)
+        with patch("scrapyrt.httpcache.time.time", return_value=61):
+            assert storage.retrieve_response(crawler.spider, self.request) is None
+
+
+class TestSharedHttpCache(unittest.TestCase):
+    def test_memory_size(self):
+        with TemporaryDirectory() as tmp_dir:
+            cache = SharedHttpCache(str(Path(tmp_dir) / "cache.sqlite"), 10)
+            cache.set("a", 0, b"aaaa")
+            cache.set("b", 0, b"bbbb")
+            cache.get("a")
+            cache.set("c", 0, b"cccc")
+            assert list(cache._entries) == ["a", "c"]
+            assert cache.size == 8
+            assert cache.get("b") == (0, b"bbbb", False)
+            assert list(cache._entries) == ["c", "b"]
+            cache.set("d", 0, b"d" * 11)
+            assert cache.get("d") == (0, b"d" * 11, False)
+
+
+def test_http_cache_middleware():
+    site = MockServer()
+    site.start()
+    server = ScrapyrtTestServer(
+        site=site,
+        project_generator=partial(
+            generate_project,
+            settings={
+                "HTTPCACHE_ENABLED": True,
+                "HTTPCACHE_STORAGE": "scrapyrt.httpcache.SharedCacheStorage",
+            },
+        ),
+    )
+    server.start()
+    try:
+        stats = [
+            requests.get(
+                server.url("crawl.json"),
+                params={"spider_name": "test", "url": site.url("page1.html")},
+                timeout=30,
+            ).json()["stats"]
+            for _ in range(2)
+        ]
+    finally:
+        server.stop()
+        site.stop()
+    assert stats[0]["httpcache/miss"] == 1
+    assert stats[0]["httpcache/store"] == 1
+    assert "httpcache/hit" not in stats[0]
+    assert stats[1]["httpcache/hit"] == 1
+    assert stats[1]["httpcache/shared/memory_hit"] == 1
+    assert "httpcache/miss" not in stats[1]
@@ -0,0 +1,146 @@
+from unittest.mock import MagicMock
+
+import requests
+from twisted.internet.task import Clock
+from twisted.trial import unittest
+
+from scrapyrt.conf import app_settings
+from scrapyrt.jobs import JobStore
+from scrapyrt.metrics import metrics
+
+
+class TestJobStore(unittest.TestCase):
+    def setUp(self):
+        metrics.clear()
+        self.clock = Clock()
+        self.store = JobStore(clock=self.clock)
+        self.patch(app_settings, "MAX_JOBS", 2)
+        self.patch(app_settings, "JOB_RESULT_TTL", 60)
+
+    def tearDown(self):
+        metrics.clear()
+
+    def test_state(self):
+        job = self.store.create("test")
+        assert job.state == "queued"
+        job.manager = MagicMock(
+            crawler=MagicMock(),
+            request_count=2,
+            item_count=1,
+            items_dropped_count=0,
+        )
+        assert job.state == "running"
+        assert job.get_progress() == {"requests": 2, "items": 1, "items_dropped": 0}
+        self.store.finish(job, {"status": "ok"})
+        assert job.state == "finished"
+        assert job.manager is None
+        assert job.get_progress() == {"requests": 2, "items": 1, "items_dropped": 0}
+        assert self.store.get(job.id) is job
+
+    def test_max_jobs(self):
+        first = self.store.create("test")
+        self.store.create("test")
+        assert self.store.create("test") is None
+        assert metrics.get_value("jobs/rejected") == 1
+        self.store.finish(first, {"status": "ok"})
+        assert self.store.create("test") is not None
+        assert self.store.get(first.id) is None
+        assert metrics.get_value("jobs/evicted") == 1
+
+    def test_result_ttl(self):
+        job = self.store.create("test")
+        self.store.finish(job, {"status": "error"}, failed=True)
+        assert job.state == "failed"
+        self.clock.advance(59)
+        assert self.store.get(job.id) is job
+        self.clock.advance(1)
+        assert self.store.get(job.id) is None
+        assert len(self.store) == 0
+        assert metrics.get_value("jobs/expired") == 1
+
+    def test_wait(self):
+        job = self.store.create("test")
+        results: list = []
+        self.store.wait(job, 10).addCallback(results.append)
+        self.store.finish(job, {"status": "ok"})
+        assert results == [job]
+        assert not self.clock.getDelayedCalls()
+        self.store.wait(job, 10).addCallback(results.append)
+        assert results == [job, job]
+
+    def test_wait_timeout(self):
+        job = self.store.create("test")
+        results: list = []
+        self.store.wait(job, 10).addCallback(results.append)
+        self.clock.advance(10)
+        assert results == [job]
+        self.store.finish(job, {"status": "ok"})
+        assert results == [job]
+
+
+class TestJobsResourceIntegration:
+    def test_job(self, server):
+        res = requests.post(
+            server.url("jobs"),
+            json={
+                "spider_name": "test",
+                "request": {"url": server.site.url("delay/1.0")},
+            },
+            timeout=30,
+        )
+        assert res.status_code == 202
+        job = res.json()["job"]
+        assert job["state"] in ("queued", "running")
+        assert job["spider_name"] == "test"
+        assert "result" not in res.json()
+        res = requests.get(
+            server.url(f"jobs/{job['id']}"),
+            params={"wait": 30},
+            timeout=60,
+        )
+        res_json = res.json()
+        assert res_json["job"]["state"] == "finished"
+        assert res_json["job"]["progress"]["requests"] == 1
+        assert res_json["result"]["status"] == "ok"
+        assert res_json["result"]["items"] == [{"name": ["Page 1"]}]
+        assert res_json["job"]["progress"]["items"] == 1
+
+    def test_failed_job(self, server):
+        res = requests.post(
+            server.url("jobs"),
+            json={
+                "spider_name": "test",
+                "request": {"url": server.site.url("page1.html")},
+                "crawl_args": {"parse": "foo"},
+            },
+            timeout=30,
+        )
+        assert res.status_code == 400
+        res = requests.post(
+            server.url("jobs"),
+            json={
+                "spider_name": "test",
+                "request": {
+                    "url": server.site.url("page1.html"),
+                    "callback": "foo",
+                },
+            },
+            timeout=30,
+        )
+        job_id = res.json()["job"]["id"]
+        res = requests.get(
+            server.url(f"jobs/{job_id}"),
+            params={"wait": 30},
+            timeout=60,
+        )
+        res_json = res.json()
+        assert res.status_code == 200
+        assert res_json["job"]["state"] == "failed"
+        assert res_json["result"]["status"] == "error"
+        assert res_json["result"]["code"] == 400
+
+    def test_unknown_job(self, server):
+        res = requests.get(server.url("jobs/foo"), timeout=30)
+        assert res.status_code == 404
+        res = requests.get(server.url("jobs"), timeout=30)
+        assert res.status_code == 400
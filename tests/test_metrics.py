@@ -0,0 +1,65 @@
+from unittest.mock import MagicMock
+
+from twisted.internet.task import Clock
+from twisted.trial import unittest
+from twisted.web.server import Request
+
+from scrapyrt.metrics import Metrics, ReactorLagMonitor, metrics
+from scrapyrt.resources import MetricsResource
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.metrics = Metrics()
+
+    def test_values(self):
+        assert self.metrics.get_value("foo") is None
+        assert self.metrics.get_value("foo", 0) == 0
+        self.metrics.inc_value("foo")
+        self.metrics.inc_value("foo", 2)
+        assert self.metrics.get_value("foo") == 3
+        self.metrics.set_value("bar", 5)
+        self.metrics.max_value("bar", 4)
+        assert self.metrics.get_value("bar") == 5
+        self.metrics.max_value("bar", 6)
+        self.metrics.max_value("baz", 1)
+        assert self.metrics.get_metrics() == {"bar": 6, "baz": 1, "foo": 3}
+        assert list(self.metrics.get_metrics()) == ["bar", "baz", "foo"]
+        self.metrics.clear()
+        assert not self.metrics.get_metrics()
+
+
+class TestReactorLagMonitor(unittest.TestCase):
+    def setUp(self):
+        metrics.clear()
+        self.clock = Clock()
+        self.monitor = ReactorLagMonitor(0.1, 0.1, clock=self.clock)
+
+    def tearDown(self):
+        metrics.clear()
+
+    def test_lag(self):
+        self.monitor.start()
+        self.clock.advance(0.1)
+        assert metrics.get_value("reactor/lag") == 0
+        assert metrics.get_value("reactor/stalls") is None
+        self.clock.advance(0.35)
+        assert metrics.get_value("reactor/lag") == 0.25
+        assert metrics.get_value("reactor/lag_max") == 0.25
+        assert metrics.get_value("reactor/stalls") == 1
+        assert metrics.get_value("reactor/stall_time") == 0.25
+        self.clock.advance(0.1)
+        assert metrics.get_value("reactor/lag") == 0
+        assert metrics.get_value("reactor/lag_max") == 0.25
+        self.monitor.stop()
+        assert not self.clock.getDelayedCalls()
+
+
+class TestMetricsResource(unittest.TestCase):
+    def setUp(self):
+        metrics.clear()
+
+    def test_render_GET(self):
+        metrics.inc_value("foo")
+        result = MetricsResource().render_GET(MagicMock(spec=Request))
+        assert result == {"status": "ok", "metrics": {"foo": 1}}
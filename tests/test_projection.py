@@ -0,0 +1,79 @@
+import dataclasses
+
+import pytest
+import scrapy
+
+from scrapyrt.projection import ResponseProjection, get_field_tree, project
+
+
+class Item(scrapy.Item):
+    name = scrapy.Field()
+    offers = scrapy.Field()
+
+
+@dataclasses.dataclass
+class Offer:
+    price: float
+    currency: str
+
+
+def test_get_field_tree():
+    assert get_field_tree(["name", "offers.price", "offers.currency"]) == {
+        "name": None,
+        "offers": {"price": None, "currency": None},
+    }
+    assert get_field_tree(["offers.price", "offers"]) == {"offers": None}
+    assert get_field_tree(["offers", "offers.price"]) == {"offers": None}
+
+
+def test_project():
+    item = Item(
+        name="Foo",
+        offers=[
+            {"price": 1.5, "currency": "EUR", "seller": "a"},
+            Offer(price=2.0, currency="USD"),
+        ],
+    )
+    tree = get_field_tree(["name", "offers.price", "missing", "name.first"])
+    assert project(item, tree) == {
+        "name": "Foo",
+        "offers": [{"price": 1.5}, {"price": 2.0}],
+    }
+    assert project(item, get_field_tree(["name.first"])) == {}
+
+
+def test_from_api_params():
+    assert ResponseProjection.from_api_params({"url": "http://localhost"}) is None
+    projection = ResponseProjection.from_api_params(
+        {"fields": "name, offers.price", "stats": "", "items_dropped": "false"},
+    )
+    assert projection is not None
+    assert projection.fields == ["name", "offers.price"]
+    assert projection.stats == []
+    assert not projection.items_dropped
+    with pytest.raises(ValueError, match="'fields' must be a list of strings"):
+        ResponseProjection.from_api_params({"fields": [1]})
+    with pytest.raises(ValueError, match="'items_dropped' must be true or false"):
+        ResponseProjection.from_api_params({"items_dropped": "maybe"})
+
+
+def test_filter_stats():
+    stats = {
+        "downloader/request_count": 1,
+        "downloader/response_count": 1,
+        "finish_reason": "finished",
+        "item_scraped_count": 2,
+    }
+    projection = ResponseProjection(stats=["downloader/*", "finish_reason"])
+    assert list(projection.filter_stats(stats)) == [
+        "downloader/request_count",
+        "downloader/response_count",
+        "finish_reason",
+    ]
+    projection = ResponseProjection(exclude_stats=["downloader/*"])
+    assert list(projection.filter_stats(stats)) == [
+        "finish_reason",
+        "item_scraped_count",
+    ]
+    projection = ResponseProjection(fields=["name"])
+    assert projection.filter_stats(stats) == stats
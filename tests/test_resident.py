@@ -0,0 +1,125 @@
+from unittest.mock import MagicMock
+
+import pytest
+from scrapy import Request
+from scrapy.exceptions import DropItem
+from scrapy.http import Response
+from scrapy.statscollectors import StatsCollector
+from twisted.trial import unittest
+
+from scrapyrt.conf import app_settings
+from scrapyrt.resident import (
+    CALL_ID_META_KEY,
+    ResidentCall,
+    ResidentCrawl,
+    is_resident_spider,
+)
+
+from .spiders import MetaSpider
+from .utils import get_settings
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    (
+        ([], False),
+        (["meta"], True),
+        ("meta", True),
+        ("test,meta", True),
+        ("metaspider", False),
+    ),
+)
+def test_is_resident_spider(value, expected):
+    resident_spiders = app_settings.RESIDENT_SPIDERS
+    try:
+        app_settings.RESIDENT_SPIDERS = value
+        assert is_resident_spider("meta") is expected
+    finally:
+        app_settings.RESIDENT_SPIDERS = resident_spiders
+
+
+class TestResidentCrawl(unittest.TestCase):
+    def setUp(self):
+        self.resident_crawl = ResidentCrawl(MagicMock(), MetaSpider, get_settings())
+        self.manager = MagicMock()
+        self.call = ResidentCall(
+            1,
+            self.manager,
+            StatsCollector(self.resident_crawl.crawler),
+        )
+        self.call.stats.set_value("start_time", MagicMock())
+        self.resident_crawl._calls[self.call.id] = self.call
+        self.results: list[None] = []
+        self.call.deferred.addCallback(self.results.append)
+        request = Request("http://localhost", meta={CALL_ID_META_KEY: 1})
+        self.response = Response("http://localhost", request=request)
+
+    def test_items(self):
+        item = {"foo": "bar"}
+        callback = self.resident_crawl._wrap_callback(
+            self.call,
+            lambda response: [item, Request("http://localhost/next")],
+        )
+        assert list(callback(self.response)) == [item]
+        assert self.call.output_done
+        assert self.call.pending_items == 1
+        assert self.call.stats.get_value("resident/request_ignored_count") == 1
+        assert not self.results
+        self.resident_crawl.item_scraped(item, self.response, MagicMock())
+        self.manager.get_item.assert_called_once()
+        assert self.results == [None]
+        assert self.call.stats.get_value("finish_reason") == "finished"
+        assert not self.resident_crawl._calls
+
+    def test_item_dropped(self):
+        callback = self.resident_crawl._wrap_callback(self.call, lambda response: {})
+        list(callback(self.response))
+        self.resident_crawl.item_dropped(
+            {},
+            self.response,
+            DropItem("foo"),
+            MagicMock(),
+        )
+        self.manager.collect_dropped.assert_called_once()
+        assert self.call.stats.get_value("item_dropped_count") == 1
+        assert self.call.stats.get_value("item_dropped_reasons_count/DropItem") == 1
+        assert self.results == [None]
+
+    def test_single_item(self):
+        callback = self.resident_crawl._wrap_callback(self.call, lambda response: {})
+        assert list(callback(self.response)) == [{}]
+        assert self.call.pending_items == 1
+
+    def test_non_items(self):
+        callback = self.resident_crawl._wrap_callback(
+            self.call,
+            lambda response: [None, "foo"],
+        )
+        assert list(callback(self.response)) == [None, "foo"]
+        assert self.call.pending_items == 0
+        assert self.results == [None]
+        assert self.call.stats.get_value("finish_reason") == "finished"
+
+    def test_no_output(self):
+        callback = self.resident_crawl._wrap_callback(self.call, lambda response: None)
+        assert not list(callback(self.response))
+        assert self.results == [None]
+
+    def test_callback_error(self):
+        def callback(response):
+            raise ValueError("foo")
+
+        callback = self.resident_crawl._wrap_callback(self.call, callback)
+        with pytest.raises(ValueError, match="foo"):
+            callback(self.response)
+        assert self.results == [None]
+
+    def test_other_calls_ignored(self):
+        response = Response("http://localhost", request=Request("http://localhost"))
+        self.resident_crawl.item_scraped({}, response, MagicMock())
+        self.manager.get_item.assert_not_called()
+
+    def test_spider_closed(self):
+        self.resident_crawl.spider_closed(MagicMock(), "shutdown")
+        assert self.results == [None]
+        assert self.call.stats.get_value("finish_reason") == "shutdown"
@@ -0,0 +1,146 @@
+from unittest.mock import MagicMock, patch
+
+from twisted.internet.address import IPv4Address
+from twisted.internet.task import Clock
+from twisted.trial import unittest
+
+from scrapyrt import resolver
+from scrapyrt.resolver import CachingHostnameResolver, install_resolver, prefetch_url
+
+
+class FakeResolver:
+    def __init__(self):
+        self.receivers = []
+
+    def resolveHostName(self, receiver, host_name, *args):
+        self.receivers.append((receiver, host_name))
+
+    def complete(self, *hosts):
+        receiver, _ = self.receivers.pop(0)
+        for host in hosts:
+            receiver.addressResolved(IPv4Address("TCP", host, 0))
+        receiver.resolutionComplete()
+
+
+class TestCachingHostnameResolver(unittest.TestCase):
+    def setUp(self):
+        self.original_resolver = FakeResolver()
+        self.reactor = MagicMock(nameResolver=self.original_resolver)
+        self.resolver = CachingHostnameResolver(self.reactor, ttl=60)
+
+    def resolve(self, host_name="example.com", port=80):
+        receiver = MagicMock()
+        self.resolver.resolveHostName(receiver, host_name, port)
+        return receiver
+
+    def resolved_addresses(self, receiver):
+        receiver.resolutionBegan.assert_called_once()
+        receiver.resolutionComplete.assert_called_once()
+        return [call[0][0] for call in receiver.addressResolved.call_args_list]
+
+    def test_install_on_reactor(self):
+        self.resolver.install_on_reactor()
+        self.reactor.installNameResolver.assert_called_once_with(self.resolver)
+
+    def test_cache(self):
+        receiver = self.resolve()
+        waiting_receiver = self.resolve(port=443)
+        assert len(self.original_resolver.receivers) == 1
+        self.original_resolver.complete("10.0.0.1", "10.0.0.2")
+        assert self.resolved_addresses(receiver) == [
+            IPv4Address("TCP", "10.0.0.1", 80),
+            IPv4Address("TCP", "10.0.0.2", 80),
+        ]
+        assert self.resolved_addresses(waiting_receiver) == [
+            IPv4Address("TCP", "10.0.0.1", 443),
+            IPv4Address("TCP", "10.0.0.2", 443),
+        ]
+        cached_receiver = self.resolve(port=8080)
+        assert not self.original_resolver.receivers
+        assert self.resolved_addresses(cached_receiver) == [
+            IPv4Address("TCP", "10.0.0.1", 8080),
+            IPv4Address("TCP", "10.0.0.2", 8080),
+        ]
+
+    def test_ttl(self):
+        self.resolve()
+        with patch("scrapyrt.resolver.monotonic", return_value=0):
+            self.original_resolver.complete("10.0.0.1")
+        with patch("scrapyrt.resolver.monotonic", return_value=59):
+            self.resolve()
+        assert not self.original_resolver.receivers
+        with patch("scrapyrt.resolver.monotonic", return_value=60):
+            self.resolve()
+        assert len(self.original_resolver.receivers) == 1
+
+    def test_cache_size(self):
+        self.resolver.cache_size = 2
+        for host_name in ("a.com", "b.com"):
+            self.resolve(host_name)
+            self.original_resolver.complete("10.0.0.1")
+        self.resolve("a.com")
+        self.resolve("c.com")
+        self.original_resolver.complete("10.0.0.1")
+        assert list(self.resolver._cache) == ["a.com", "c.com"]
+
+    def test_cancel(self):
+        receiver = self.resolve()
+        resolution = receiver.resolutionBegan.call_args[0][0]
+        waiting_receiver = self.resolve(port=443)
+        resolution.cancel()
+        self.original_resolver.complete("10.0.0.1")
+        receiver.addressResolved.assert_not_called()
+        receiver.resolutionComplete.assert_not_called()
+        assert self.resolved_addresses(waiting_receiver) == [
+            IPv4Address("TCP", "10.0.0.1", 443),
+        ]
+        self.resolve()
+        assert not self.original_resolver.receivers
+
+    def test_timeout(self):
+        clock = Clock()
+        self.reactor.callLater = clock.callLater
+        self.resolver.timeout = 5
+        receiver = self.resolve()
+        clock.advance(5)
+        assert self.resolved_addresses(receiver) == []
+        # Late results are ignored, and the next lookup starts again.
+        self.original_resolver.complete("10.0.0.1")
+        receiver = self.resolve()
+        assert len(self.original_resolver.receivers) == 1
+        self.original_resolver.complete("10.0.0.2")
+        assert self.resolved_addresses(receiver) == [
+            IPv4Address("TCP", "10.0.0.2", 80),
+        ]
+        assert not clock.getDelayedCalls()
+
+    def test_failure_not_cached(self):
+        receiver = self.resolve()
+        self.original_resolver.complete()
+        assert self.resolved_addresses(receiver) == []
+        self.resolve()
+        assert len(self.original_resolver.receivers) == 1
+
+    def test_prefetch(self):
+        self.resolver.prefetch("example.com")
+        receiver = self.resolve()
+        assert len(self.original_resolver.receivers) == 1
+        self.original_resolver.complete("10.0.0.1")
+        assert self.resolved_addresses(receiver) == [
+            IPv4Address("TCP", "10.0.0.1", 80),
+        ]
+        self.resolver.prefetch("example.com")
+        assert not self.original_resolver.receivers
+
+    def test_prefetch_url(self):
+        prefetch_mock = MagicMock()
+        try:
+            install_resolver(self.reactor, 60).prefetch = prefetch_mock  # type: ignore[method-assign]
+            prefetch_url("http://example.com:8080/path")
+            prefetch_url("http://127.0.0.1/path")
+            prefetch_url("http://[::1]/path")
+            prefetch_url("http://[invalid/path")
+            prefetch_url(None)
+        finally:
+            resolver._resolver = None
+        prefetch_mock.assert_called_once_with("example.com")
@@ -7,34 +7,18 @@ from urllib.parse import quote
 
 import pytest
 import requests
+from twisted.internet.defer import Deferred, succeed
 from twisted.trial import unittest
 from twisted.web.error import Error
-from twisted.web.server import Request
 
+from scrapyrt.cache import MemoryResultCache
+from scrapyrt.conf import app_settings
 from scrapyrt.resources import CrawlResource
-
-from .servers import MockServer, ScrapyrtTestServer
-
-
-@pytest.fixture
-def server(request):
-    site = MockServer()
-    site.start()
-    server = ScrapyrtTestServer(site=site)
-    server.start()
-    yield server
-    server.stop()
-    site.stop()
-
-
-@pytest.fixture
-def t_req():
-    return MagicMock(spec=Request)
-
-
-@pytest.fixture
-def resource():
-    return CrawlResource()
+from scrapyrt.serialization import (
+    JSON_CONTENT_TYPE,
+    ScrapyJSONSerializer,
+    SerializedResponse,
+)
 
 
 class TestCrawlResource:
@@ -67,6 +51,49 @@ class TestCrawlResource:
         assert instance.crawl.called
         resource.validate_options.assert_called_once_with(scrapy_params, api_params)
 
+    @pytest.mark.parametrize(
+        ("api_params", "coalesce_crawls", "crawls"),
+        (
+            ({}, True, 1),
+            ({"coalesce": "false"}, True, 2),
+            ({}, False, 2),
+        ),
+    )
+    def test_coalesce(self, resource, api_params, coalesce_crawls, crawls):
+        with (
+            patch("scrapyrt.core.CrawlManager", spec=True) as manager,
+            patch.object(app_settings, "COALESCE_CRAWLS", coalesce_crawls),
+        ):
+            manager.return_value.crawl.side_effect = Deferred
+            for _ in range(2):
+                resource.prepare_crawl(
+                    {"spider_name": "test", **api_params},
+                    {"url": "http://foo.com"},
+                )
+        assert manager.return_value.crawl.call_count == crawls
+
+    def test_result_cache_serialization(self, t_req, resource):
+        response = {"status": "ok", "items": [{"name": "foo"}]}
+        serializer = MagicMock(wraps=ScrapyJSONSerializer())
+        resource.get_json_serializer = Mock(return_value=serializer)
+        resource.get_crawl_key = Mock(return_value="key")
+        resource.prepare_crawl = Mock(return_value=succeed(response))
+        t_req.getHeader.return_value = None
+        with patch(
+            "scrapyrt.resources.get_result_cache",
+            return_value=MemoryResultCache(),
+        ):
+            miss = resource.render_crawl(t_req, {"spider_name": "test"}, {})
+            hit = resource.render_crawl(t_req, {"spider_name": "test"}, {})
+        # The body serialized for the cache is used by both responses.
+        serializer.dumps.assert_called_once_with(response)
+        body = ScrapyJSONSerializer().dumps(response)
+        results: list[Any] = []
+        miss.addCallback(results.append)
+        assert results == [SerializedResponse(JSON_CONTENT_TYPE, body)]
+        assert hit == SerializedResponse(JSON_CONTENT_TYPE, body)
+        assert resource.render_object(hit, t_req) == body + b"\n"
+
     def test_render_POST_invalid_json(self, t_req, resource):
         t_req.content.getvalue.return_value = b"{{{{{"
         with (
@@ -79,6 +106,23 @@ class TestCrawlResource:
         assert re.search(b"Invalid JSON in POST", e.value.message)
         assert not manager.return_value.crawl.called
 
+    def test_render_POST_batch_stream(self, t_req, resource):
+        t_req.content.getvalue.return_value = json.dumps(
+            {
+                "spider_name": "test",
+                "requests": [{"url": "http://foo.com"}],
+                "stream": True,
+            },
+        )
+        with (
+            patch("scrapyrt.core.CrawlManager", spec=True) as manager,
+            pytest.raises(Error) as e,
+        ):
+            resource.render_POST(t_req)
+        assert e.value.status == b"400"
+        assert e.value.message == b"Batch crawls cannot be streamed"
+        assert not manager.return_value.crawl.called
+
     def test_render_POST_invalid_options(self, t_req, resource):
         t_req.content.getvalue.return_value = json.dumps(
             {"spider_name": "tests", "request": {"foo": "bar"}},
@@ -346,6 +390,142 @@ class TestCrawlResourceIntegration:
         assert res.status_code == 200
         assert res.json()["items"] == [{"name": "Some bytes here"}]
 
+    @pytest.mark.parametrize("method", (perform_get, perform_post))
+    def test_projection(self, server, method):
+        res = method(
+            server.url("crawl.json"),
+            {
+                "spider_name": "test",
+                "fields": "missing",
+                "stats": "item_scraped_count,finish_*",
+                "exclude_stats": "finish_time",
+                "items_dropped": "false",
+            },
+            {"url": server.site.url("page1.html")},
+        )
+        res_json = res.json()
+        assert res_json["items"] == [{}]
+        assert res_json["stats"] == {
+            "finish_reason": "finished",
+            "item_scraped_count": 1,
+        }
+        assert "items_dropped" not in res_json
+
+    def test_projection_invalid(self, server):
+        res = perform_post(
+            server.url("crawl.json"),
+            {"spider_name": "test", "fields": {"name": True}},
+            {"url": server.site.url("page1.html")},
+        )
+        assert res.status_code == 400
+        assert "'fields' must be a list of strings" in res.json()["message"]
+
+    @pytest.mark.parametrize(
+        "server",
+        ({"ITEMS_MEMORY_LIMIT": 2, "THREADED_SERIALIZATION_MIN_ITEMS": 1},),
+        indirect=True,
+    )
+    def test_spilled_items(self, server):
+        expected_items = [{"name": f"Item {i}"} for i in range(5)]
+        for accept in ("application/json", "application/msgpack", "application/cbor"):
+            res = requests.get(
+                server.url("crawl.json"),
+                params={
+                    "spider_name": "test",
+                    "url": server.site.url("page1.html"),
+                    "callback": "return_many",
+                },
+                headers={"Accept": accept},
+                timeout=30,
+            )
+            assert res.status_code == 200
+            assert res.headers["Content-Type"] == accept
+            vary = [value.strip() for value in res.headers["Vary"].split(",")]
+            assert vary.count("Accept") == 1
+            if accept == "application/json":
+                res_json = res.json()
+            elif accept == "application/msgpack":
+                msgpack = pytest.importorskip("msgpack")
+                res_json = msgpack.unpackb(res.content)
+            else:
+                cbor2 = pytest.importorskip("cbor2")
+                res_json = cbor2.loads(res.content)
+            assert res_json["status"] == "ok"
+            assert res_json["items"] == expected_items
+        metrics = requests.get(server.url("metrics.json"), timeout=30).json()
+        assert metrics["metrics"]["crawls/spilled"] == 3
+
+    @pytest.mark.parametrize("method", (perform_get, perform_post))
+    def test_max_items(self, server, method):
+        res = method(
+            server.url("crawl.json"),
+            {"spider_name": "test", "max_items": 3},
+            {"url": server.site.url("page1.html"), "callback": "return_many"},
+        )
+        res_json = res.json()
+        assert res_json["items"] == [{"name": f"Item {i}"} for i in range(3)]
+        assert res_json["stats"]["finish_reason"] == "closespider_itemcount"
+
+    @pytest.mark.parametrize("max_items", ("0", "foo"))
+    def test_max_items_invalid(self, server, max_items):
+        res = perform_get(
+            server.url("crawl.json"),
+            {"spider_name": "test", "max_items": max_items},
+            {"url": server.site.url("page1.html")},
+        )
+        assert res.status_code == 400
+        assert res.json()["message"] == "'max_items' must be a positive integer"
+
+    @pytest.mark.parametrize("method", (perform_get, perform_post))
+    def test_timeout(self, server, method):
+        res = method(
+            server.url("crawl.json"),
+            {"spider_name": "test", "timeout": 1},
+            {"url": server.site.url("page1.html"), "callback": "follow_delayed"},
+        )
+        res_json = res.json()
+        assert res_json["items"] == [{"name": "Item 0"}]
+        assert res_json["partial"] is True
+        assert res_json["stop_reason"] == "timeout"
+        assert res_json["stats"]["finish_reason"] == "timeout"
+        # Sent before the delayed download finishes.
+        assert res.elapsed.total_seconds() < 3
+
+    def test_not_partial(self, server):
+        res = perform_get(
+            server.url("crawl.json"),
+            {"spider_name": "test", "timeout": 30},
+            {"url": server.site.url("page1.html")},
+        )
+        assert "partial" not in res.json()
+
+    @pytest.mark.parametrize("timeout", ("0", "-1", "foo"))
+    def test_timeout_invalid(self, server, timeout):
+        res = perform_get(
+            server.url("crawl.json"),
+            {"spider_name": "test", "timeout": timeout},
+            {"url": server.site.url("page1.html")},
+        )
+        assert res.status_code == 400
+        assert res.json()["message"] == "'timeout' must be a positive number"
+
+    @pytest.mark.parametrize(
+        "server",
+        ({"MAX_ITEMS_PER_CRAWL": 2},),
+        indirect=True,
+    )
+    def test_max_items_per_crawl(self, server):
+        res = perform_get(
+            server.url("crawl.json"),
+            {"spider_name": "test"},
+            {"url": server.site.url("page1.html"), "callback": "return_many"},
+        )
+        res_json = res.json()
+        assert res_json["items"] == [{"name": "Item 0"}, {"name": "Item 1"}]
+        assert res_json["stats"]["finish_reason"] == "closespider_itemcount"
+
+
+class TestSpiderArgumentsIntegration:
     def test_crawl_with_argument_get(self, server):
         url = server.url("crawl.json")
         postcode = "43-300"
@@ -477,3 +657,212 @@ class TestCrawlResourceIntegration:
             assert len(res_json["items"]) == 1
 
         check_res(res)
+
+
+class TestCrawlPerformanceIntegration:
+    @pytest.mark.parametrize("server", ({"RESIDENT_SPIDERS": "test"},), indirect=True)
+    def test_resident_spider(self, server):
+        for page in ("page1", "page2", "page1"):
+            res = perform_get(
+                server.url("crawl.json"),
+                {"spider_name": "test"},
+                {"url": server.site.url(f"{page}.html")},
+            )
+            assert res.status_code == 200
+            res_json = res.json()
+            assert res_json["items"] == [{"name": [page.replace("page", "Page ")]}]
+            assert res_json["stats"]["item_scraped_count"] == 1
+            assert res_json["stats"]["response_received_count"] == 1
+            assert res_json["stats"]["finish_reason"] == "finished"
+        metrics = requests.get(server.url("metrics.json"), timeout=30).json()
+        assert metrics["metrics"]["resident/crawls"] == 1
+        assert metrics["metrics"]["resident/calls"] == 3
+        # The resident crawl logs to a file of its own, calls get no log file.
+        log_files = list((Path(server.cwd) / "logs" / "test").iterdir())
+        assert [path.name.startswith("resident-") for path in log_files] == [True]
+
+    @pytest.mark.parametrize("server", ({"RESIDENT_SPIDERS": "test"},), indirect=True)
+    def test_resident_spider_errors(self, server):
+        res = perform_get(
+            server.url("crawl.json"),
+            {"spider_name": "test"},
+            {"url": server.site.url("err/503"), "errback": "some_errback"},
+        )
+        assert res.status_code == 200
+        assert res.json()["items"] == []
+        res = perform_get(
+            server.url("crawl.json"),
+            {"spider_name": "test"},
+            {"url": server.site.url("err/503")},
+        )
+        assert res.status_code == 200
+        assert res.json()["items"] == []
+        res = perform_get(
+            server.url("crawl.json"),
+            {"spider_name": "test"},
+            {"url": server.site.url("page1.html"), "callback": "nonexistent"},
+        )
+        assert res.status_code == 400
+        assert "Invalid spider callback" in res.json()["message"]
+        res = perform_get(
+            server.url("crawl.json"),
+            {"spider_name": "test"},
+            {"url": server.site.url("page1.html")},
+        )
+        assert res.json()["items"] == [{"name": ["Page 1"]}]
+        metrics = requests.get(server.url("metrics.json"), timeout=30).json()
+        assert metrics["metrics"]["resident/crawls"] == 1
+
+    @pytest.mark.parametrize("server", ({"RESIDENT_SPIDERS": "test"},), indirect=True)
+    def test_resident_spider_with_argument(self, server):
+        res = perform_get(
+            server.url("crawl.json"),
+            {"spider_name": "test", "crawl_args": json.dumps({"postcode": "43-300"})},
+            {"url": server.site.url("page1.html"), "callback": "return_argument"},
+        )
+        assert res.json()["items"] == [{"name": "43-300"}]
+        metrics = requests.get(server.url("metrics.json"), timeout=30).json()
+        assert "resident/calls" not in metrics["metrics"]
+
+    def test_shared_http_connections(self, server):
+        for _ in range(2):
+            res = perform_get(
+                server.url("crawl.json"),
+                {"spider_name": "test"},
+                {"url": server.site.url("page1.html")},
+            )
+            assert res.json()["items"] == [{"name": ["Page 1"]}]
+        metrics = requests.get(server.url("metrics.json"), timeout=30).json()
+        assert metrics["metrics"]["http_connections/pools"] == 1
+
+    def test_dns_cache(self, server):
+        for _ in range(2):
+            res = perform_get(
+                server.url("crawl.json"),
+                {"spider_name": "test"},
+                {"url": server.site.url("page1.html")},
+            )
+            assert res.json()["items"] == [{"name": ["Page 1"]}]
+        metrics = requests.get(server.url("metrics.json"), timeout=30).json()
+        # The second call finds the host name in the cache.
+        assert metrics["metrics"]["dns_cache/prefetch"] == 1
+
+    def test_batch(self, server):
+        res = requests.post(
+            server.url("crawl.json"),
+            json={
+                "spider_name": "test",
+                "requests": [
+                    {"url": server.site.url("page1.html")},
+                    {"url": server.site.url("page2.html")},
+                    {"url": server.site.url("err/404")},
+                    {"url": server.site.url("page3.html"), "callback": "return_bytes"},
+                ],
+            },
+            timeout=30,
+        )
+        res_json = res.json()
+        assert res_json["status"] == "ok"
+        assert res_json["items"] == []
+        assert res_json["stats"]["downloader/request_count"] == 4
+        assert res_json["results"] == [
+            {
+                "url": server.site.url("page1.html"),
+                "items": [{"name": ["Page 1"]}],
+                "errors": [],
+            },
+            {
+                "url": server.site.url("page2.html"),
+                "items": [{"name": ["Page 2"]}],
+                "errors": [],
+            },
+            {
+                "url": server.site.url("err/404"),
+                "items": [],
+                "errors": ["HttpError: Ignoring non-200 response"],
+            },
+            {
+                "url": server.site.url("page3.html"),
+                "items": [{"name": "Some bytes here"}],
+                "errors": [],
+            },
+        ]
+
+    @pytest.mark.parametrize(
+        ("requests_param", "message"),
+        (
+            ([], "'requests' must be a non-empty list of requests"),
+            ([{"url": "http://localhost", "foo": 1}], "'foo' is not a valid argument"),
+            ([{"method": "POST"}], "'url' is required for every request of a batch"),
+        ),
+    )
+    def test_batch_invalid(self, server, requests_param, message):
+        res = requests.post(
+            server.url("crawl.json"),
+            json={"spider_name": "test", "requests": requests_param},
+            timeout=30,
+        )
+        assert res.status_code == 400
+        assert message in res.json()["message"]
+
+    @pytest.mark.parametrize(
+        "server",
+        (
+            {"RESULT_CACHE": "scrapyrt.cache.MemoryResultCache"},
+            {"RESULT_CACHE": "scrapyrt.cache.SQLiteResultCache"},
+        ),
+        indirect=True,
+    )
+    def test_result_cache(self, server):
+        def crawl(headers=None):
+            return requests.get(
+                server.url("crawl.json"),
+                params={"spider_name": "test", "url": server.site.url("page1.html")},
+                headers=headers,
+                timeout=30,
+            )
+
+        res = crawl()
+        etag = res.headers["ETag"]
+        assert crawl().json() == res.json()
+        assert crawl().headers["ETag"] == etag
+        not_modified = crawl({"If-None-Match": etag})
+        assert not_modified.status_code == 304
+        assert not_modified.content == b""
+        assert crawl({"Cache-Control": "no-cache"}).status_code == 200
+        metrics = requests.get(server.url("metrics.json"), timeout=30).json()
+        assert metrics["metrics"]["result_cache/hit"] == 3
+        assert metrics["metrics"]["result_cache/miss"] == 1
+        assert metrics["metrics"]["crawls/started"] == 2
+
+    @pytest.mark.parametrize(
+        "server",
+        ({"JSON_SERIALIZER": "scrapyrt.serialization.OrjsonSerializer"},),
+        indirect=True,
+    )
+    def test_json_serializer(self, server):
+        pytest.importorskip("orjson")
+        res = perform_get(
+            server.url("crawl.json"),
+            {"spider_name": "test"},
+            {"url": server.site.url("page1.html"), "callback": "return_bytes"},
+        )
+        assert res.status_code == 200
+        assert res.json()["items"] == [{"name": "Some bytes here"}]
+        assert res.json()["stats"]["item_scraped_count"] == 1
+
+    @pytest.mark.parametrize(
+        "server",
+        ({"THREADED_SERIALIZATION_MIN_ITEMS": 1, "REACTOR_LAG_INTERVAL": 0.1},),
+        indirect=True,
+    )
+    def test_threaded_serialization(self, server):
+        res = perform_get(
+            server.url("crawl.json"),
+            {"spider_name": "test"},
+            {"url": server.site.url("page1.html")},
+        )
+        assert res.json()["items"] == [{"name": ["Page 1"]}]
+        metrics = requests.get(server.url("metrics.json"), timeout=30).json()
+        assert metrics["metrics"]["serialization/threaded"] == 1
+        assert "reactor/lag_max" in metrics["metrics"]
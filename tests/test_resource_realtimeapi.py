@@ -3,6 +3,8 @@ from pathlib import Path
 from unittest.mock import patch
 
 from twisted.trial import unittest
+from twisted.web.resource import EncodingResourceWrapper, Resource
+from twisted.web.test.requesthelper import DummyRequest
 
 from scrapyrt.conf import app_settings
 from scrapyrt.resources import CrawlResource, RealtimeApi, ServiceResource
@@ -36,6 +38,17 @@ class TestRealtimeApi(unittest.TestCase):
         service_root = RealtimeApi()
         self._check_entities(service_root, expected_entities)
 
+    def test_children_encoded(self):
+        service_root = RealtimeApi()
+        request = DummyRequest([b"crawl.json"])
+        child = service_root.getChildWithDefault(b"crawl.json", request)
+        assert isinstance(child, EncodingResourceWrapper)
+        assert child.isLeaf
+        assert child.getEncoder(request) is None
+        other = Resource()
+        service_root.children[b"foo"] = other
+        assert service_root.getChildWithDefault(b"foo", request) is other
+
     def _check_entities(self, service_root, expected_entities):
         assert not service_root.isLeaf
         entities = service_root.listEntities()
@@ -6,15 +6,21 @@ from twisted.python.failure import Failure
 from twisted.trial import unittest
 from twisted.web import server
 from twisted.web.error import Error, UnsupportedMethod
+from twisted.web.http_headers import Headers
 from twisted.web.server import Request
 
-from scrapyrt.resources import ServiceResource
+from scrapyrt.conf import app_settings
+from scrapyrt.resources import AdaptedScrapyJSONEncoder, ServiceResource
 
 
 class TestServiceResource(unittest.TestCase):
     def setUp(self):
         self.resource = ServiceResource()
-        self.request = MagicMock(spec=Request)
+        self.request = MagicMock(
+            spec=Request,
+            requestHeaders=Headers(),
+            responseHeaders=Headers(),
+        )
         self.request.code = 200
 
         def set_code(code):
@@ -79,6 +85,32 @@ class TestRender(TestServiceResource):
         assert obj["code"] == 500
         assert log_err_mock.called
 
+    def test_render_large_response(self, render_mock, log_err_mock):
+        self.patch(app_settings, "THREADED_SERIALIZATION_MIN_ITEMS", 2)
+        render_mock.return_value = {"status": "ok", "items": [1, 2]}
+        with patch("scrapyrt.resources.deferToThread") as defer_to_thread:
+            defer_to_thread.side_effect = lambda func, obj: succeed(func(obj))
+            result = self.resource.render(self.request)
+        assert result == server.NOT_DONE_YET
+        defer_to_thread.assert_called_once()
+        assert json.loads(self.request_write_values[0]) == {
+            "status": "ok",
+            "items": [1, 2],
+        }
+        assert self.request.finish.called
+        render_mock.return_value = {"status": "ok", "items": [1]}
+        result = self.resource.render(self.request)
+        assert json.loads(result) == {"status": "ok", "items": [1]}
+
+    def test_render_serialization_error(self, render_mock, log_err_mock):
+        render_mock.return_value = succeed({"status": "ok", "items": [object()]})
+        result = self.resource.render(self.request)
+        assert result == server.NOT_DONE_YET
+        obj = json.loads(self.request_write_values[0])
+        assert obj["status"] == "error"
+        assert obj["code"] == 500
+        assert self.request.finish.called
+
 
 @patch("twisted.python.log.msg")
 class TestHandleErrors(TestServiceResource):
@@ -148,7 +180,11 @@ class TestRenderObject(TestServiceResource):
         super().setUp()
         self.obj = {"status": "ok", "key": "value"}
         self.headers: list[tuple[bytes, bytes]] = []
-        self.request = MagicMock(spec=Request)
+        self.request = MagicMock(
+            spec=Request,
+            requestHeaders=Headers(),
+            responseHeaders=Headers(),
+        )
 
         def add_header(name, value):
             self.headers.append((name, value))
@@ -190,3 +226,16 @@ class TestRenderObject(TestServiceResource):
         self.resource.allowedMethods = (b"GET", b"POST")
         self.resource.render_object(self.obj, self.request)
         self._test_access_control_allow_methods_header()
+
+    def test_json_encoder(self):
+        class Encoder(AdaptedScrapyJSONEncoder):
+            def encode(self, o):
+                return '{"encoder": "custom"}'
+
+        class CustomResource(ServiceResource):
+            json_encoder = Encoder()
+
+        self.resource = CustomResource()
+        result = self.resource.render_object(self.obj, self.request)
+        assert json.loads(result) == {"encoder": "custom"}
+        assert self.resource.encode_json(self.obj) == b'{"encoder": "custom"}'
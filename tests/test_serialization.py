@@ -0,0 +1,268 @@
+import datetime as dt
+import json
+from collections import OrderedDict
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+import scrapy
+from twisted.trial import unittest
+from twisted.web.http_headers import Headers
+
+from scrapyrt.conf import app_settings
+from scrapyrt.serialization import (
+    CborSerializer,
+    MsgpackSerializer,
+    OrjsonSerializer,
+    ScrapyJSONSerializer,
+    get_json_serializer,
+    get_response_serializer,
+    iter_dumps,
+)
+
+
+class Item(scrapy.Item):
+    name = scrapy.Field()
+    price = scrapy.Field()
+
+
+def get_response():
+    return {
+        "status": "ok",
+        "items": [
+            Item(name="Café", price=Decimal("1.50")),
+            {"name": b"bytes", 1: [1.5, None, True]},
+        ],
+        "stats": OrderedDict(
+            [("start_time", dt.datetime(2024, 1, 2, 3, 4, 5)), ("big", 2**70)],
+        ),
+    }
+
+
+class TestScrapyJSONSerializer(unittest.TestCase):
+    def test_dumps(self):
+        data = json.loads(ScrapyJSONSerializer().dumps(get_response()))
+        assert data["items"] == [
+            {"name": "Café", "price": "1.50"},
+            {"name": "bytes", "1": [1.5, None, True]},
+        ]
+        # Scrapy versions format dates differently.
+        assert data["stats"]["start_time"].startswith("2024-01-02")
+        assert data["stats"]["big"] == 2**70
+
+    def test_get_json_serializer(self):
+        serializer = get_json_serializer()
+        assert isinstance(serializer, ScrapyJSONSerializer)
+        assert get_json_serializer() is serializer
+
+
+class TestOrjsonSerializer(unittest.TestCase):
+    def setUp(self):
+        pytest.importorskip("orjson")
+
+    def test_dumps(self):
+        response = {**get_response(), "stats": {"start_time": dt.datetime(2024, 1, 2)}}
+        assert json.loads(OrjsonSerializer().dumps(response)) == json.loads(
+            ScrapyJSONSerializer().dumps(response),
+        )
+
+    def test_fallback(self):
+        response = get_response()
+        assert OrjsonSerializer().dumps(response) == ScrapyJSONSerializer().dumps(
+            response,
+        )
+
+    def test_get_json_serializer(self):
+        self.patch(
+            app_settings,
+            "JSON_SERIALIZER",
+            "scrapyrt.serialization.OrjsonSerializer",
+        )
+        assert isinstance(get_json_serializer(), OrjsonSerializer)
+
+
+class TestMsgpackSerializer(unittest.TestCase):
+    def test_dumps(self):
+        msgpack = pytest.importorskip("msgpack")
+        data = msgpack.unpackb(
+            MsgpackSerializer().dumps(get_response()),
+            strict_map_key=False,
+            timestamp=3,
+        )
+        assert data["items"] == [
+            {"name": "Café", "price": "1.50"},
+            {"name": b"bytes", 1: [1.5, None, True]},
+        ]
+        assert data["stats"]["start_time"] == dt.datetime(
+            2024,
+            1,
+            2,
+            3,
+            4,
+            5,
+            tzinfo=dt.timezone.utc,
+        )
+
+
+class TestCborSerializer(unittest.TestCase):
+    def test_dumps(self):
+        cbor2 = pytest.importorskip("cbor2")
+        data = cbor2.loads(CborSerializer().dumps(get_response()))
+        assert data["items"] == [
+            {"name": "Café", "price": Decimal("1.50")},
+            {"name": b"bytes", 1: [1.5, None, True]},
+        ]
+        assert data["stats"] == {
+            "start_time": dt.datetime(2024, 1, 2, 3, 4, 5, tzinfo=dt.timezone.utc),
+            "big": 2**70,
+        }
+
+
+class TestIterDumps:
+    @pytest.mark.parametrize(
+        ("serializer_cls", "loads"),
+        (
+            (ScrapyJSONSerializer, json.loads),
+            (OrjsonSerializer, json.loads),
+            (
+                MsgpackSerializer,
+                lambda data: __import__("msgpack").unpackb(
+                    data,
+                    strict_map_key=False,
+                    timestamp=3,
+                ),
+            ),
+            (CborSerializer, lambda data: __import__("cbor2").loads(data)),
+        ),
+    )
+    def test_iter_dumps(self, serializer_cls, loads):
+        try:
+            serializer = serializer_cls()
+        except ImportError as e:
+            pytest.skip(str(e))
+        response = get_response()
+        items = response.pop("items")
+        chunks = list(iter_dumps(serializer, response, "items", items))
+        assert len(chunks) > 1
+        assert loads(b"".join(chunks)) == loads(
+            serializer.dumps({**response, "items": items}),
+        )
+
+    def test_without_iter_dumps(self):
+        serializer = MagicMock(spec=["dumps"])
+        serializer.dumps.return_value = b"data"
+        chunks = list(iter_dumps(serializer, {"a": 1}, "items", iter([2])))
+        assert chunks == [b"data"]
+        serializer.dumps.assert_called_once_with({"a": 1, "items": [2]})
+
+
+class TestGetResponseSerializer(unittest.TestCase):
+    def setUp(self):
+        self.patch(
+            app_settings,
+            "RESPONSE_SERIALIZERS",
+            {
+                "application/msgpack": "scrapyrt.serialization.MsgpackSerializer",
+                "application/cbor": "scrapyrt.serialization.CborSerializer",
+            },
+        )
+
+    def get_content_type(self, accept):
+        request = MagicMock(requestHeaders=Headers(), responseHeaders=Headers())
+        if accept is not None:
+            request.requestHeaders.setRawHeaders(b"Accept", [accept])
+        content_type, _ = get_response_serializer(request)
+        assert request.responseHeaders.getRawHeaders(b"Vary") == [b"Accept"]
+        return content_type
+
+    def test_negotiation(self):
+        pytest.importorskip("msgpack")
+        pytest.importorskip("cbor2")
+        assert self.get_content_type(None) == b"application/json"
+        assert self.get_content_type(b"*/*") == b"application/json"
+        assert self.get_content_type(b"application/msgpack") == b"application/msgpack"
+        assert (
+            self.get_content_type(b"application/cbor, application/json;q=0.9")
+            == b"application/cbor"
+        )
+        assert (
+            self.get_content_type(b"application/cbor;q=0.5, application/*")
+            == b"application/json"
+        )
+        assert self.get_content_type(b"text/html") == b"application/json"
+
+    def test_negotiated_once(self):
+        request = MagicMock(requestHeaders=Headers(), responseHeaders=Headers())
+        assert get_response_serializer(request) is get_response_serializer(request)
+        assert request.responseHeaders.getRawHeaders(b"Vary") == [b"Accept"]
+
+    def test_disabled(self):
+        self.patch(app_settings, "RESPONSE_SERIALIZERS", "{}")
+        request = MagicMock(requestHeaders=Headers(), responseHeaders=Headers())
+        content_type, serializer = get_response_serializer(request)
+        assert content_type == b"application/json"
+        assert serializer is get_json_serializer()
+        assert not request.responseHeaders.hasHeader(b"Vary")
+
+    @patch("scrapyrt.serialization._unavailable_serializers", set())
+    def test_missing_library(self):
+        self.patch(
+            app_settings,
+            "RESPONSE_SERIALIZERS",
+            json.dumps({"application/msgpack": "tests.missing.Serializer"}),
+        )
+        assert self.get_content_type(b"application/msgpack") == b"application/json"
+
+
+class TestResponseFormatIntegration:
+    def test_msgpack(self, server):
+        msgpack = pytest.importorskip("msgpack")
+        res = requests.get(
+            server.url("crawl.json"),
+            params={"spider_name": "test", "url": server.site.url("page1.html")},
+            headers={"Accept": "application/msgpack"},
+            timeout=30,
+        )
+        assert res.headers["Content-Type"] == "application/msgpack"
+        data = msgpack.unpackb(res.content, timestamp=3)
+        assert data["items"] == [{"name": ["Page 1"]}]
+        assert isinstance(data["stats"]["start_time"], dt.datetime)
+        res = requests.get(
+            server.url("jobs/foo"),
+            headers={"Accept": "application/msgpack"},
+            timeout=30,
+        )
+        assert res.status_code == 404
+        assert msgpack.unpackb(res.content)["status"] == "error"
+
+    @pytest.mark.parametrize(
+        "server",
+        ({"RESULT_CACHE": "scrapyrt.cache.MemoryResultCache"},),
+        indirect=True,
+    )
+    def test_result_cache(self, server):
+        msgpack = pytest.importorskip("msgpack")
+
+        def crawl(accept):
+            return requests.get(
+                server.url("crawl.json"),
+                params={"spider_name": "test", "url": server.site.url("page1.html")},
+                headers={"Accept": accept},
+                timeout=30,
+            )
+
+        json_res = crawl("application/json")
+        msgpack_res = crawl("application/msgpack")
+        # Each format is cached with the ETag of its own body.
+        assert msgpack_res.headers["ETag"] != json_res.headers["ETag"]
+        cached = crawl("application/msgpack")
+        assert cached.content == msgpack_res.content
+        assert cached.headers["ETag"] == msgpack_res.headers["ETag"]
+        assert cached.headers["Content-Type"] == "application/msgpack"
+        data = msgpack.unpackb(cached.content, timestamp=3)
+        assert data["items"] == [{"name": ["Page 1"]}]
+        assert crawl("application/json").content == json_res.content
+        metrics = requests.get(server.url("metrics.json"), timeout=30).json()
+        assert metrics["metrics"]["result_cache/hit"] == 2
+        assert metrics["metrics"]["result_cache/miss"] == 2
@@ -0,0 +1,97 @@
+import pytest
+from scrapy.settings import Settings
+
+from scrapyrt.conf.spider_settings import (
+    get_project_settings_snapshot,
+    overlay_settings,
+)
+
+
+def test_get_project_settings_snapshot():
+    custom_settings = {"LOG_LEVEL": "INFO"}
+    snapshot = get_project_settings_snapshot(custom_settings=custom_settings)
+    assert isinstance(snapshot, Settings)
+    assert snapshot.frozen
+    assert snapshot["LOG_LEVEL"] == "INFO"
+    assert get_project_settings_snapshot(custom_settings=dict(custom_settings)) is (
+        snapshot
+    )
+    other = get_project_settings_snapshot(custom_settings={"LOG_LEVEL": "ERROR"})
+    assert other is not snapshot
+    assert other["LOG_LEVEL"] == "ERROR"
+
+
+def test_overlay_settings():
+    settings = Settings({"FOO": "foo", "BAR": "bar"}, priority="project")
+    settings.freeze()
+    result = overlay_settings(settings, {"FOO": "overlay", "BAZ": "baz"})
+    assert not result.frozen
+    assert result["FOO"] == "overlay"
+    assert result["BAR"] == "bar"
+    assert result["BAZ"] == "baz"
+    assert result.getpriority("FOO") == result.getpriority("BAZ")
+    assert settings["FOO"] == "foo"
+    assert "BAZ" not in settings
+
+
+def test_overlay_settings_copy_on_write():
+    settings = Settings({"FOO": "foo"}, priority="project")
+    settings.freeze()
+    result = overlay_settings(settings, {})
+    result.set("FOO", "overlay")
+    result.set("LOG_LEVEL", "INFO", priority="cmdline")
+    result["EXTENSIONS"].set("foo.Bar", 1)
+    result.set("DOWNLOADER_MIDDLEWARES", {"foo.Baz": 1})
+    del result["BOT_NAME"]
+    assert result["FOO"] == "overlay"
+    assert result["LOG_LEVEL"] == "INFO"
+    assert result.getdict("EXTENSIONS") == {"foo.Bar": 1}
+    assert result.getdict("DOWNLOADER_MIDDLEWARES") == {"foo.Baz": 1}
+    assert settings["FOO"] == "foo"
+    assert settings["LOG_LEVEL"] == "DEBUG"
+    assert not settings.getdict("EXTENSIONS")
+    assert not settings.getdict("DOWNLOADER_MIDDLEWARES")
+    assert settings["BOT_NAME"] == "scrapybot"
+    assert result.copy().getdict("EXTENSIONS") == {"foo.Bar": 1}
+
+
+def test_overlay_settings_plain_values():
+    settings = Settings(
+        {"FOO": {"a": [1]}, "BAR": [{"b": 2}], "BAZ": ("c",)},
+        priority="project",
+    )
+    settings.freeze()
+    result = overlay_settings(settings, {})
+    result.getdict("FOO")["a"].append(3)
+    result["BAR"].append(4)
+    result.getlist("BAR")[0]["b"] = 5
+    assert result["FOO"] == {"a": [1, 3]}
+    assert result["BAR"] == [{"b": 5}, 4]
+    assert result["BAZ"] is settings["BAZ"]
+    assert settings["FOO"] == {"a": [1]}
+    assert settings["BAR"] == [{"b": 2}]
+    assert overlay_settings(settings, {})["FOO"] == {"a": [1]}
+
+
+def test_overlay_settings_priority():
+    settings = Settings({"FOO": "foo"}, priority="cmdline")
+    result = overlay_settings(settings, {"FOO": "overlay"}, priority="project")
+    assert result["FOO"] == "foo"
+
+
+@pytest.mark.parametrize("setting", ("EXTENSIONS", "DOWNLOADER_MIDDLEWARES"))
+def test_overlay_settings_crawler_copy(setting):
+    from scrapy import Spider
+    from scrapy.crawler import Crawler
+
+    spidercls = type(
+        "TestSpider",
+        (Spider,),
+        {"name": "test", "custom_settings": {setting: {"foo.Bar": 1}}},
+    )
+    settings = Settings()
+    result = overlay_settings(settings, {"LOG_FILE": "foo.log"})
+    crawler = Crawler(spidercls, result)
+    assert crawler.settings.getdict(setting) == {"foo.Bar": 1}
+    assert "foo.Bar" not in settings[setting]
+    assert "foo.Bar" not in result[setting]
@@ -1,3 +1,4 @@
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from shutil import copytree, ignore_patterns
 from typing import Any
@@ -24,6 +25,22 @@ def generate_spider_start_project(root: Path, site):
         spider_path.write_text(content)
 
 
+def get_expected_urls(server, spider, spider_start):
+    expected_pages = {3}
+    if spider_start:
+        if spider != "old" and Version("2.13") <= SCRAPY_VERSION:
+            expected_pages.add(1)
+        # start_requests() is only honored by Scrapy < 2.16; from 2.16 on it is
+        # ignored, so a spider relying on it (old, or universal on Scrapy < 2.13
+        # where start() is not yet supported) yields nothing from it.
+        if Version("2.16") > SCRAPY_VERSION and (
+            spider == "old"
+            or (spider == "universal" and Version("2.13") > SCRAPY_VERSION)
+        ):
+            expected_pages.add(2)
+    return {f"{server.site.url(f'page{n}.html')}" for n in expected_pages}
+
+
 @pytest.fixture
 def server():
     site = MockServer()
@@ -65,22 +82,33 @@ def test(server, spider, start_param, method):
     assert response.status_code == 200
     data = response.json()
     actual_urls = {item["url"] for item in data["items"]}
-    expected_pages = {3}
-    if start_param:
-        if spider != "old" and Version("2.13") <= SCRAPY_VERSION:
-            expected_pages.add(1)
-        # start_requests() is only honored by Scrapy < 2.16; from 2.16 on it is
-        # ignored, so a spider relying on it (old, or universal on Scrapy < 2.13
-        # where start() is not yet supported) yields nothing from it.
-        if Version("2.16") > SCRAPY_VERSION and (
-            spider == "old"
-            or (spider == "universal" and Version("2.13") > SCRAPY_VERSION)
-        ):
-            expected_pages.add(2)
-    expected_urls = {f"{server.site.url(f'page{n}.html')}" for n in expected_pages}
-    assert expected_urls == actual_urls
+    assert get_expected_urls(server, spider, bool(start_param)) == actual_urls
     if start_param == "start_requests":
         assert data["warnings"] == [
             "The start_requests parameter is deprecated, use spider_start instead.",
         ]
     assert data.get("errors") is None
+
+
+@pytest.mark.parametrize("spider", ("new", "universal", "old"))
+def test_concurrent_crawls(server, spider):
+    """Crawls with and without spider_start of the same spider can overlap."""
+
+    def crawl(spider_start):
+        # Identical crawls must run, not share the result of a running one.
+        kwargs: dict[str, Any] = {"spider_name": spider, "coalesce": "false"}
+        if spider_start:
+            kwargs["spider_start"] = True
+        response = perform_get(
+            server.url("crawl.json"),
+            kwargs,
+            {"url": f"{server.site.url('page3.html')}"},
+        )
+        assert response.status_code == 200
+        actual_urls = {item["url"] for item in response.json()["items"]}
+        return spider_start, actual_urls
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(crawl, [True, False] * 12))
+    for spider_start, actual_urls in results:
+        assert get_expected_urls(server, spider, spider_start) == actual_urls
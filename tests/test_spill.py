@@ -0,0 +1,55 @@
+import json
+import pickle
+from decimal import Decimal
+from tempfile import TemporaryDirectory
+
+import pytest
+from twisted.trial import unittest
+
+from scrapyrt.serialization import ScrapyJSONSerializer
+from scrapyrt.spill import SpilledItems, SpillFile
+
+
+class TestSpillFile(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.spill_file = SpillFile(tmp_dir.name)
+        self.addCleanup(self.spill_file.close)
+
+    def test_write(self):
+        self.spill_file.write({"name": "a\nb"})
+        self.spill_file.write({"name": b"c", "price": Decimal("1.50")})
+        assert self.spill_file.count == 2
+        # Items are read back as they were written.
+        assert list(self.spill_file) == [
+            {"name": "a\nb"},
+            {"name": b"c", "price": Decimal("1.50")},
+        ]
+
+    def test_write_unpicklable(self):
+        self.spill_file.write({"name": "a"})
+        with pytest.raises((pickle.PicklingError, AttributeError)):
+            self.spill_file.write({"name": lambda: None})
+        assert self.spill_file.count == 1
+        assert list(self.spill_file) == [{"name": "a"}]
+
+    def test_finish(self):
+        self.spill_file.write({"name": "a"})
+        self.spill_file.finish()
+        assert list(self.spill_file) == [{"name": "a"}]
+
+    def test_close(self):
+        path = self.spill_file.path
+        assert path.exists()
+        self.spill_file.close()
+        assert not path.exists()
+
+    def test_spilled_items(self):
+        self.spill_file.write({"name": "b"})
+        items = SpilledItems([{"name": "a"}], self.spill_file)
+        assert len(items) == 2
+        assert list(items) == [{"name": "a"}, {"name": "b"}]
+        assert json.loads(ScrapyJSONSerializer().dumps({"items": items})) == {
+            "items": [{"name": "a"}, {"name": "b"}],
+        }
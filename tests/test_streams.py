@@ -0,0 +1,214 @@
+import json
+from unittest.mock import MagicMock
+
+import requests
+from twisted.internet.task import Clock
+from twisted.trial import unittest
+from twisted.web.server import Request
+
+from scrapyrt.conf import app_settings
+from scrapyrt.resources import EventsResource
+from scrapyrt.streams import EventStream, ItemStream
+
+from .test_resource_crawl import perform_get
+
+
+class TestItemStream:
+    def get_stream(self, t_req, resource):
+        t_req.code = 200
+        stream = ItemStream(t_req, resource)
+        stream.attach(MagicMock(stats=None))
+        return stream
+
+    def test_write(self, t_req, resource):
+        stream = self.get_stream(t_req, resource)
+        stream.manager.item_handler({"a": 1})
+        t_req.setHeader.assert_any_call(b"Content-Type", b"application/x-ndjson")
+        t_req.registerProducer.assert_called_once_with(stream, True)
+        stream.finish({"status": "ok"})
+        assert [call.args[0] for call in t_req.write.call_args_list] == [
+            b'{"a": 1}\n',
+            b'{"status": "ok"}\n',
+        ]
+        t_req.unregisterProducer.assert_called_once_with()
+        t_req.finish.assert_called_once_with()
+
+    def test_write_after_finish(self, t_req, resource):
+        stream = self.get_stream(t_req, resource)
+        stream.finish({"status": "ok"})
+        # Items of a crawl still closing after its response was sent.
+        stream.manager.item_handler({"a": 1})
+        stream.finish({"status": "ok"})
+        assert t_req.write.call_count == 1
+        t_req.registerProducer.assert_not_called()
+        t_req.finish.assert_called_once_with()
+
+    def test_error_before_items(self, t_req, resource):
+        stream = self.get_stream(t_req, resource)
+        t_req.code = 400
+        stream.finish({"status": "error"})
+        t_req.setHeader.assert_any_call(b"Content-Type", b"application/json")
+        t_req.finish.assert_called_once_with()
+
+    def test_pause(self, t_req, resource):
+        stream = self.get_stream(t_req, resource)
+        engine = stream.manager.crawler.engine
+        stream.pauseProducing()
+        stream.pauseProducing()
+        engine.pause.assert_called_once_with()
+        stream.resumeProducing()
+        engine.unpause.assert_called_once_with()
+        stream.stopProducing()
+        engine.close_spider.assert_called_once_with(
+            engine.spider,
+            reason="client_disconnected",
+        )
+        stream.finish({"status": "ok"})
+        t_req.finish.assert_not_called()
+
+    def test_resident_crawl(self, t_req, resource):
+        stream = self.get_stream(t_req, resource)
+        stream.manager.stats = MagicMock()
+        stream.pauseProducing()
+        stream.stopProducing()
+        engine = stream.manager.crawler.engine
+        engine.pause.assert_not_called()
+        engine.close_spider.assert_not_called()
+
+
+class TestEventStream(unittest.TestCase):
+    def setUp(self):
+        self.patch(app_settings, "EVENTS_PROGRESS_INTERVAL", 1.0)
+        self.clock = Clock()
+        self.request = MagicMock(spec=Request, code=200)
+        self.stream = EventStream(self.request, EventsResource(), clock=self.clock)
+        self.manager = MagicMock(stats=None, request_count=1, items_dropped_count=0)
+        self.manager.crawler.stats.get_stats.return_value = {
+            "response_received_count": 1,
+        }
+        self.stream.attach(self.manager)
+
+    def get_written(self):
+        return b"".join(call.args[0] for call in self.request.write.call_args_list)
+
+    def test_events(self):
+        self.manager.item_handler({"a": 1})
+        self.request.setHeader.assert_any_call(b"Content-Type", b"text/event-stream")
+        self.request.setHeader.assert_any_call(b"Cache-Control", b"no-cache")
+        assert self.get_written() == b'event: item\ndata: {"a": 1}\n\n'
+        self.stream.finish({"status": "ok"})
+        assert self.get_written().endswith(b'event: result\ndata: {"status": "ok"}\n\n')
+
+    def test_progress_interval(self):
+        progress = self.manager.progress_handler
+        progress()
+        progress()
+        self.clock.advance(0)
+        assert self.get_written() == (
+            b"event: progress\n"
+            b'data: {"requests": 1, "responses": 1, "items": 0, "items_dropped": 0,'
+            b' "errors": 0}\n\n'
+        )
+        self.request.write.reset_mock()
+        progress()
+        self.clock.advance(0.5)
+        progress()
+        assert not self.request.write.called
+        self.clock.advance(0.5)
+        assert self.request.write.call_count == 1
+        progress()
+        self.stream.finish({"status": "ok"})
+        assert self.get_written().count(b"event: progress") == 2
+        assert not self.clock.getDelayedCalls()
+
+    def test_progress_after_finish(self):
+        self.stream.finish({"status": "ok"})
+        self.request.write.reset_mock()
+        self.manager.progress_handler()
+        self.manager.item_handler({"a": 1})
+        self.clock.advance(1)
+        assert not self.request.write.called
+
+
+class TestStreamIntegration:
+    def test_stream(self, server):
+        res = requests.post(
+            server.url("crawl.json"),
+            json={
+                "spider_name": "test",
+                "stream": True,
+                "request": {"url": server.site.url("page1.html")},
+            },
+            timeout=30,
+        )
+        assert res.status_code == 200
+        assert res.headers["Content-Type"] == "application/x-ndjson"
+        assert res.headers["Transfer-Encoding"] == "chunked"
+        lines = [json.loads(line) for line in res.text.splitlines()]
+        assert lines[0] == {"name": ["Page 1"]}
+        assert lines[-1]["status"] == "ok"
+        assert "items" not in lines[-1]
+        assert lines[-1]["stats"]["item_scraped_count"] == 1
+        assert len(lines) == 2
+
+    def test_stream_batch(self, server):
+        res = requests.post(
+            server.url("crawl.json"),
+            json={
+                "spider_name": "test",
+                "stream": True,
+                "requests": [{"url": server.site.url("page1.html")}],
+            },
+            timeout=30,
+        )
+        assert res.status_code == 400
+        assert res.json()["message"] == "Batch crawls cannot be streamed"
+
+    def test_stream_timeout(self, server):
+        res = perform_get(
+            server.url("crawl.json"),
+            {"spider_name": "test", "stream": "true", "timeout": "1"},
+            {"url": server.site.url("page1.html"), "callback": "follow_delayed"},
+        )
+        lines = [json.loads(line) for line in res.text.splitlines()]
+        assert lines[0] == {"name": "Item 0"}
+        assert lines[1]["partial"] is True
+        assert len(lines) == 2
+
+    def test_stream_accept(self, server):
+        res = requests.get(
+            server.url("crawl.json"),
+            params={"spider_name": "test", "url": server.site.url("page1.html")},
+            headers={"Accept": "application/x-ndjson"},
+            timeout=30,
+        )
+        lines = [json.loads(line) for line in res.text.splitlines()]
+        assert lines[0] == {"name": ["Page 1"]}
+        assert lines[1]["status"] == "ok"
+        res = perform_get(
+            server.url("crawl.json"),
+            {"spider_name": "test", "stream": "true"},
+            {"url": server.site.url("page1.html"), "callback": "foo"},
+        )
+        assert res.status_code == 400
+        assert res.headers["Content-Type"] == "application/json"
+        assert res.json()["status"] == "error"
+
+    def test_events(self, server):
+        res = requests.get(
+            server.url("events"),
+            params={"spider_name": "test", "url": server.site.url("page1.html")},
+            timeout=30,
+        )
+        assert res.status_code == 200
+        assert res.headers["Content-Type"] == "text/event-stream"
+        events = [
+            (event.split("\n")[0], json.loads(event.split("\n")[1][len("data: ") :]))
+            for event in res.text.strip().split("\n\n")
+        ]
+        assert ("event: item", {"name": ["Page 1"]}) in events
+        assert events[0][0] == "event: progress"
+        assert events[-2][0] == "event: progress"
+        assert events[-2][1]["items"] == 1
+        assert events[-1][0] == "event: result"
+        assert events[-1][1]["status"] == "ok"
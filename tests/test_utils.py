@@ -2,7 +2,7 @@ import re
 
 import pytest
 
-from scrapyrt.utils import extract_scrapy_request_args
+from scrapyrt.utils import extract_scrapy_request_args, parse_accept_header
 
 
 class TestUtils:
@@ -26,3 +26,15 @@ class TestUtils:
 
         expected_msg = "'noise' is not a valid argument for scrapy.Request"
         assert re.search(expected_msg, str(e.value))
+
+    def test_parse_accept_header(self):
+        assert parse_accept_header("gzip, BR;q=0.5, zstd;q=x, identity;q=0,") == {
+            "gzip": 1.0,
+            "br": 0.5,
+            "zstd": 0.0,
+            "identity": 0.0,
+        }
+        assert parse_accept_header(
+            "application/json; charset=utf-8, application/*;q=0.2",
+        ) == {"application/json": 1.0, "application/*": 0.2}
+        assert not parse_accept_header("")
@@ -0,0 +1,98 @@
+from unittest.mock import MagicMock, patch
+
+from twisted.internet.task import Clock
+from twisted.trial import unittest
+
+from scrapyrt.metrics import metrics
+from scrapyrt.workers import WorkerRecycler, get_rss
+
+
+def test_get_rss():
+    assert get_rss() > 0
+
+
+class TestWorkerRecycler(unittest.TestCase):
+    def setUp(self):
+        metrics.clear()
+        self.clock = Clock()
+        self.server = MagicMock()
+        self.connections = MagicMock(protocols={})
+
+    def tearDown(self):
+        metrics.clear()
+
+    def start_recycler(self, **kwargs):
+        recycler = WorkerRecycler(
+            self.server,
+            self.connections,
+            clock=self.clock,
+            **kwargs,
+        )
+        recycler._stop_reactor = MagicMock()  # type: ignore[method-assign]
+        recycler.startService()
+        return recycler
+
+    def test_max_crawls(self):
+        recycler = self.start_recycler(max_crawls=2)
+        metrics.inc_value("crawls/finished")
+        metrics.inc_value("crawls/running")
+        self.clock.advance(1)
+        self.server.stopService.assert_not_called()
+        metrics.inc_value("crawls/finished")
+        self.clock.advance(1)
+        self.server.stopService.assert_called_once()
+        self.clock.advance(1)
+        recycler._stop_reactor.assert_not_called()
+        metrics.inc_value("crawls/running", -1)
+        self.clock.advance(1)
+        recycler._stop_reactor.assert_called_once()
+
+    @patch("scrapyrt.workers.get_rss", return_value=200 * 1024 * 1024)
+    def test_max_memory(self, get_rss_mock):
+        recycler = self.start_recycler(max_memory=300)
+        self.clock.advance(1)
+        self.server.stopService.assert_not_called()
+        get_rss_mock.return_value = 301 * 1024 * 1024
+        self.clock.advance(1)
+        self.server.stopService.assert_called_once()
+        self.clock.advance(1)
+        recycler._stop_reactor.assert_called_once()
+
+    def add_connection(self, requests):
+        connection = MagicMock()
+        connection.wrappedProtocol.requests = requests
+        self.connections.protocols[connection] = 1
+        return connection
+
+    def test_open_requests(self):
+        recycler = self.start_recycler(max_crawls=1)
+        idle_connection = self.add_connection([])
+        busy_connection = self.add_connection([MagicMock()])
+        metrics.inc_value("crawls/finished")
+        self.clock.advance(1)
+        self.server.stopService.assert_called_once()
+        self.clock.advance(1)
+        idle_connection.loseConnection.assert_called_once()
+        busy_connection.loseConnection.assert_not_called()
+        del self.connections.protocols[idle_connection]
+        self.clock.advance(1)
+        recycler._stop_reactor.assert_not_called()
+        # The response is being written, the connection is closed once it is.
+        busy_connection.wrappedProtocol.requests = []
+        self.clock.advance(1)
+        busy_connection.loseConnection.assert_called_once()
+        recycler._stop_reactor.assert_not_called()
+        del self.connections.protocols[busy_connection]
+        self.clock.advance(1)
+        recycler._stop_reactor.assert_called_once()
+
+    def test_grace_timeout(self):
+        recycler = self.start_recycler(max_crawls=1, grace_timeout=10)
+        self.add_connection([MagicMock()])
+        metrics.inc_value("crawls/finished")
+        self.clock.advance(1)
+        self.server.stopService.assert_called_once()
+        self.clock.advance(9)
+        recycler._stop_reactor.assert_not_called()
+        self.clock.advance(1)
+        recycler._stop_reactor.assert_called_once()
@@ -1,4 +1,5 @@
 from pathlib import Path
+from time import sleep
 
 from flask import Flask, abort
 
@@ -38,3 +39,9 @@ def page3():
 @app.route("/err/<int:code>")
 def return_code(code):
     abort(code)
+
+
+@app.route("/delay/<float:seconds>")
+def delay(seconds):
+    sleep(seconds)
+    return read_file(Path("page1.html"))
@@ -1,5 +1,6 @@
 import os
 import shutil
+import time
 from pathlib import Path
 from typing import Any
 
@@ -7,6 +8,8 @@ from packaging.version import Version
 from scrapy import __version__ as scrapy_version
 from scrapy.settings import Settings, default_settings
 
+from scrapyrt.serialization import ScrapyJSONSerializer
+
 from . import PROJECT_PATH, SAMPLE_DATA
 
 ASYNCIO_REACTOR_IS_DEFAULT = (
@@ -44,7 +47,7 @@ def get_settings():
     return Settings(settings)
 
 
-def generate_project(directory: Path, site=None):
+def generate_project(directory: Path, site=None, settings=None):
     source = SAMPLE_DATA / "testproject"
     shutil.copytree(
         source,
@@ -52,6 +55,10 @@ def generate_project(directory: Path, site=None):
         ignore=shutil.ignore_patterns("*.pyc"),
         dirs_exist_ok=True,
     )
+    if settings:
+        with (directory / "testproject" / "settings.py").open("a") as f:
+            for name, value in settings.items():
+                f.write(f"{name} = {value!r}\n")
     # Pass site url to spider doing start requests
     spider_filename = (
         directory
@@ -70,3 +77,11 @@ def generate_project(directory: Path, site=None):
     )
     with spider_target_place.open("wb") as output:
         output.write(spider_string.encode("utf-8"))
+
+
+class SlowJSONSerializer(ScrapyJSONSerializer):
+    """JSON serializer taking 2 seconds per response."""
+
+    def dumps(self, obj):
+        time.sleep(2)
+        return super().dumps(obj)